@@ -0,0 +1,84 @@
+#!/usr/bin/env python
+"""
+Compares the cornering models of the planner, see junction_deviation in
+the [Planner] section.
+
+Runs each workload once with the jerk model and once per junction
+deviation given, on the simulated PRU at full speed, and reports the time
+the moves take on the printer, planned_time_s, for each. Shorter is faster
+at the same accelerations and speeds, the planner telemetry and wall time
+of each run are in the results too.
+
+Usage: python benchmarks/cornering.py [--config prusa_i3.cfg ...]
+           [--workload tiny_segments ...] [--gcode file.gcode ...]
+           [--junction-deviation 0.00005 ...] [--output results.json]
+
+License: GNU GPL v3: http://www.gnu.org/copyleft/gpl.html
+
+ Redeem is free software: you can redistribute it and/or modify
+ it under the terms of the GNU General Public License as published by
+ the Free Software Foundation, either version 3 of the License, or
+ (at your option) any later version.
+
+ Redeem is distributed in the hope that it will be useful,
+ but WITHOUT ANY WARRANTY; without even the implied warranty of
+ MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+ GNU General Public License for more details.
+
+ You should have received a copy of the GNU General Public License
+ along with Redeem.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import argparse
+import json
+import os
+import time
+
+from run_benchmarks import DEFAULT_CONFIGS, run
+from workloads import WORKLOADS
+
+# Curved paths, where the cornering model matters
+DEFAULT_WORKLOADS = ["tiny_segments", "dense_arcs"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Redeem cornering benchmark")
+    parser.add_argument("--config", action="append",
+                        help="printer config from configs/, default: " + ", ".join(DEFAULT_CONFIGS))
+    parser.add_argument("--workload", action="append", choices=sorted(WORKLOADS.keys()),
+                        help="generated workload, default: " + ", ".join(DEFAULT_WORKLOADS))
+    parser.add_argument("--gcode", action="append", default=[],
+                        help="G-code file to run in addition to the workloads")
+    parser.add_argument("--junction-deviation", action="append", type=float,
+                        help="junction deviation to compare with the jerk model in m, default: 0.00005")
+    parser.add_argument("--output", help="file to write the JSON results to, default: stdout")
+    args = parser.parse_args()
+
+    workloads = [(name, WORKLOADS[name]()) for name in (args.workload or DEFAULT_WORKLOADS)]
+    for filename in args.gcode:
+        with open(filename) as f:
+            workloads.append((os.path.basename(filename), [l.rstrip() for l in f if l.strip()]))
+    deviations = [0.0] + (args.junction_deviation or [0.00005])
+
+    results = []
+    for printer_cfg in (args.config or DEFAULT_CONFIGS):
+        for name, lines in workloads:
+            runs = [run(printer_cfg, name, lines, 0, {"junction_deviation": deviation})
+                    for deviation in deviations]
+            jerk_time = runs[0].get("planned_time_s")
+            for deviation, result in zip(deviations, runs):
+                result["model"] = "junction_deviation" if deviation else "jerk"
+                if jerk_time and "planned_time_s" in result:
+                    result["time_vs_jerk"] = result["planned_time_s"]/jerk_time
+            results.extend(runs)
+
+    report = json.dumps({"timestamp": time.time(), "results": results}, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(report + "\n")
+    else:
+        print report
+
+
+if __name__ == '__main__':
+    main()
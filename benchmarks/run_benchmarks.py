@@ -0,0 +1,167 @@
+#!/usr/bin/env python
+"""
+End-to-end throughput benchmarks of Redeem.
+
+Boots Redeem with a config from configs/ on the simulated PRU (see
+simulate_pru in the [System] section) and feeds it G-code the same way
+the command loop does. For every workload and config it reports, as JSON:
+
+  lines_per_s      G-code lines parsed per second
+  segments_per_s   lines queued in the native planner per second of feeding
+  underruns        times the PRU ran out of moves, see getUnderrunCount
+                   and the rest of the planner telemetry, see M122
+  planned_time_s   time the moves take on the printer, from the PRU clock
+  wall_time_s      time from the first line fed to the last step done
+
+With the simulated PRU running at speed S, wall_time_s should be close to
+planned_time_s/S, a host that can't keep up shows as underruns and a
+longer wall time. Running at speeds above 1 emulates a slower host.
+
+Usage: python benchmarks/run_benchmarks.py [--config kossel_mini.cfg ...]
+           [--workload dense_arcs ...] [--gcode file.gcode ...]
+           [--planner junction_deviation=0.00005 ...]
+           [--speed 4] [--output results.json]
+
+License: GNU GPL v3: http://www.gnu.org/copyleft/gpl.html
+
+ Redeem is free software: you can redistribute it and/or modify
+ it under the terms of the GNU General Public License as published by
+ the Free Software Foundation, either version 3 of the License, or
+ (at your option) any later version.
+
+ Redeem is distributed in the hope that it will be useful,
+ but WITHOUT ANY WARRANTY; without even the implied warranty of
+ MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+ GNU General Public License for more details.
+
+ You should have received a copy of the GNU General Public License
+ along with Redeem.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import argparse
+import json
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.realpath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+from redeem.Redeem import Redeem
+from redeem.Gcode import Gcode
+
+from workloads import WORKLOADS
+
+# Cartesian, delta and CoreXY
+DEFAULT_CONFIGS = ["prusa_i3.cfg", "kossel_mini.cfg", "maxcorexy.cfg"]
+
+
+def make_config_dir(printer_cfg, speed, planner=None):
+    """ A config directory for Redeem with a local.cfg selecting the simulated PRU
+    and overriding the [Planner] options in planner """
+    path = tempfile.mkdtemp(prefix="redeem_benchmark_")
+    configs = os.path.join(ROOT, "configs")
+    shutil.copy(os.path.join(configs, "default.cfg"), path)
+    shutil.copy(os.path.join(configs, printer_cfg), os.path.join(path, "printer.cfg"))
+    with open(os.path.join(path, "local.cfg"), "w") as f:
+        f.write("[System]\n"
+                "loglevel = 30\n"
+                "log_to_file = False\n"
+                "simulate_pru = True\n"
+                "simulate_pru_speed = {}\n".format(speed))
+        if planner:
+            f.write("[Planner]\n")
+            for option, value in sorted(planner.items()):
+                f.write("{} = {}\n".format(option, value))
+    return path
+
+
+def feed(printer, gcodes):
+    """ Execute the gcodes like Redeem.loop does for a batch of buffered lines """
+    processor = printer.processor
+    start = 0
+    while start < len(gcodes):
+        end = processor.batch_end(gcodes, start)
+        if end - start > 1:
+            processor.execute_batch(gcodes[start:end])
+        elif gcodes[start].is_valid():
+            processor.execute(gcodes[start])
+        start = end
+
+
+def run(printer_cfg, name, lines, speed, planner=None):
+    result = {"config": printer_cfg, "workload": name, "lines": len(lines),
+              "simulate_pru_speed": speed, "planner": planner or {}}
+
+    start = time.time()
+    gcodes = [Gcode({"message": line, "prot": "testing_noret"}) for line in lines]
+    result["lines_per_s"] = len(lines)/(time.time() - start)
+
+    config_dir = make_config_dir(printer_cfg, speed, planner)
+    try:
+        r = Redeem(config_dir)
+        r.printer.enable.set_enabled()
+        native = r.printer.path_planner.native_planner
+        try:
+            start = time.time()
+            feed(r.printer, gcodes)
+            fed = time.time()
+            r.printer.path_planner.wait_until_done()
+            done = time.time()
+
+            segments = native.getQueuedLineCount()
+            result["segments"] = segments
+            result["segments_per_s"] = segments/(fed - start)
+            result.update(r.printer.path_planner.get_telemetry())
+            result["planned_time_s"] = native.getSimulatedTime()
+            result["wall_time_s"] = done - start
+        finally:
+            r.exit()
+    except Exception as e:
+        logging.exception("Benchmark {} on {} failed".format(name, printer_cfg))
+        result["error"] = str(e)
+    finally:
+        shutil.rmtree(config_dir)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Redeem end-to-end benchmarks")
+    parser.add_argument("--config", action="append",
+                        help="printer config from configs/, default: " + ", ".join(DEFAULT_CONFIGS))
+    parser.add_argument("--workload", action="append", choices=sorted(WORKLOADS.keys()),
+                        help="generated workload, default: all")
+    parser.add_argument("--gcode", action="append", default=[],
+                        help="G-code file to run in addition to the workloads")
+    parser.add_argument("--planner", action="append", default=[], metavar="OPTION=VALUE",
+                        help="override an option of the [Planner] section")
+    parser.add_argument("--speed", type=float, default=4.0,
+                        help="speed of the simulated PRU relative to real time, 0 for as fast as possible")
+    parser.add_argument("--output", help="file to write the JSON results to, default: stdout")
+    args = parser.parse_args()
+
+    workloads = [(name, WORKLOADS[name]()) for name in (args.workload or sorted(WORKLOADS.keys()))]
+    for filename in args.gcode:
+        with open(filename) as f:
+            workloads.append((os.path.basename(filename), [l.rstrip() for l in f if l.strip()]))
+
+    planner = dict(option.split("=", 1) for option in args.planner)
+
+    results = []
+    for printer_cfg in (args.config or DEFAULT_CONFIGS):
+        for name, lines in workloads:
+            results.append(run(printer_cfg, name, lines, args.speed, planner))
+
+    report = json.dumps({"timestamp": time.time(), "results": results}, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(report + "\n")
+    else:
+        print report
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+"""
+G-code workloads for the end-to-end benchmarks in run_benchmarks.py.
+
+Each workload is generated, so the same moves are benchmarked on every
+run without keeping large G-code files in the repository. The moves are
+centered on 0,0 and stay inside a radius of 40 mm so they fit the delta
+configs as well as the cartesian and CoreXY ones.
+
+License: GNU GPL v3: http://www.gnu.org/copyleft/gpl.html
+
+ Redeem is free software: you can redistribute it and/or modify
+ it under the terms of the GNU General Public License as published by
+ the Free Software Foundation, either version 3 of the License, or
+ (at your option) any later version.
+
+ Redeem is distributed in the hope that it will be useful,
+ but WITHOUT ANY WARRANTY; without even the implied warranty of
+ MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+ GNU General Public License for more details.
+
+ You should have received a copy of the GNU General Public License
+ along with Redeem.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import math
+import random
+
+RADIUS = 40.0
+LAYER_HEIGHT = 0.2
+# Filament per mm of extrusion, 0.4 mm line of 1.75 mm filament
+E_PER_MM = 0.4*LAYER_HEIGHT/(math.pi*0.875**2)
+
+
+def header():
+    return ["G21", "G90", "M83", "G92 E0", "G1 F3000 Z{:.3f}".format(LAYER_HEIGHT)]
+
+
+def dense_arcs(layers=3, r=1.5, spacing=6.0):
+    """ A grid of small circles made of G2/G3 arcs, alternating direction """
+    lines = header()
+    n = int(RADIUS/spacing)
+    for layer in range(layers):
+        lines.append("G1 Z{:.3f} F600".format((layer+1)*LAYER_HEIGHT))
+        clockwise = True
+        for i in range(-n, n + 1):
+            for j in range(-n, n + 1):
+                x, y = i*spacing, j*spacing
+                if math.hypot(x, y) + r > RADIUS:
+                    continue
+                lines.append("G0 X{:.3f} Y{:.3f} F6000".format(x + r, y))
+                # Two half circles, a full circle has the same start and end
+                e = math.pi*r*E_PER_MM
+                arc = "G2" if clockwise else "G3"
+                lines.append("{} X{:.3f} Y{:.3f} I{:.3f} J0 E{:.5f} F2400".format(arc, x - r, y, -r, e))
+                lines.append("{} X{:.3f} Y{:.3f} I{:.3f} J0 E{:.5f} F2400".format(arc, x + r, y, r, e))
+                clockwise = not clockwise
+    return lines
+
+
+def tiny_segments(layers=5, segment=0.05):
+    """ Curves made of very short G1 segments, as slicers do for STL meshes """
+    lines = header()
+    for layer in range(layers):
+        lines.append("G1 Z{:.3f} F600".format((layer+1)*LAYER_HEIGHT))
+        r = 5.0
+        while r < RADIUS:
+            # A wavy circle so consecutive segments never have the same direction
+            n = int(2*math.pi*r/segment)
+            lines.append("G0 X{:.3f} Y0 F6000".format(r))
+            for i in range(1, n+1):
+                a = 2*math.pi*i/n
+                rr = r + 0.5*math.sin(12*a)
+                lines.append("G1 X{:.4f} Y{:.4f} E{:.6f} F3000".format(
+                    rr*math.cos(a), rr*math.sin(a), segment*E_PER_MM))
+            r += 5.0
+    return lines
+
+
+def long_travels(moves=500, seed=1):
+    """ Travel moves between random points, each followed by a short extrusion """
+    rnd = random.Random(seed)
+    lines = header()
+    for i in range(moves):
+        a = rnd.uniform(0, 2*math.pi)
+        r = rnd.uniform(0, RADIUS - 2)
+        x, y = r*math.cos(a), r*math.sin(a)
+        lines.append("G0 X{:.3f} Y{:.3f} F12000".format(x, y))
+        lines.append("G1 X{:.3f} Y{:.3f} E{:.5f} F1800".format(x + 1, y, E_PER_MM))
+    return lines
+
+
+WORKLOADS = {
+    "dense_arcs": dense_arcs,
+    "tiny_segments": tiny_segments,
+    "long_travels": long_travels,
+}
@@ -19,9 +19,8 @@ License: GNU GPL v3: http://www.gnu.org/copyleft/gpl.html
  along with Redeem.  If not, see <http://www.gnu.org/licenses/>.
 """
 
-from threading import Thread
-import time
 import logging
+from threading import Lock
 
 class Cooler:
 
@@ -35,6 +34,9 @@ class Cooler:
         self.P = 1.0                      # Proportional 
         self.onoff_control = onoff_control # If we use PID or ON/OFF control
         self.ok_range = 4.0
+        self.sleep = 1.0                   # Time between measurements
+        self.enabled = False
+        self.lock = Lock()                 # Held to set the fan and to disable
 
     def set_target_temperature(self, temp):
         """ Set the desired temperature of the extruder """
@@ -52,44 +54,37 @@ class Cooler:
         return err < self.ok_range
 
     def disable(self):
-        """ Stops the heater and the PID controller """
-        self.enabled = False
-        # Wait for PID to stop
-        while self.disabled == False:
-            time.sleep(0.2)
-        # The PID loop has finished
-        self.fan.set_power(0.0)
+        """ Stops the cooler and turns the fan off """
+        with self.lock:
+            self.enabled = False
+            self.fan.set_value(0.0)
 
     def enable(self):
-        """ Start the PID controller """
+        """ Start the controller, it is run by the ThermalLoop """
         self.enabled = True
-        self.disabled = False
-        self.t = Thread(target=self.keep_temperature, name=self.name)
-        self.t.daemon = True
-        self.t.start()		
 
     def set_p_value(self, P):
         """ Set values for Proportional, Integral, Derivative"""
         self.P = P # Proportional
 
-    def keep_temperature(self):
-        """ PID Thread that keeps the temperature stable """
-        while self.enabled:
-            self.current_temp = self.cold_end.get_temperature()    
-            error = self.target_temp-self.current_temp    
-            
-            if self.onoff_control:
-                power = 1.0 if (self.P*error > 1.0) else 0.0
-            else:
-                power = self.P*error  # The formula for the PID (only P)				
-                power = max(min(power, 1.0), 0.0)                             # Normalize to 0,1
-
-            # Invert the control since it'a a cooler
-            power = 1.0 - power
-            #logging.info("Err: {}, Pwr: {}".format(error, power))
-            self.fan.set_value(power)            		 
-            time.sleep(1)
-        self.disabled = True
-
-
-
+    def sample(self):
+        """ Read the temperature, called by the ThermalLoop every self.sleep seconds """
+        self.current_temp = self.cold_end.get_temperature()    
+
+    def update(self):
+        """ Set the fan from the last sample, called by the ThermalLoop """
+        error = self.target_temp-self.current_temp    
+        
+        if self.onoff_control:
+            power = 1.0 if (self.P*error > 1.0) else 0.0
+        else:
+            power = self.P*error  # The formula for the PID (only P)				
+            power = max(min(power, 1.0), 0.0)                             # Normalize to 0,1
+
+        # Invert the control since it'a a cooler
+        power = 1.0 - power
+        #logging.info("Err: {}, Pwr: {}".format(error, power))
+        # Unless disabled since the loop called us
+        with self.lock:
+            if self.enabled:
+                self.fan.set_value(power)            		 
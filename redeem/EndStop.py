@@ -83,9 +83,13 @@ class EndStop:
                                     self.hit = False
             #else:
             #    logging.debug("End stop {} timeout".format(self.name))
-    def read_value(self):
-        """ Read the current endstop value from GPIO using PRU1 """
-        state = PruInterface.get_shared_long(0)
+    def read_value(self, state=None):
+        """ 
+        Read the current endstop value from GPIO using PRU1, or from state
+        if given, the endstop states read once for all the endstops 
+        """
+        if state is None:
+            state = PruInterface.get_endstop_states()
         if self.name == "X1":
             self.hit = bool(state & (1 << 0))
         elif self.name == "Y1":
@@ -24,9 +24,7 @@ License: GNU GPL v3: http://www.gnu.org/copyleft/gpl.html
 from threading import Thread
 import socket
 import logging
-from Gcode import Gcode
-
-size = 1024 
+from LineBuffer import LineBuffer
 
 
 class Ethernet:
@@ -46,6 +44,7 @@ class Ethernet:
         logging.info("Ethernet bound to port " + str(port))
         self.s.listen(backlog)
         self.client = None
+        self.buffer = LineBuffer("Eth")
         self.running = True
         self.t = Thread(target=self.get_message, name="Ethernet")
         self.t.start()
@@ -61,14 +60,14 @@ class Ethernet:
                 continue
             logging.info("Ethernet connection accepted")
             self.s.settimeout(1.0)
+            self.buffer.reset()
             while self.running:
-                line = self.read_line()
-                if line is None:
+                lines = self.read_lines()
+                if lines is None:
                     break
-                message = line.strip("\n")
-                if len(message) > 0:
-                    g = Gcode({"message": message, "prot": "Eth"})
-                    self.printer.processor.enqueue(g)
+                gcodes = self.buffer.to_gcodes(lines)
+                if gcodes:
+                    self.printer.processor.enqueue_batch(gcodes)
 
     def send_message(self, message):
         """Send a message"""
@@ -81,22 +80,23 @@ class Ethernet:
         except socket.error, (value, message):
             logging.error("Ethernet " + message)
 
-    def read_line(self):
-        """read a line from a socket"""
-        chars = []
+    def read_lines(self):
+        """read all complete lines available on the socket"""
         while self.running:
             try:
-                char = self.client.recv(1)
+                lines = self.buffer.read_socket(self.client)
+            except socket.timeout:
+                continue
             except socket.error, (value, message):
                 logging.error("Ethernet " + message)
-                char = ""
-            if char == "":
+                lines = []
+                self.buffer.eof = True
+            if self.buffer.eof:
                 logging.warning("Ethernet: Connection reset by peer.")
                 self.client.close()
                 break
-            chars.append(char)
-            if char == "\n":
-                return "".join(chars)
+            if lines:
+                return lines
 
     def close(self):
         """Stop receiving messages"""
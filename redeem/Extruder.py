@@ -20,9 +20,9 @@ License: GNU GPL v3: http://www.gnu.org/copyleft/gpl.html
  along with Redeem.  If not, see <http://www.gnu.org/licenses/>.
 """
 
-from threading import Thread
 import time
 import logging
+from threading import Lock
 import numpy as np
 from Alarm import Alarm
 
@@ -47,8 +47,9 @@ class Heater(object):
         self.onoff_control = onoff_control  # If we use PID or ON/OFF control
         self.ok_range = 4.0
         self.prefix = ""
-        self.sleep = 0.1                    # Time to sleep between measurements
+        self.sleep = 0.1                    # Time between measurements
         self.max_power = 1.0                # Maximum power
+        self.lock = Lock()                  # Held to set the power and to disable
 
         self.min_temp_enabled   = False  # Temperature error limit 
         self.min_temp           = 0      # If temperature falls below this point from the target, disable. 
@@ -123,18 +124,16 @@ class Heater(object):
     def disable(self):
         """ Stops the heater and the PID controller """
         self.target_temp = 0
-        self.enabled = False
-        self.mosfet.set_power(0.0)
-        # Wait for PID to stop
-        self.t.join()
+        with self.lock:
+            self.enabled = False
+            self.mosfet.set_power(0.0)
         logging.debug("Heater {} disabled".format(self.name))
-        self.mosfet.set_power(0.0)
         self.last_error = 0.0
         self.error_integral = 0.0
         self.error_integral_limit = 100.0
 
     def enable(self):
-        """ Start the PID controller """
+        """ Start the PID controller, it is run by the ThermalLoop """
         self.avg = max(int(1.0/self.sleep), 3)
         self.error = 0
         self.errors = [0]*self.avg
@@ -144,52 +143,49 @@ class Heater(object):
         self.current_temp = self.thermistor.get_temperature()
         self.temperatures = [self.current_temp]  
         self.enabled = True
-        self.t = Thread(target=self.keep_temperature, name=self.name)
-        self.t.start()
-
-    def keep_temperature(self):
-        """ PID Thread that keeps the temperature stable """
-        try:
-            while self.enabled:
-                self.current_temp = self.thermistor.get_temperature()
-                self.temperatures.append(self.current_temp)
-                self.temperatures[:-max(int(60/self.sleep), self.avg)] = [] # Keep only this much history
-
-                self.error = self.target_temp-self.current_temp
-                self.errors.append(self.error)
-                self.errors.pop(0)
-
-                if self.onoff_control:
-                    if self.error > 0.0:
-                        power = self.max_power
-                    else:
-                        power = 0.0
-                else:
-                    derivative = self.get_error_derivative()
-                    integral = self.get_error_integral()
-                    # The standard formula for the PID
-                    power = self.Kp*(self.error + (1.0/self.Ti)*integral + self.Td*derivative)  
-                    power = max(min(power, self.max_power), 0.0)                         # Normalize to 0, max
-                    #if self.name =="E":
-                    #    logging.debug("Err: {0:.3f}, der: {1:.4f} int: {2:.2f}".format(self.error, derivative, integral))
-
-                # Run safety checks
-                self.time_diff = self.current_time-self.prev_time
-                self.prev_time = self.current_time
-                self.current_time = time.time()
-
-                if not self.extruder_error:
-                    self.check_temperature_error()
-
-                # Set temp if temperature is OK
-                if not self.extruder_error and self.current_temp > 0:
-                    self.mosfet.set_power(power)
-                else:
-                    self.mosfet.set_power(0)        
-                time.sleep(self.sleep)
-        finally:
-            # Disable this mosfet if anything goes wrong
-            self.mosfet.set_power(0)
+
+    def sample(self):
+        """ Read the thermistor, called by the ThermalLoop every self.sleep seconds """
+        self.current_temp = self.thermistor.get_temperature()
+        self.temperatures.append(self.current_temp)
+        self.temperatures[:-max(int(60/self.sleep), self.avg)] = [] # Keep only this much history
+
+    def update(self):
+        """ Set the mosfet power from the last sample, called by the ThermalLoop """
+        self.error = self.target_temp-self.current_temp
+        self.errors.append(self.error)
+        self.errors.pop(0)
+
+        if self.onoff_control:
+            if self.error > 0.0:
+                power = self.max_power
+            else:
+                power = 0.0
+        else:
+            derivative = self.get_error_derivative()
+            integral = self.get_error_integral()
+            # The standard formula for the PID
+            power = self.Kp*(self.error + (1.0/self.Ti)*integral + self.Td*derivative)  
+            power = max(min(power, self.max_power), 0.0)                         # Normalize to 0, max
+            #if self.name =="E":
+            #    logging.debug("Err: {0:.3f}, der: {1:.4f} int: {2:.2f}".format(self.error, derivative, integral))
+
+        # Run safety checks
+        self.time_diff = self.current_time-self.prev_time
+        self.prev_time = self.current_time
+        self.current_time = time.time()
+
+        if not self.extruder_error:
+            self.check_temperature_error()
+
+        # Set temp if temperature is OK, unless disabled since the loop called us
+        with self.lock:
+            if not self.enabled:
+                return
+            if not self.extruder_error and self.current_temp > 0:
+                self.mosfet.set_power(power)
+            else:
+                self.mosfet.set_power(0)        
 
     def get_error_derivative(self):
         """ Get the derivative of the temperature"""
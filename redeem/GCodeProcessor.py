@@ -36,6 +36,9 @@ except ImportError:
 
 
 class GCodeProcessor:
+    # Buffered gcodes the command queue holds, counting each one in a batch
+    QUEUED_GCODES = 10
+
     def __init__(self, printer):
         self.printer = printer
 
@@ -130,16 +133,73 @@ class GCodeProcessor:
             logging.error(traceback.format_exc(sys.exc_info()[2]))
         return gcode
 
+    def batch_end(self, gcodes, start):
+        """
+        Return the end of the run of gcodes from start that can be given
+        to one execute_batch call, ie. consecutive G0/G1.
+        """
+        handler = self._batch_handler(gcodes[start])
+        end = start + 1
+        if handler is None:
+            return end
+        while end < len(gcodes) and self._batch_handler(gcodes[end]) is handler:
+            end += 1
+        return end
+
+    def _batch_handler(self, gcode):
+        command = self.gcodes.get(gcode.code())
+        return getattr(getattr(command, "execute_batch", None), "__func__", None)
+
+    def execute_batch(self, gcodes):
+        """ Execute a run of gcodes found with batch_end """
+        try:
+            self.gcodes[gcodes[0].code()].execute_batch(gcodes)
+        except Exception, e:
+            logging.error("Error while executing "+gcodes[0].code()+" batch: "+str(e))
+            logging.error(traceback.format_exc(sys.exc_info()[2]))
+        return gcodes
+
     def enqueue(self, gcode):
         # If an M116 is running, peek at the incoming Gcode
         if self.peek(gcode):
             return
         if self.printer.processor.is_buffered(gcode):     
+            self.printer.queued_gcodes.acquire()
             self.printer.commands.put(gcode)              
             if self.printer.processor.is_sync(gcode):     
                 self.printer.sync_commands.put(gcode)    # Yes, it goes into both queues!
         else:                                         
             self.printer.unbuffered_commands.put(gcode)  
+
+    def enqueue_batch(self, gcodes):
+        """
+        Enqueue gcodes that arrived in the same read. Consecutive buffered
+        commands are put on the command queue as one list, so a burst of
+        moves costs a single queue operation. The command queue holds up to
+        QUEUED_GCODES gcodes, when it is full the batch so far is put on it
+        before waiting for room.
+        """
+        batch = []
+        for gcode in gcodes:
+            if self.is_buffered(gcode) and not self.is_sync(gcode) \
+                    and not self.printer.running_M116:
+                if not self.printer.queued_gcodes.acquire(False):
+                    self._put_batch(batch)
+                    batch = []
+                    self.printer.queued_gcodes.acquire()
+                batch.append(gcode)
+                continue
+            self._put_batch(batch)
+            batch = []
+            self.enqueue(gcode)
+        self._put_batch(batch)
+
+    def _put_batch(self, batch):
+        """ The gcodes of the batch have their room in queued_gcodes """
+        if len(batch) == 1:
+            self.printer.commands.put(batch[0])
+        elif batch:
+            self.printer.commands.put(batch)
         
 
     def peek(self, gcode):
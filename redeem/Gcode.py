@@ -30,42 +30,50 @@ class Gcode:
     """ A command received from pronterface or whatever """
     line_number = 0
 
+    # N<line> <command>*<checksum>, parsed in a single match
+    _numbered_line = re.compile(r"N(\d+)\s*([^*]*)(?:\*(\d+))?")
+
     def __init__(self, packet):
         """ Init; parse the token """
         try:
-            self.message = packet["message"].split(";")[0]
-            self.message = self.message.strip(' \t\n\r')
-            self.prot = packet["prot"] if "prot" in packet else "None"
+            self.message = packet["message"].split(";", 1)[0].strip(' \t\n\r')
+            self.prot = packet.get("prot", "None")
             self.has_crc = False
             self.answer = "ok"
-            #print packet
-            if len(self.message) == 0:
-                #print packet
-                #logging.debug("Empty message")
+            self.tokens = []
+            self._values = {}
+            self._floats = {}
+            if not self.message:
                 self.gcode = "No-Gcode"
                 return
-            self.tokens = self.message.split(" ")
-            if self.tokens[0][0] == "N":  # Ok, checksum
-                line_num = re.findall(r"[\d]+", self.message)[0]
-                cmd = self.message.split("*")[0]  # Command
-                csc = self.message.split("*")[1]  # Command to compare with
-                if int(csc) != self._getCS(cmd):
+            if self.message[0] == "N":  # Ok, checksum
+                m = self._numbered_line.match(self.message)
+                cmd = self.message.split("*", 1)[0]  # Command
+                if m.group(3) is not None and int(m.group(3)) != self._getCS(cmd):
                     logging.error("CRC error!")
                 # Remove crc stuff
-                self.message = self.message.\
-                    split("*")[0][(1+len(line_num))::].strip(" ")
-                self.line_number = int(line_num)  # Set the line number
+                self.message = m.group(2).strip(" ")
+                self.line_number = int(m.group(1))  # Set the line number
                 Gcode.line_number += 1  # Increase the global counter
                 self.has_crc = True
 
             # Parse
-            self.tokens = self.message.split(" ")
+            self.tokens = self.message.split()
             self.gcode = self.tokens.pop(0)  # gcode number
-            self.tokens = filter(None, self.tokens)
+            self._index_tokens()
         except Exception as e:
             self.gcode = "No-Gcode"
             logging.exception("Ooops: ")
 
+    def _index_tokens(self):
+        """ Build the letter -> value lookup. The first token wins """
+        values = {}
+        for token in self.tokens:
+            if token[0] not in values:
+                values[token[0]] = token[1:]
+        self._values = values
+        self._floats = {}
+
     def code(self):
         """ The machinecode """
         return self.gcode
@@ -88,44 +96,38 @@ class Gcode:
     def set_tokens(self, tokens):
         """ Set the tokens """
         self.tokens = tokens
+        self._index_tokens()
 
     def has_letter(self, letter):
         """ Check if the letter exists as token """
-        for token in self.tokens:
-            if token[0] == letter:
-                return True
-        return False
+        return letter in self._values
 
     def get_value_by_letter(self, letter):
-        for token in self.tokens:
-            if token[0] == letter:
-                return token[1::]
-        return None
+        return self._values.get(letter)
 
     def get_float_by_letter(self, letter, default):
-        if self.has_letter(letter):
-            if self.has_letter_value(letter):
-                return float(self.get_value_by_letter(letter))
-        return default
+        """ Get a float or return a default value. The result is cached """
+        f = self._floats.get(letter)
+        if f is None:
+            value = self._values.get(letter)
+            if not value:
+                return default
+            f = self._floats[letter] = float(value)
+        return f
 
     def get_int_by_letter(self, letter, default):
         """ Get an int or return a default value """
         if self.has_letter(letter):
             # Convert to float first since Cura 2.1 sends M104 as 255.0
-            return int(float(self.get_value_by_letter(letter)))
+            return int(self.get_float_by_letter(letter, default))
         return int(default)
 
     def has_letter_value(self, letter):
-        for token in self.tokens:
-            if token[0] == letter:
-                if len(token) > 1:
-                    return True
-        return False
+        return bool(self._values.get(letter))
 
     def remove_token_by_letter(self, letter):
-        for i, token in enumerate(self.tokens):
-            if token[0] == letter:
-                self.tokens.pop(i)
+        self.tokens = [token for token in self.tokens if token[0] != letter]
+        self._index_tokens()
 
     def num_tokens(self):
         return len(self.tokens)
@@ -134,7 +136,6 @@ class Gcode:
         """ Return the remaining tokans as a dict"""
         return {t[0]: t[1:] for t in self.get_tokens()}
 
-
     def _getCS(self, cmd):
         """ Compute a Checksum of the letters in the command """
         cs = 0
@@ -0,0 +1,72 @@
+#!/usr/bin/env python
+"""
+LineBuffer - Drains a file descriptor or socket in one read and
+splits the data into complete lines. A partial line at the end of
+a read is kept until the rest of it arrives.
+
+License: GNU GPL v3: http://www.gnu.org/copyleft/gpl.html
+
+ Redeem is free software: you can redistribute it and/or modify
+ it under the terms of the GNU General Public License as published by
+ the Free Software Foundation, either version 3 of the License, or
+ (at your option) any later version.
+
+ Redeem is distributed in the hope that it will be useful,
+ but WITHOUT ANY WARRANTY; without even the implied warranty of
+ MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+ GNU General Public License for more details.
+
+ You should have received a copy of the GNU General Public License
+ along with Redeem.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import os
+
+try:
+    from Gcode import Gcode
+except ImportError:
+    from redeem.Gcode import Gcode
+
+
+class LineBuffer:
+
+    READ_SIZE = 4096
+
+    def __init__(self, prot):
+        self.prot = prot
+        self.partial = ""
+        self.eof = False
+
+    def feed(self, data):
+        """ Add data to the buffer, return the complete lines in it """
+        if not data:
+            return []
+        lines = (self.partial + data).split("\n")
+        self.partial = lines.pop()
+        return lines
+
+    def read_fd(self, fd):
+        """ Read everything available from a readable fd """
+        data = os.read(fd, LineBuffer.READ_SIZE)
+        self.eof = (data == "")
+        return self.feed(data)
+
+    def read_socket(self, sock):
+        """ Read everything available from a readable socket """
+        data = sock.recv(LineBuffer.READ_SIZE)
+        self.eof = (data == "")
+        return self.feed(data)
+
+    def to_gcodes(self, lines):
+        """ Make Gcodes of the non-empty lines """
+        gcodes = []
+        for line in lines:
+            line = line.rstrip()
+            if line:
+                gcodes.append(Gcode({"message": line, "prot": self.prot}))
+        return gcodes
+
+    def reset(self):
+        """ Drop any partial line, ie. when the peer reconnects """
+        self.partial = ""
+        self.eof = False
@@ -24,6 +24,8 @@ License: GNU GPL v3: http://www.gnu.org/copyleft/gpl.html
 from Adafruit_I2C import Adafruit_I2C 
 import time
 import subprocess
+from contextlib import contextmanager
+from threading import Lock
 
 
 class PWM(object):
@@ -33,6 +35,22 @@ class PWM(object):
 
     PCA9685_MODE1 = 0x0
     PCA9685_PRESCALE = 0xFE
+    PCA9685_LED0 = 0x06
+
+    # Channels the PCA9685 takes in one auto-increment write, 32 bytes for SMBus
+    MAX_CHANNELS_PER_WRITE = 8
+
+    # Off times written to each channel, and those waiting for the end of a batch
+    lock = Lock()
+    written = {}
+    pending = {}
+    batch_depth = 0
+
+    # Bus use, see get_stats
+    writes = 0
+    bytes_written = 0
+    dropped = 0
+    bus_time = 0.0
 
     def __init__(self, channel):
         self.channel = channel
@@ -50,6 +68,7 @@ class PWM(object):
         else:
             PWM.i2c = Adafruit_I2C(0x70, 1, False)  # Open device
         PWM.i2c.write8(PWM.PCA9685_MODE1, 0x01)    # Reset
+        PWM.written = {}
 
 
     @staticmethod
@@ -76,10 +95,93 @@ class PWM(object):
 
     @staticmethod
     def set_value(value, channel):
-        """ Set the amount of on-time from 0..1 """
+        """ 
+        Set the amount of on-time from 0..1. The value is not sent if the
+        channel already has it, and waits for the end of the batch if one
+        is open, see batch.
+        """
         off = int(value*4095)
-        byte_list = [0x00, 0x00, off & 0xFF, off >> 8]
-        PWM.i2c.writeList(0x06+(4*channel), byte_list)
+        with PWM.lock:
+            if PWM.batch_depth:
+                PWM.pending[channel] = off
+            elif PWM.written.get(channel) == off:
+                PWM.dropped += 1
+            else:
+                PWM.__write({channel: off})
+
+    @staticmethod
+    @contextmanager
+    def batch():
+        """ 
+        Hold the values set in the block, from any thread, and send them
+        when the outermost batch ends, with one write for each run of
+        consecutive channels. Only the last value of a channel is sent.
+        """
+        with PWM.lock:
+            PWM.batch_depth += 1
+        try:
+            yield
+        finally:
+            with PWM.lock:
+                PWM.batch_depth -= 1
+                if not PWM.batch_depth and PWM.pending:
+                    offs = {}
+                    for channel, off in PWM.pending.iteritems():
+                        if PWM.written.get(channel) == off:
+                            PWM.dropped += 1
+                        else:
+                            offs[channel] = off
+                    PWM.pending = {}
+                    PWM.__write(offs)
+
+    @staticmethod
+    def __write(offs):
+        """ Write the off times of the channels, the lock must be held """
+        start = time.time()
+        channels = sorted(offs)
+        while channels:
+            first = channels[0]
+            n = 1
+            while (n < len(channels) and n < PWM.MAX_CHANNELS_PER_WRITE
+                   and channels[n] == first + n):
+                n += 1
+            byte_list = []
+            for channel in channels[:n]:
+                off = offs[channel]
+                byte_list += [0x00, 0x00, off & 0xFF, off >> 8]
+            # writeList returns -1 instead of raising when the write fails,
+            # the channels are then written again on their next set_value
+            if PWM.i2c.writeList(PWM.PCA9685_LED0+(4*first), byte_list) == -1:
+                for channel in channels[:n]:
+                    PWM.written.pop(channel, None)
+            else:
+                for channel in channels[:n]:
+                    PWM.written[channel] = offs[channel]
+            PWM.writes += 1
+            PWM.bytes_written += len(byte_list)
+            channels = channels[n:]
+        PWM.bus_time += time.time() - start
+
+    @staticmethod
+    def get_stats():
+        """ 
+        I2C use of the PWM chip: the writes and bytes of channel values,
+        the values not sent since the channel had them already and the
+        seconds spent writing 
+        """
+        with PWM.lock:
+            return {"writes": PWM.writes,
+                    "bytes": PWM.bytes_written,
+                    "dropped": PWM.dropped,
+                    "bus_time": PWM.bus_time}
+
+    @staticmethod
+    def reset_stats():
+        with PWM.lock:
+            PWM.writes = 0
+            PWM.bytes_written = 0
+            PWM.dropped = 0
+            PWM.bus_time = 0.0
 
 if __name__ == '__main__':
     import os
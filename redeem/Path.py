@@ -38,6 +38,14 @@ class Path:
 
     # Numpy array type used throughout    
     DTYPE = np.float64
+
+    # Option flags for PathPlanner.add_linear_move and add_moves,
+    # must match MOVE_FLAG_* in path_planner/PathPlanner.h
+    FLAG_CANCELABLE             = 1 << 0
+    FLAG_OPTIMIZE               = 1 << 1
+    FLAG_SOFT_ENDSTOPS          = 1 << 2
+    FLAG_BED_MATRIX             = 1 << 3
+    FLAG_BACKLASH_COMPENSATION  = 1 << 4
     
     def __init__(self, axes, speed, accel, cancelable=False, use_bed_matrix=True, use_backlash_compensation=True, enable_soft_endstops=True):
         """ The axes of evil, the feed rate in m/s and ABS or REL """
@@ -77,89 +85,11 @@ class Path:
         return
 
     def needs_splitting(self):
-        #return False
-        """ Return true if this is a radius """
+        """ Return true if this is an arc, the native planner splits
+        those in linear segments """
         if self.movement == Path.G2 or self.movement == Path.G3:
             return True
 
-    def get_segments(self):
-        """ Returns split segments for delta or arcs """
-        if self.movement == Path.G2 or self.movement == Path.G3:
-            return self.get_arc_segments()
-
-    def parametric_circle(self, t, xc, yc, R):
-        x = xc + R*np.cos(t)
-        y = yc + R*np.sin(t)
-        return x,y
-
-    def inv_parametric_circle(self, x, xc, R):
-        t = np.arccos((x-xc)/R)
-        return t
-        
-
-    def get_arc_segments(self):
-        # The code in this function was taken from 
-        # http://stackoverflow.com/questions/11331854/how-can-i-generate-an-arc-in-numpy
-        start_point = self.prev.ideal_end_pos[:2]
-        end_point   = self.ideal_end_pos[:2]
-
-        i = self.I
-        j = self.J
-
-        # Find radius
-        R = np.sqrt(i**2 + j**2)
-
-        #logging.info(start_point)
-        #logging.info(end_point)
-        #logging.info(R)
-
-
-        # Find start and end points
-        start_t = self.inv_parametric_circle(start_point[0], start_point[0]+i, R)
-        end_t   = self.inv_parametric_circle(end_point[0], start_point[0]+i, R)
-
-        num_segments = np.ceil(np.abs(end_t-start_t)/self.split_size)+1
-
-
-        # TODO: test this, it is probably wrong. 
-        if self.movement == G2: 
-            arc_T = np.linspace(start_t, end_t, num_segments)
-        else:        
-            arc_T = np.linspace(end_t, start_t, num_segments)
-        X,Y = self.parametric_circle(arc_T, start_point[0]+i, start_point[1]+j, R)
-    
-        #logging.info([X, Y])
-        
-        # Interpolate the remaining values
-        vals = np.transpose([
-                    np.linspace(
-                        self.prev.ideal_end_pos[i], 
-                        self.ideal_end_pos[i], 
-                        num_segments
-                        ) for i in xrange(self.printer.MAX_AXES)]) 
-
-        # Update the X and Y positions
-        for i, val in enumerate(vals):
-            val[:2] = (X[i], Y[i])
-        vals = np.delete(vals, 0, axis=0)
-
-        vec_segments = [dict(zip(self.printer.axes_zipped, list(val))) for val in vals]
-        path_segments = []
-
-        for index, segment in enumerate(vec_segments):
-            #print segment
-            path = AbsolutePath(segment, self.speed, self.accel, self.cancelable, self.use_bed_matrix, False) #
-            if index is not 0:
-                path.set_prev(path_segments[-1])
-            else:
-                path.set_prev(self.prev)
-            path_segments.append(path)
-
-        #for seg in path_segments:
-        #    logging.info(seg)
- 
-        return path_segments
-
     def __str__(self):
         """ The vector representation of this path segment """
         return "Path from " + str(self.start_pos[:4]) + " to " + str(self.end_pos[:4])
@@ -30,6 +30,7 @@ from Delta import Delta
 from Printer import Printer
 import numpy as np
 from PruInterface import PruInterface
+from ShiftRegister import ShiftRegister
 from BedCompensation import BedCompensation
 from DeltaAutoCalibration import delta_auto_calibration
 
@@ -60,6 +61,11 @@ class PathPlanner:
         self.home_pos       = {"X": 0.0, "Y": 0.0, "Z": 0.0, "E": 0.0, "H": 0.0, "A": 0.0, "B": 0.0, "C": 0.0}
         self.prev   = G92Path({"X": 0.0, "Y": 0.0, "Z": 0.0, "E": 0.0, "H": 0.0, "A": 0.0, "B": 0.0, "C": 0.0}, 0)
         self.prev.set_prev(None)
+        # True when moves have been queued with add_linear_move since
+        # self.prev was last updated. See _sync_prev()
+        self.prev_is_stale = False
+        self.axis_index = {axis: i for i, axis in enumerate(Printer.AXES)}
+        self.native_bed_matrix = None
 
         if pru_firmware:
             self.__init_path_planner()
@@ -70,28 +76,47 @@ class PathPlanner:
         self.printer.check_values()
 
     def __init_path_planner(self):
+        self._sync_prev()
         self.native_planner = PathPlannerNative(int(self.printer.move_cache_size))
 
-        fw0 = self.pru_firmware.get_firmware(0)
-        fw1 = self.pru_firmware.get_firmware(1)
+        if self.printer.config.getboolean('System', 'simulate_pru'):
+            logging.info("Using a simulated PRU")
+            if not self.native_planner.initSimulatedPRU(
+                    self.printer.config.get('System', 'simulate_pru_trace'),
+                    self.printer.config.getfloat('System', 'simulate_pru_speed')):
+                logging.error("Unable to start the simulated PRU")
+                return
+        else:
+            fw0 = self.pru_firmware.get_firmware(0)
+            fw1 = self.pru_firmware.get_firmware(1)
 
-        if fw0 is None or fw1 is None:
-            return
+            if fw0 is None or fw1 is None:
+                return
 
-        self.native_planner.initPRU(fw0, fw1)
+            self.native_planner.initPRU(fw0, fw1)
         
         self.native_planner.setAxisStepsPerMeter(tuple(self.printer.steps_pr_meter))
         self.native_planner.setMaxSpeeds(tuple(self.printer.max_speeds))	
         self.native_planner.setMinSpeeds(tuple(self.printer.min_speeds))	
         self.native_planner.setAcceleration(tuple(self.printer.acceleration))
         self.native_planner.setJerks(tuple(self.printer.jerks))
+        self.native_planner.setJunctionDeviation(self.printer.junction_deviation)
+        self.native_planner.setSCurveJerks(tuple(self.printer.s_curve_jerks))
+        self.native_planner.setPressureAdvance(tuple(self.printer.pressure_advance))
+        for i, shaper in enumerate(self.printer.input_shaper):
+            self.native_planner.setInputShaper(i, Printer.INPUT_SHAPERS.index(shaper),
+                                               self.printer.input_shaper_frequency[i],
+                                               self.printer.input_shaper_damping[i])
         self.native_planner.setPrintMoveBufferWait(int(self.printer.print_move_buffer_wait))
         self.native_planner.setMinBufferedMoveTime(int(self.printer.min_buffered_move_time))
         self.native_planner.setMaxBufferedMoveTime(int(self.printer.max_buffered_move_time))
         self.native_planner.setSoftEndstopsMin(tuple(self.printer.soft_min))
         self.native_planner.setSoftEndstopsMax(tuple(self.printer.soft_max))
-        self.native_planner.setBedCompensationMatrix(tuple(np.identity(3).ravel()))
+        self.update_bed_matrix()
         self.native_planner.setMaxPathLength(self.printer.max_length)
+        self.native_planner.setDeltaMaxDeviation(self.printer.delta_max_deviation)
+        self.native_planner.setArcSegmentation(self.printer.arc_chord_error,
+                                               self.printer.arc_max_segment_length)
         self.native_planner.setAxisConfig(self.printer.axis_config)
         self.native_planner.delta_bot.setMainDimensions(Delta.Hez, Delta.L, Delta.r)
         self.native_planner.delta_bot.setEffectorOffset(Delta.Ae, Delta.Be, Delta.Ce)
@@ -100,7 +125,8 @@ class PathPlanner:
         self.native_planner.delta_bot.recalculate()
         self.configure_slaves()
         self.native_planner.setBacklashCompensation(tuple(self.printer.backlash_compensation));
-        self.native_planner.setState(self.prev.end_pos)
+        self.native_planner.setState(tuple(self.prev.end_pos))
+        self.native_planner.setIdealState(tuple(self.prev.ideal_end_pos))
         self.printer.plugins.path_planner_initialized(self)
         self.native_planner.runThread()
 
@@ -123,6 +149,14 @@ class PathPlanner:
         """ Update steps pr meter from the path """
         self.native_planner.setAxisStepsPerMeter(tuple(self.printer.steps_pr_meter))
         
+    def update_bed_matrix(self):
+        """ Push the bed compensation matrix to the native planner """
+        # Python applies the matrix as a row vector, ie. pos.dot(M),
+        # the native planner as M*pos. Hence the transpose.
+        self.native_bed_matrix = self.printer.matrix_bed_comp
+        self.native_planner.setBedCompensationMatrix(
+            tuple(np.transpose(self.native_bed_matrix).ravel()))
+
     def update_backlash(self):
         """ Update steps pr meter from the path """
         self.native_planner.setBacklashCompensation(tuple(self.printer.backlash_compensation));
@@ -135,7 +169,7 @@ class PathPlanner:
             scale = 1.0
         state = self.native_planner.getState()
         if ideal:
-            state = self.prev.ideal_end_pos
+            state = self.native_planner.getIdealState()
         pos = {}
         for index, axis in enumerate(Printer.AXES[:Printer.MAX_AXES]):
             pos[axis] = state[index]*scale
@@ -150,6 +184,29 @@ class PathPlanner:
         """ Wait until the queue is empty """
         self.native_planner.waitUntilFinished()
 
+    def get_telemetry(self):
+        """
+        Counters of the native planner, to tell if a stutter comes from the
+        host, the planner or the PRU. Times are in seconds.
+        """
+        n = self.native_planner
+        return {
+            "underruns": n.getUnderrunCount(),
+            "min_buffered_ticks": n.getMinBufferedTicks(),
+            "line_wait_time": n.getLineWaitTime(),
+            "line_space_wait_time": n.getLineSpaceWaitTime(),
+            "pru_wait_time": n.getPruWaitTime(),
+            "ddr_bytes_in_flight": n.getDDRBytesInFlight(),
+            "ddr_time_in_flight": n.getDDRTimeInFlight(),
+            "ddr_bytes_done": n.getDDRBytesDone(),
+            "pru_move_time": n.getPruMoveTime(),
+            "arcs": n.getArcCount(),
+            "arc_segments": n.getArcSegmentCount()}
+
+    def reset_telemetry(self):
+        """ Restart the telemetry counters, ie. before a print """
+        self.native_planner.resetTelemetry()
+
     def wait_until_sync_event(self):
         """ Blocks until a PRU sync event occurs """
         return (self.native_planner.waitUntilSyncEvent() > 0)
@@ -170,8 +227,9 @@ class PathPlanner:
         # Note: This method has to be thread safe as it can be called from the
         # command thread directly or from the command queue thread
         self.native_planner.suspend()
-        for name, stepper in self.printer.steppers.iteritems():
-            stepper.set_disabled(True)
+        with ShiftRegister.batch():
+            for name, stepper in self.printer.steppers.iteritems():
+                stepper.set_disabled(True)
 
         #Create a new path planner to have everything clean when it restarts
         self.native_planner.stopThread(True)
@@ -373,9 +431,10 @@ class PathPlanner:
         self.add_path(path)
         self.wait_until_done()
 
-        # get the number of steps that we haven't done 
-        steps_remaining = PruInterface.get_steps_remaining()
-        logging.debug("Steps remaining : "+str(steps_remaining))
+        # get the number of steps that we haven't done and whether the 
+        # probe was hit, from the same read of the shared RAM
+        endstop_states, _, _, _, steps_remaining = PruInterface.get_shared_state()
+        logging.debug("Steps remaining : "+str(steps_remaining)+", end stops : "+bin(endstop_states))
 
         # Calculate how many steps the Z axis moved
         steps -= steps_remaining
@@ -431,9 +490,139 @@ class PathPlanner:
         return params
 
 
+    def _sync_prev(self):
+        """ Update self.prev with the position moves from add_linear_move
+        have brought us to """
+        if self.prev_is_stale:
+            self.prev.end_pos = self.native_planner.getState()
+            self.prev.ideal_end_pos = np.array(
+                self.native_planner.getIdealState(), dtype=Path.DTYPE)
+            self.prev_is_stale = False
+
+    def _sync_bed_matrix(self):
+        if self.printer.matrix_bed_comp is not self.native_bed_matrix:
+            self.update_bed_matrix()
+
+    def add_linear_move(self, axes, speed, accel, movement):
+        """
+        Add a G0/G1 move without making a Path object. The native planner
+        resolves absolute, relative and mixed positions and the bed
+        matrix the same way AbsolutePath, RelativePath and MixedPath do.
+        axes is a dict of axis letter to position or distance in meters.
+        """
+        self._sync_bed_matrix()
+        axis_mask, values, relative_mask = self._axis_values(axes, movement)
+
+        flags = Path.FLAG_SOFT_ENDSTOPS | Path.FLAG_BACKLASH_COMPENSATION
+        if movement != Path.RELATIVE:
+            flags |= Path.FLAG_OPTIMIZE | Path.FLAG_BED_MATRIX
+
+        self.printer.ensure_steppers_enabled()
+        self.native_planner.setAxisConfig(int(self.printer.axis_config))
+        self.native_planner.queueLinearMove(
+            axis_mask, values, speed, accel, movement, relative_mask,
+            flags, self.axis_index[self.printer.current_tool])
+        self.prev_is_stale = True
+
+    def add_arc(self, axes, i, j, clockwise, speed, accel, movement, flags=None):
+        """
+        Add a G2/G3 arc in the XY plane. The native planner resolves the
+        end position like for add_linear_move and splits the arc in
+        segments no further than arc_chord_error from it and no longer than
+        arc_max_segment_length. i and j are the offsets of the center from
+        the start in meters.
+        """
+        self._sync_bed_matrix()
+        axis_mask, values, relative_mask = self._axis_values(axes, movement)
+
+        if flags is None:
+            flags = (Path.FLAG_SOFT_ENDSTOPS | Path.FLAG_BACKLASH_COMPENSATION |
+                     Path.FLAG_OPTIMIZE | Path.FLAG_BED_MATRIX)
+
+        self.printer.ensure_steppers_enabled()
+        self.native_planner.setAxisConfig(int(self.printer.axis_config))
+        self.native_planner.queueArc(
+            axis_mask, values, i, j, bool(clockwise), speed, accel, movement, relative_mask,
+            flags, self.axis_index[self.printer.current_tool])
+        self.prev_is_stale = True
+
+    def _axis_values(self, axes, movement):
+        """ The axis mask, values and relative mask of a move for the native planner """
+        axis_mask = 0
+        values = [0.0]*Printer.MAX_AXES
+        for axis, value in axes.iteritems():
+            index = self.axis_index.get(axis)
+            if index is not None:
+                axis_mask |= 1 << index
+                values[index] = value
+
+        relative_mask = 0
+        if movement == Path.MIXED:
+            for axis in self.printer.axes_relative:
+                relative_mask |= 1 << self.axis_index[axis]
+        return axis_mask, tuple(values), relative_mask
+
+    def add_linear_moves(self, moves, movement):
+        """
+        Add a run of G0/G1 moves with one call into the native planner.
+        moves is a list of (axes, speed, accel) as for add_linear_move.
+        Relative moves start from where the previous move really ended,
+        so they can't be resolved up front and are queued one by one.
+        """
+        if movement == Path.RELATIVE:
+            for axes, speed, accel in moves:
+                self.add_linear_move(axes, speed, accel, movement)
+            return
+
+        relative = self.printer.axes_relative if movement == Path.MIXED else []
+        position = list(self.native_planner.getIdealState())
+        positions = np.empty((len(moves), Printer.MAX_AXES), dtype=Path.DTYPE)
+        speeds = np.empty(len(moves), dtype=Path.DTYPE)
+        accels = np.empty(len(moves), dtype=Path.DTYPE)
+        for row, (axes, speed, accel) in enumerate(moves):
+            for axis, value in axes.iteritems():
+                index = self.axis_index.get(axis)
+                if index is None:
+                    continue
+                if axis in relative:
+                    position[index] += value
+                else:
+                    position[index] = value
+            positions[row] = position
+            speeds[row] = speed
+            accels[row] = accel
+
+        flags = (Path.FLAG_SOFT_ENDSTOPS | Path.FLAG_BACKLASH_COMPENSATION |
+                 Path.FLAG_OPTIMIZE | Path.FLAG_BED_MATRIX)
+        self.add_moves(positions, speeds, accels, flags)
+
+    def add_moves(self, positions, speeds, accels, flags):
+        """
+        Queue a batch of moves to absolute positions in one call into the
+        native planner. positions is an N x MAX_AXES array of ideal
+        positions in meters, the bed matrix is applied if the flags say
+        so. speeds, accels and flags are either one value per row or a
+        single value for all of them.
+        """
+        positions = np.ascontiguousarray(positions, dtype=Path.DTYPE)
+        rows = len(positions)
+        speeds = np.resize(np.asarray(speeds, dtype=Path.DTYPE), rows)
+        accels = np.resize(np.asarray(accels, dtype=Path.DTYPE), rows)
+        flags = np.resize(np.asarray(flags, dtype=np.intc), rows)
+
+        self._sync_bed_matrix()
+        self.printer.ensure_steppers_enabled()
+        self.native_planner.setAxisConfig(int(self.printer.axis_config))
+        self.native_planner.queueMoves(
+            positions, speeds, accels, flags,
+            self.axis_index[self.printer.current_tool])
+        self.prev_is_stale = True
+
     def add_path(self, new):
         """ Add a path segment to the path planner """
         """ This code, and the native planner, needs to be updated for reach. """
+        self._sync_prev()
+
         # Link to the previous segment in the chain    
         new.set_prev(self.prev)
         
@@ -443,14 +632,18 @@ class PathPlanner:
         if new.is_G92():
             self.native_planner.setState(tuple(new.end_pos))
         elif new.needs_splitting():
-            #TODO: move this to C++
-            # this branch splits up any G2 or G3 movements (arcs)
-            # should be moved to C++ as it is math heavy
-            # need to convert it to linear segments before feeding to the queue
-            # as we want to keep the queue only dealing with linear stuff for simplicity
-            for seg in new.get_segments():
-                self.add_path(seg)
-            
+            # G2 or G3, the native planner splits it in linear segments
+            flags = Path.FLAG_SOFT_ENDSTOPS | Path.FLAG_OPTIMIZE
+            if new.cancelable:
+                flags |= Path.FLAG_CANCELABLE
+            if new.use_bed_matrix:
+                flags |= Path.FLAG_BED_MATRIX
+            if new.use_backlash_compensation:
+                flags |= Path.FLAG_BACKLASH_COMPENSATION
+            end = dict(zip(Printer.AXES, new.ideal_end_pos))
+            self.add_arc(end, new.I, new.J, new.movement == Path.G2,
+                         new.speed, new.accel, Path.ABSOLUTE, flags)
+
         else:
             self.printer.ensure_steppers_enabled() 
             
@@ -479,6 +672,7 @@ class PathPlanner:
         
         # make sure that the current state of the printer is correct
         self.prev.end_pos = self.native_planner.getState()
+        self.native_planner.setIdealState(tuple(self.prev.ideal_end_pos))
         #logging.debug("end pos: "+ str(self.prev.end_pos))
 
     def set_extruder(self, ext_nr):
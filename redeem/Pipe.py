@@ -29,7 +29,7 @@ import logging
 import subprocess
 import time
 import os
-from Gcode import Gcode
+from LineBuffer import LineBuffer
 
 
 class Pipe:
@@ -72,6 +72,7 @@ class Pipe:
         logging.info("Pipe " + self.prot + " open. Use '" + pipe_1 + "' to "
                      "communicate with it")
 
+        self.buffer = LineBuffer(self.prot)
         self.running = True
         self.t = Thread(target=self.get_message, name="Pipe")
         self.send_response = True
@@ -83,11 +84,12 @@ class Pipe:
             r, w, x = select.select([self.rd], [], [], 1.0)
             if r:
                 try:
-                    message = self.rd.readline().rstrip()                
-                    if len(message) > 0:
-                        g = Gcode({"message": message, "prot": self.prot})
-                        self.printer.processor.enqueue(g)
-                except IOError:
+                    # Drain everything that is available in one read
+                    gcodes = self.buffer.to_gcodes(
+                        self.buffer.read_fd(self.rd.fileno()))
+                    if gcodes:
+                        self.printer.processor.enqueue_batch(gcodes)
+                except (IOError, OSError):
                     logging.warning("Could not read from pipe")
 
     def send_message(self, message):
@@ -25,6 +25,7 @@ import numpy as np
 import logging
 from Delta import Delta
 from PruInterface import PruInterface
+from ShiftRegister import ShiftRegister
 import os
 import json
 
@@ -39,6 +40,13 @@ class Printer:
     AXIS_CONFIG_CORE_XY = 2
     AXIS_CONFIG_DELTA   = 3
 
+    # Input shapers, in the order of INPUT_SHAPER_* in path_planner/InputShaper.h
+    INPUT_SHAPERS = ["none", "zv", "zvd", "mzv"]
+
+    # Bumped by Stepper each time a stepper is enabled or disabled, has its
+    # current enabled or disabled or is put in or out of use
+    stepper_generation = 0
+
     def __init__(self):
         self.config_location = None
         self.steppers    = {}
@@ -68,6 +76,12 @@ class Printer:
         self.max_buffered_move_time = 1000
 
         self.max_length = 0.001
+        self.delta_max_deviation = 0.0
+        self.junction_deviation = 0.0
+        # Largest distance between an arc and its segments in m
+        self.arc_chord_error = 0.00001
+        # Longest arc segment in m
+        self.arc_max_segment_length = 0.002
 
         self.probe_points  = []
         self.probe_heights = [0, 0, 0]
@@ -79,6 +93,11 @@ class Printer:
         self.max_speeds             = np.ones(self.num_axes)
         self.min_speeds             = np.ones(self.num_axes)*0.01
         self.jerks                  = np.ones(self.num_axes)*0.01
+        self.s_curve_jerks          = np.zeros(self.num_axes)
+        self.pressure_advance       = np.zeros(self.num_axes)
+        self.input_shaper           = ["none", "none"]  # X and Y
+        self.input_shaper_frequency = [0.0, 0.0]
+        self.input_shaper_damping   = [0.1, 0.1]
         self.acceleration           = [0.3]*self.num_axes
         self.home_speed             = np.ones(self.num_axes)
         self.home_backoff_speed     = np.ones(self.num_axes)
@@ -90,6 +109,9 @@ class Printer:
         self.soft_max               = np.ones(self.num_axes)*1000.0
         self.slaves                 = {key: "" for key in self.AXES[:self.num_axes]}
 
+        # stepper_generation when the steppers were last checked
+        self.steppers_checked       = None
+
         # bed compensation
         self.matrix_bed_comp = np.eye((3))
 
@@ -128,18 +150,24 @@ class Printer:
     def ensure_steppers_enabled(self):
         """
         This method is called for every move, so it should be fast/cached.
+        The steppers are only checked after one of them changed.
         """
         # Reset Stepper watchdog
         self.swd.reset()
-        # Enabe steppers
-        for name, stepper in self.steppers.iteritems():
-            if stepper.in_use:
-                if not stepper.enabled:
-                    # Stepper should be enabled, but is not.
-                    stepper.set_enabled(True)  # Force update
-                if not stepper.current_enabled:
-                    # Stepper does not have current enabled.
-                    stepper.set_current_enabled()  # Force update
+        generation = Printer.stepper_generation
+        if generation == self.steppers_checked:
+            return
+        # Enabe steppers, with one SPI transfer for all of them
+        with ShiftRegister.batch():
+            for name, stepper in self.steppers.iteritems():
+                if stepper.in_use:
+                    if not stepper.enabled:
+                        # Stepper should be enabled, but is not.
+                        stepper.set_enabled(True)  # Force update
+                    if not stepper.current_enabled:
+                        # Stepper does not have current enabled.
+                        stepper.set_current_enabled()  # Force update
+        self.steppers_checked = generation
                 
 
     def reply(self, gcode):
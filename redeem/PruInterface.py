@@ -22,6 +22,7 @@ License: GNU GPL v3: http://www.gnu.org/copyleft/gpl.html
 
 import os
 import logging
+import threading
 
 import struct
 import mmap
@@ -29,25 +30,65 @@ import mmap
 PRU_ICSS = 0x4A300000 
 PRU_ICSS_LEN = 512*1024
 SHARED_RAM_START = 0x00012000
+SHARED_RAM_LEN = 12*1024
+
+# Words the firmwares share with us, from the start of the shared RAM:
+# endstop states, endstop direction masks, active endstops, step mask and
+# steps remaining after a cancelled move
+SHARED_WORDS = 5
+SHARED_WORD = struct.Struct("<I")
+SHARED_STATE = struct.Struct("<{}I".format(SHARED_WORDS))
 
-# 
 
 class PruInterface:
+    """
+    The shared RAM of the PRUs stays mapped from the first access on, see
+    open(). Another file than /dev/mem can be given, ie. for tests.
+    """
+    mem = None
+    lock = threading.Lock()
+
+    @staticmethod
+    def open(mem_file="/dev/mem", offset=PRU_ICSS+SHARED_RAM_START):
+        """ Map SHARED_RAM_LEN bytes of mem_file from offset as the shared RAM """
+        with PruInterface.lock:
+            if PruInterface.mem is not None:
+                PruInterface.mem.close()
+            with open(mem_file, "r+b") as f:
+                PruInterface.mem = mmap.mmap(f.fileno(), SHARED_RAM_LEN, offset=offset)
+        return PruInterface.mem
+
+    @staticmethod
+    def close():
+        with PruInterface.lock:
+            if PruInterface.mem is not None:
+                PruInterface.mem.close()
+                PruInterface.mem = None
+
+    @staticmethod
+    def shared_ram():
+        mem = PruInterface.mem
+        if mem is None:
+            mem = PruInterface.open()
+        return mem
+
     @staticmethod
     def get_shared_long(offset):
-        lon = [-1]
-        with open("/dev/mem", "r+b") as f:
-            ddr_mem = mmap.mmap(f.fileno(), PRU_ICSS_LEN, offset=PRU_ICSS)
-            lon = struct.unpack('L', ddr_mem[SHARED_RAM_START+offset:SHARED_RAM_START + offset + 4])
-        return lon[0]
+        return SHARED_WORD.unpack_from(PruInterface.shared_ram(), offset)[0]
         
     @staticmethod
     def set_shared_long(offset, L):
-        with open("/dev/mem", "r+b") as f:
-            ddr_mem = mmap.mmap(f.fileno(), PRU_ICSS_LEN, offset=PRU_ICSS)
-            lon = struct.pack('L', L)
-            ddr_mem[SHARED_RAM_START+offset:SHARED_RAM_START + offset + 4] = lon
+        SHARED_WORD.pack_into(PruInterface.shared_ram(), offset, L)
         return
+
+    @staticmethod
+    def get_shared_state():
+        """ All the words the firmwares share, read at once """
+        return SHARED_STATE.unpack_from(PruInterface.shared_ram(), 0)
+
+    @staticmethod
+    def get_endstop_states():
+        return PruInterface.get_shared_long(0)
         
     @staticmethod
     def set_active_endstops(L):
@@ -57,9 +98,3 @@ class PruInterface:
     @staticmethod
     def get_steps_remaining():
         return PruInterface.get_shared_long(16)
-        
-#        with open("/dev/mem", "r+b") as f:	       
-#            ddr_mem = mmap.mmap(f.fileno(), PRU_ICSS_LEN, offset=PRU_ICSS) 
-#            shared = struct.unpack('LLLL', ddr_mem[SHARED_RAM_START:SHARED_RAM_START+16])
-#            steps_remaining = shared[3]
-#        return steps_remaining
\ No newline at end of file
@@ -30,7 +30,7 @@ import os
 import os.path
 import signal
 import threading
-from threading import Thread
+from threading import Thread, BoundedSemaphore
 from multiprocessing import JoinableQueue
 import Queue
 import numpy as np
@@ -51,6 +51,7 @@ from Path import Path
 from PathPlanner import PathPlanner
 from ColdEnd import ColdEnd
 from PruFirmware import PruFirmware
+from PruInterface import PruInterface
 from CascadingConfigParser import CascadingConfigParser
 from Printer import Printer
 from GCodeProcessor import GCodeProcessor
@@ -62,6 +63,7 @@ from RotaryEncoder import *
 from FilamentSensor import *
 from Alarm import Alarm, AlarmExecutor
 from StepperWatchdog import StepperWatchdog
+from ThermalLoop import ThermalLoop
 from Key_pin import Key_pin, Key_pin_listener
 from Watchdog import Watchdog
 
@@ -228,21 +230,22 @@ class Redeem:
 
         # Enable the steppers and set the current, steps pr mm and
         # microstepping
-        for name, stepper in self.printer.steppers.iteritems():
-            stepper.in_use = printer.config.getboolean('Steppers', 'in_use_' + name)
-            stepper.direction = printer.config.getint('Steppers', 'direction_' + name)
-            stepper.has_endstop = printer.config.getboolean('Endstops', 'has_' + name)
-            stepper.set_current_value(printer.config.getfloat('Steppers', 'current_' + name))
-            stepper.set_steps_pr_mm(printer.config.getfloat('Steppers', 'steps_pr_mm_' + name))
-            stepper.set_microstepping(printer.config.getint('Steppers', 'microstepping_' + name))
-            stepper.set_decay(printer.config.getint("Steppers", "slow_decay_" + name))
-            # Add soft end stops
-            printer.soft_min[Printer.axis_to_index(name)] = printer.config.getfloat('Endstops', 'soft_end_stop_min_' + name)
-            printer.soft_max[Printer.axis_to_index(name)] = printer.config.getfloat('Endstops', 'soft_end_stop_max_' + name)
-            slave = printer.config.get('Steppers', 'slave_' + name)
-            if slave:
-                printer.add_slave(name, slave)
-                logging.debug("Axis "+name+" has slave "+slave)
+        with Stepper.batch():
+            for name, stepper in self.printer.steppers.iteritems():
+                stepper.in_use = printer.config.getboolean('Steppers', 'in_use_' + name)
+                stepper.direction = printer.config.getint('Steppers', 'direction_' + name)
+                stepper.has_endstop = printer.config.getboolean('Endstops', 'has_' + name)
+                stepper.set_current_value(printer.config.getfloat('Steppers', 'current_' + name))
+                stepper.set_steps_pr_mm(printer.config.getfloat('Steppers', 'steps_pr_mm_' + name))
+                stepper.set_microstepping(printer.config.getint('Steppers', 'microstepping_' + name))
+                stepper.set_decay(printer.config.getint("Steppers", "slow_decay_" + name))
+                # Add soft end stops
+                printer.soft_min[Printer.axis_to_index(name)] = printer.config.getfloat('Endstops', 'soft_end_stop_min_' + name)
+                printer.soft_max[Printer.axis_to_index(name)] = printer.config.getfloat('Endstops', 'soft_end_stop_max_' + name)
+                slave = printer.config.get('Steppers', 'slave_' + name)
+                if slave:
+                    printer.add_slave(name, slave)
+                    logging.debug("Axis "+name+" has slave "+slave)
 
         # Commit changes for the Steppers
         #Stepper.commit()
@@ -389,6 +392,21 @@ class Redeem:
                         printer.coolers.append(c)
                         logging.info("Cooler connects temp sensor ds18b20 {} with fan {}".format(ce, f))
 
+        # Run the heaters and coolers in one thread. Reading a DS18B20 takes
+        # most of a second, so the coolers on cold ends get a thread of their own
+        printer.thermal_loop = ThermalLoop("ThermalLoop")
+        printer.cold_end_loop = ThermalLoop("ColdEndLoop")
+        for e in heaters:
+            printer.thermal_loop.add(self.printer.heaters[e])
+        for c in printer.coolers:
+            if isinstance(c.cold_end, ColdEnd):
+                printer.cold_end_loop.add(c)
+            else:
+                printer.thermal_loop.add(c)
+        printer.thermal_loop.start()
+        if printer.cold_end_loop.schedule:
+            printer.cold_end_loop.start()
+
         # Init roatray encs.
         printer.filament_sensors = []
 
@@ -412,8 +430,10 @@ class Redeem:
                 sensor.alarm_level = alarm_level
                 printer.filament_sensors.append(sensor)
 
-        # Make a queue of commands
-        self.printer.commands = JoinableQueue(10)
+        # Make a queue of commands, bounded by the gcodes in it as batches
+        # of them count as one item
+        self.printer.commands = JoinableQueue(GCodeProcessor.QUEUED_GCODES)
+        self.printer.queued_gcodes = BoundedSemaphore(GCodeProcessor.QUEUED_GCODES)
 
         # Make a queue of commands that should not be buffered
         self.printer.sync_commands = JoinableQueue()
@@ -428,6 +448,9 @@ class Redeem:
             printer.max_speeds[i] = printer.config.getfloat('Planner', 'max_speed_'+axis.lower())
             printer.min_speeds[i] = printer.config.getfloat('Planner', 'min_speed_'+axis.lower())
             printer.jerks[i] = printer.config.getfloat('Planner', 'max_jerk_'+axis.lower())
+            printer.s_curve_jerks[i] = printer.config.getfloat('Planner', 's_curve_jerk_'+axis.lower())
+            if axis in ('E', 'H', 'A', 'B', 'C'):
+                printer.pressure_advance[i] = printer.config.getfloat('Planner', 'pressure_advance_'+axis.lower())
             printer.home_speed[i] = printer.config.getfloat('Homing', 'home_speed_'+axis.lower())
             printer.home_backoff_speed[i] = printer.config.getfloat('Homing', 'home_backoff_speed_'+axis.lower())
             printer.home_backoff_offset[i] = printer.config.getfloat('Homing', 'home_backoff_offset_'+axis.lower())
@@ -435,6 +458,17 @@ class Redeem:
             printer.backlash_compensation[i] = printer.config.getfloat('Steppers', 'backlash_'+axis.lower())
 
         printer.e_axis_active = printer.config.getboolean('Planner', 'e_axis_active')
+        printer.junction_deviation = printer.config.getfloat('Planner', 'junction_deviation')
+
+        for i, axis in enumerate(["x", "y"]):
+            shaper = printer.config.get('Planner', 'input_shaper_'+axis).lower()
+            if shaper not in Printer.INPUT_SHAPERS:
+                logging.error("Unknown input shaper '{}' for {}, use one of {}".format(
+                    shaper, axis.upper(), ", ".join(Printer.INPUT_SHAPERS)))
+                shaper = "none"
+            printer.input_shaper[i] = shaper
+            printer.input_shaper_frequency[i] = printer.config.getfloat('Planner', 'input_shaper_frequency_'+axis)
+            printer.input_shaper_damping[i] = printer.config.getfloat('Planner', 'input_shaper_damping_'+axis)
 
         dirname = os.path.dirname(os.path.realpath(__file__))
 
@@ -453,6 +487,9 @@ class Redeem:
         printer.max_buffered_move_time = printer.config.getfloat('Planner', 'max_buffered_move_time')
 
         printer.max_length = printer.config.getfloat('Planner', 'max_length')
+        printer.delta_max_deviation = printer.config.getfloat('Planner', 'delta_max_deviation')
+        printer.arc_chord_error = printer.config.getfloat('Planner', 'arc_chord_error')
+        printer.arc_max_segment_length = printer.config.getfloat('Planner', 'arc_max_segment_length')
 
         self.printer.processor = GCodeProcessor(self.printer)
         self.printer.plugins = PluginsController(self.printer)
@@ -524,8 +561,9 @@ class Redeem:
 
 
         # Read end stop value again now that PRU is running
+        state = PruInterface.get_endstop_states()
         for _, es in self.printer.end_stops.iteritems():
-            es.read_value()
+            es.read_value(state)
 
         # Enable Stepper timeout
         timeout = printer.config.getint('Steppers', 'timeout_seconds')
@@ -553,7 +591,8 @@ class Redeem:
         self.running = True
         # Start the two processes
         p0 = Thread(target=self.loop,
-                    args=(self.printer.commands, "buffered"), name="p0")
+                    args=(self.printer.commands, "buffered",
+                          self.printer.queued_gcodes), name="p0")
         p1 = Thread(target=self.loop,
                     args=(self.printer.unbuffered_commands, "unbuffered"), name="p1")
         p2 = Thread(target=self.eventloop,
@@ -577,17 +616,27 @@ class Redeem:
         # Signal everything ready
         logging.info("Redeem ready")
 
-    def loop(self, queue, name):
-        """ When a new gcode comes in, execute it """
+    def loop(self, queue, name, bound=None):
+        """
+        When a new gcode comes in, execute it. The gcodes taken from
+        the queue are released from bound, if given
+        """
         try:
             while self.running:
                 try:
-                    gcode = queue.get(block=True, timeout=1)
+                    item = queue.get(block=True, timeout=1)
                 except Queue.Empty:
                     continue
-                #logging.debug("Executing "+gcode.code()+" from "+name + " " + gcode.message)
-                self._execute(gcode)
-                self.printer.reply(gcode)
+                if bound is not None:
+                    for _ in range(len(item) if isinstance(item, list) else 1):
+                        bound.release()
+                # Readers may enqueue a batch of buffered gcodes as a list
+                if isinstance(item, list):
+                    self._execute_batch(item)
+                else:
+                    #logging.debug("Executing "+item.code()+" from "+name + " " + item.message)
+                    self._execute(item)
+                    self.printer.reply(item)
                 queue.task_done()
         except Exception:
             logging.exception("Exception in {} loop: ".format(name))
@@ -617,10 +666,12 @@ class Redeem:
         # Stops plugins
         self.printer.plugins.exit()
 
-        for name, stepper in self.printer.steppers.iteritems():
-            stepper.set_disabled()
-        Stepper.commit()
+        with Stepper.batch():
+            for name, stepper in self.printer.steppers.iteritems():
+                stepper.set_disabled()
 
+        self.printer.thermal_loop.stop()
+        self.printer.cold_end_loop.stop()
         for name, heater in self.printer.heaters.iteritems():
             logging.debug("closing "+name)
             heater.disable()
@@ -656,6 +707,20 @@ class Redeem:
         else:
             self.printer.processor.execute(g)
 
+    def _execute_batch(self, gcodes):
+        """ Execute a list of G-codes, consecutive moves are queued together """
+        processor = self.printer.processor
+        start = 0
+        while start < len(gcodes):
+            end = processor.batch_end(gcodes, start)
+            if end - start > 1:
+                processor.execute_batch(gcodes[start:end])
+            else:
+                self._execute(gcodes[start])
+            for g in gcodes[start:end]:
+                self.printer.reply(g)
+            start = end
+
     def _synchronize(self, g):
         """ Syncrhonized execution of a G-code """
         self.printer.processor.synchronize(g)
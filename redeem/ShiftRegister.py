@@ -22,6 +22,8 @@ License: GNU GPL v3: http://www.gnu.org/copyleft/gpl.html
 """
 
 import logging
+from contextlib import contextmanager
+from threading import RLock
 
 spi = None
 
@@ -44,15 +46,50 @@ except ImportError:
 class ShiftRegister(object):
 
     registers = list()
+
+    # Changes made in a batch are sent once, when the outermost batch ends
+    lock = RLock()
+    batch_depth = 0
+    pending = False
+
+    # The bytes last sent, and the number of SPI transfers for profiling
+    sent = None
+    transfers = 0
     
     @staticmethod
     def commit():
         """ Send the values to the serial to parallel chips """
-        bytes = []
-        for reg in ShiftRegister.registers:
-            bytes.append(reg.state)
-        if spi is not None: 
-            spi.writebytes(bytes[::-1])
+        with ShiftRegister.lock:
+            if ShiftRegister.batch_depth:
+                ShiftRegister.pending = True
+                return
+            ShiftRegister.pending = False
+            bytes = []
+            for reg in ShiftRegister.registers:
+                bytes.append(reg.state)
+            bytes = bytes[::-1]
+            if bytes == ShiftRegister.sent:
+                return
+            ShiftRegister.sent = bytes
+            if spi is not None: 
+                spi.writebytes(bytes)
+                ShiftRegister.transfers += 1
+
+    @staticmethod
+    @contextmanager
+    def batch():
+        """ 
+        Defer the commits made in the block, the registers are sent at most
+        once at the end, ie. when enabling several steppers. Batches nest.
+        """
+        with ShiftRegister.lock:
+            ShiftRegister.batch_depth += 1
+            try:
+                yield
+            finally:
+                ShiftRegister.batch_depth -= 1
+                if not ShiftRegister.batch_depth and ShiftRegister.pending:
+                    ShiftRegister.commit()
 
     @staticmethod
     def make(num):
@@ -66,17 +103,19 @@ class ShiftRegister(object):
         self.state = 0x00
 
     def set_state(self, state, mask=0xFF):
-        self.remove_state(mask)
-        self.state |= (state & mask)
-        ShiftRegister.commit()
+        with ShiftRegister.lock:
+            self.state = (self.state & ~mask) | (state & mask)
+            ShiftRegister.commit()
 
     def add_state(self, state):
-        self.state |= state
-        ShiftRegister.commit()
+        with ShiftRegister.lock:
+            self.state |= state
+            ShiftRegister.commit()
 
     def remove_state(self, state):
-        self.state &= ~state
-        ShiftRegister.commit()
+        with ShiftRegister.lock:
+            self.state &= ~state
+            ShiftRegister.commit()
     
 
 if __name__ == '__main__':
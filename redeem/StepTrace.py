@@ -0,0 +1,63 @@
+#!/usr/bin/env python
+"""
+StepTrace - Reads the steps recorded by the simulated PRU,
+see simulate_pru_trace in the [System] section and
+path_planner/StepTrace.h for the file format.
+
+License: GNU GPL v3: http://www.gnu.org/copyleft/gpl.html
+
+ Redeem is free software: you can redistribute it and/or modify
+ it under the terms of the GNU General Public License as published by
+ the Free Software Foundation, either version 3 of the License, or
+ (at your option) any later version.
+
+ Redeem is distributed in the hope that it will be useful,
+ but WITHOUT ANY WARRANTY; without even the implied warranty of
+ MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+ GNU General Public License for more details.
+
+ You should have received a copy of the GNU General Public License
+ along with Redeem.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import numpy as np
+
+
+class StepTrace:
+
+    MAGIC = "RDMSTEP1"
+    HEADER_SIZE = 16
+    F_CPU = 200000000.0
+    RECORD = np.dtype([("tick", "<u8"), ("axis", "u1"),
+                       ("direction", "u1"), ("reserved", "V6")])
+
+    def __init__(self, filename):
+        with open(filename, "rb") as f:
+            header = f.read(StepTrace.HEADER_SIZE)
+        if header[:8] != StepTrace.MAGIC:
+            raise ValueError(filename + " is not a step trace")
+        count = int(np.frombuffer(header[8:16], dtype="<u8")[0])
+        if count:
+            self.records = np.memmap(filename, dtype=StepTrace.RECORD, mode="r",
+                                     offset=StepTrace.HEADER_SIZE, shape=(count,))
+        else:
+            self.records = np.zeros(0, dtype=StepTrace.RECORD)
+
+    def __len__(self):
+        return len(self.records)
+
+    def duration(self):
+        """ Time of the last step in seconds """
+        if not len(self.records):
+            return 0.0
+        return self.records["tick"][-1]/StepTrace.F_CPU
+
+    def step_times(self, axis):
+        """ Times of the steps of an axis in seconds """
+        steps = self.records[self.records["axis"] == axis]
+        return steps["tick"]/StepTrace.F_CPU
+
+    def positions(self, axis):
+        """ Position of an axis in steps after each of its steps """
+        steps = self.records[self.records["axis"] == axis]
+        return np.cumsum(steps["direction"].astype(np.int64)*2 - 1)
@@ -44,8 +44,9 @@ class Stepper(object):
         self.dir_pin         = dir_pin
         self.fault_key       = fault_key
         self.name            = name
-        self.enabled 	     = False	    
-        self.in_use          = False        
+        self._enabled        = False
+        self._in_use         = False
+        self._current_enabled= True
         self.steps_pr_mm     = 1            
         self.microsteps      = 1.0     
         self.microstepping   = 0
@@ -60,6 +61,34 @@ class Stepper(object):
         # Steppers have an nFAULT pin, so callback on falling
         Key_pin(name, fault_key, Key_pin.FALLING, self.fault_callback)
 
+    # Changing these flags tells Printer.ensure_steppers_enabled to check the steppers again
+    @property
+    def enabled(self):
+        return self._enabled
+
+    @enabled.setter
+    def enabled(self, enabled):
+        self._enabled = enabled
+        Printer.stepper_generation += 1
+
+    @property
+    def in_use(self):
+        return self._in_use
+
+    @in_use.setter
+    def in_use(self, in_use):
+        self._in_use = in_use
+        Printer.stepper_generation += 1
+
+    @property
+    def current_enabled(self):
+        return self._current_enabled
+
+    @current_enabled.setter
+    def current_enabled(self, current_enabled):
+        self._current_enabled = current_enabled
+        Printer.stepper_generation += 1
+
     def get_state(self):
         """ Returns the current state """
         return self.state & 0xFF  # Return the state of the serial to parallel
@@ -101,6 +130,11 @@ class Stepper(object):
     def commit():
         pass
 
+    @staticmethod
+    def batch():
+        """ Send the shift register changes made in a with block at once """
+        return ShiftRegister.batch()
+
     def fault_callback(self, key, event):
         Alarm(Alarm.STEPPER_FAULT, "Stepper {}<br>Most likely the stepper is over heated.".format(self.name))
             
@@ -188,10 +222,12 @@ class Stepper_00B1(Stepper):
     def set_disabled(self, force_update=False):
         if hasattr(Stepper, "printer"):
             Stepper.printer.enable.set_disabled()
+        self.enabled = False
 
     def set_enabled(self, force_update=False):
         if hasattr(Stepper, "printer"):
             Stepper.printer.enable.set_enabled()
+        self.enabled = True
 
     def set_decay(self, value):
         EN_CFG0  = (1<<3)
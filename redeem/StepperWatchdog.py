@@ -18,17 +18,19 @@ Author: Elias Bakken
  You should have received a copy of the GNU General Public License
  along with Redeem.  If not, see <http://www.gnu.org/licenses/>.
 """
-from threading import Thread, Lock
+from threading import Thread
 import time
 import logging
+from ShiftRegister import ShiftRegister
 
 class StepperWatchdog:
 
     def __init__(self, printer, timeout=60):
         self.printer = printer
         self.timeout = timeout
-        self.time_left = 0
-        self.lock = Lock()
+        # reset() only stores the time, _run times out once for each reset
+        self.last_reset = 0
+        self.timed_out = 0
         self.t = Thread(target=self._run, name="StepperWatchdog")
         self.running = False
 
@@ -41,43 +43,39 @@ class StepperWatchdog:
     def stop(self):
         if self.running:
             logging.debug("Stopping stepper watchdog")
-            self.lock.acquire()
-            self.time_left = 0
-            self.lock.release()
             self.running = False
             self.t.join()
         else:
             logging.debug("Attempted to stop StepperWatchdog when it is not running")
 
     def reset(self):
-        self.lock.acquire()
-        self.time_left = self.timeout
-        self.lock.release()
+        self.last_reset = time.time()
 
     def _run(self):
-        """ While more time on the clock, 
-        stay in the inner loop. If not, carry out the 
-        timeout function """
+        """ Once a second, carry out the timeout function 
+        if the time since the last reset is up """
         while self.running:
-            if self.time_left:
-                while self.time_left and self.running:
-                    time.sleep(1)
-                    self.lock.acquire()
-                    self.time_left -= 1
-                    self.lock.release()
-                self._on_timeout()
-            else:      
-                time.sleep(1)
+            time.sleep(1)
+            self.check(time.time())
+
+    def check(self, now):
+        """ Time out if the last reset is timeout seconds before now
+        and has not timed out yet """
+        last_reset = self.last_reset
+        if last_reset != self.timed_out and now - last_reset >= self.timeout:
+            self.timed_out = last_reset
+            self._on_timeout()
 
     def _on_timeout(self):
         """ Run this when timeout occurs. """
         logging.debug("Stepper watchdog timeout")
         if not self.printer:
             return
-        for name, stepper in self.printer.steppers.iteritems():
-            if stepper.in_use and stepper.enabled:
-                # Stepper should be enabled, but is not.
-                stepper.set_disabled(True)  # Force update
+        with ShiftRegister.batch():
+            for name, stepper in self.printer.steppers.iteritems():
+                if stepper.in_use and stepper.enabled:
+                    # Stepper should be enabled, but is not.
+                    stepper.set_disabled(True)  # Force update
 
 if __name__ == '__main__':
     logging.basicConfig(level=logging.DEBUG,
@@ -31,15 +31,12 @@ License: GNU GPL v3: http://www.gnu.org/copyleft/gpl.html
 import numpy as np
 import math
 import logging
-from threading import Lock
 import sys
 import TemperatureSensorConfigs
 from Alarm import Alarm
 
 class TemperatureSensor:
 
-    mutex = Lock()
-
     def __init__(self, pin, heater_name, sensorIdentifier):
 
         self.pin = pin
@@ -91,11 +88,11 @@ class TemperatureSensor:
     """
     Reads the adc pin and returns the actual voltage value
     Returns -1 if the reading is out of range.
+    Only the ThermalLoop reads the pins once Redeem is running.
     """
     def read_adc(self):
         voltage = 0
 
-        TemperatureSensor.mutex.acquire()
         try:
             with open(self.pin, "r") as file:
                 signal = float(file.read().rstrip())
@@ -106,7 +103,6 @@ class TemperatureSensor:
         except IOError as e:
              Alarm(Alarm.THERMISTOR_ERROR, "Unable to get ADC value ({0}): {1}".format(e.errno, e.strerror))
 
-        TemperatureSensor.mutex.release()
         return voltage
 
 
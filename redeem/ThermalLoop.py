@@ -0,0 +1,141 @@
+#!/usr/bin/env python
+"""
+One thread running the temperature controllers, the heaters and
+coolers, each on its own period. The controllers that are due are
+sampled first, then updated, and their outputs are sent with one
+PWM batch. The deadlines follow from the previous ones, not from when
+the loop woke up, so the periods do not drift, and how late the loop
+was is kept in the stats.
+
+License: GNU GPL v3: http://www.gnu.org/copyleft/gpl.html
+
+ Redeem is free software: you can redistribute it and/or modify
+ it under the terms of the GNU General Public License as published by
+ the Free Software Foundation, either version 3 of the License, or
+ (at your option) any later version.
+
+ Redeem is distributed in the hope that it will be useful,
+ but WITHOUT ANY WARRANTY; without even the implied warranty of
+ MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+ GNU General Public License for more details.
+
+ You should have received a copy of the GNU General Public License
+ along with Redeem.  If not, see <http://www.gnu.org/licenses/>.
+"""
+from threading import Thread, Lock
+import time
+import logging
+from PWM import PWM
+
+
+class ThermalLoop:
+    """
+    Runs controllers with an enabled flag, a period in seconds named
+    sleep, sample() to read the sensor, update() to set the output and
+    disable() to turn the output off.
+    """
+
+    def __init__(self, name="ThermalLoop"):
+        self.name = name
+        self.schedule = []  # [deadline, controller]
+        self.t = Thread(target=self._run, name=name)
+        self.running = False
+        self.lock = Lock()
+        self.reset_stats()
+
+    def add(self, controller):
+        self.schedule.append([time.time(), controller])
+
+    def start(self):
+        now = time.time()
+        for entry in self.schedule:
+            entry[0] = now
+        self.running = True
+        self.t.start()
+        logging.info("{} started with {} controllers".format(
+            self.name, len(self.schedule)))
+
+    def stop(self):
+        if self.running:
+            logging.debug("Stopping " + self.name)
+            self.running = False
+            self.t.join()
+
+    def _run(self):
+        try:
+            while self.running:
+                deadline = self.run_due(time.time())
+                delay = deadline - time.time()
+                if delay > 0:
+                    time.sleep(delay)
+        except Exception:
+            logging.exception("Exception in " + self.name)
+            # Never leave a heater on without its controller
+            with PWM.batch():
+                for _, controller in self.schedule:
+                    controller.disable()
+
+    def run_due(self, now):
+        """
+        Sample and update the controllers due at now,
+        returns the next deadline
+        """
+        due = []
+        for entry in self.schedule:
+            deadline, controller = entry
+            if deadline > now:
+                continue
+            # Deadlines more than a period late are skipped, not caught up
+            missed = int((now - deadline) / controller.sleep)
+            entry[0] = deadline + (missed + 1) * controller.sleep
+            if not controller.enabled:
+                continue
+            due.append(controller)
+            with self.lock:
+                self.runs += 1
+                self.missed += missed
+                self.jitter_sum += now - deadline
+                self.jitter_max = max(self.jitter_max, now - deadline)
+        if due:
+            for controller in due:
+                self._call(controller, controller.sample)
+            with PWM.batch():
+                for controller in due:
+                    if controller.enabled:
+                        self._call(controller, controller.update)
+            with self.lock:
+                self.passes += 1
+                self.busy_time += time.time() - now
+        return min([entry[0] for entry in self.schedule] or [now + 1.0])
+
+    def _call(self, controller, method):
+        """ A controller that fails is disabled, the others keep running """
+        try:
+            method()
+        except Exception:
+            logging.exception("{} failed in {}, disabling it".format(
+                controller.name, self.name))
+            controller.disable()
+
+    def get_stats(self):
+        """
+        Passes through the loop, controller runs, deadlines skipped,
+        mean and max seconds the runs started after their deadline and
+        the seconds spent in the passes
+        """
+        with self.lock:
+            return {"passes": self.passes,
+                    "runs": self.runs,
+                    "missed": self.missed,
+                    "mean_jitter": self.jitter_sum / self.runs if self.runs else 0.0,
+                    "max_jitter": self.jitter_max,
+                    "busy_time": self.busy_time}
+
+    def reset_stats(self):
+        with self.lock:
+            self.passes = 0
+            self.runs = 0
+            self.missed = 0
+            self.jitter_sum = 0.0
+            self.jitter_max = 0.0
+            self.busy_time = 0.0
@@ -24,7 +24,7 @@ License: GNU GPL v3: http://www.gnu.org/copyleft/gpl.html
 from threading import Thread
 import select
 import logging
-from Gcode import Gcode
+from LineBuffer import LineBuffer
 
 
 class USB:
@@ -36,6 +36,7 @@ class USB:
         except IOError:
             logging.warning("USB gadget serial not available as /dev/ttyGS0")
             return
+        self.buffer = LineBuffer("USB")
         self.running = True
         self.t = Thread(target=self.get_message, name="USB")
         self.t.start()		
@@ -45,10 +46,11 @@ class USB:
         while self.running:
             ret = select.select([self.tty], [], [], 1.0)
             if ret[0] == [self.tty]:
-                message = self.tty.readline().strip("\n")
-                if len(message) > 0:
-                    g = Gcode({"message": message, "prot": "USB"})
-                    self.printer.processor.enqueue(g)
+                # Drain everything that is available in one read
+                gcodes = self.buffer.to_gcodes(
+                    self.buffer.read_fd(self.tty.fileno()))
+                if gcodes:
+                    self.printer.processor.enqueue_batch(gcodes)
                     # Do not enable sending messages until a 
                     # message has been received
                     self.send_response = True
@@ -43,6 +43,7 @@
     .u8     direction           //Steppers are defined as 0b000HEZYX - Direction for each stepper
     .u8     cancellableMask     //If the endstop match the mask, all the move commands are canceled. 
     .u8     options             //Options for the move, bit 0 indicates that a sync interrupt is required. bit 1 indicates that after the sync, suspend.
+                                //bit 2 marks a repeat command, its delay is how many more times the next command is executed.
     .u32    delay               //number of cycle to wait (this is the # of PRU click cycles)
 .ends
 
@@ -78,6 +79,7 @@
 // r25: Inverted mask for GPIO2 togglable pin
 // r26: Inverted mask for GPIO3 togglable pin
 // r27: Address of PRU control
+// r28: Remaining repetitions of the current command
 
 INIT:
     LBCO r0, C4, 4, 4                                       // Load the PRU-ICSS SYSCFG register (4 bytes) into R0
@@ -113,6 +115,9 @@ INIT:
 
     // Set remaining steps counter to 0
     MOV r22, 0
+
+    // No command is being repeated
+    MOV r28, 0
     
 RESET_R4:   
     MOV  r0, 0  
@@ -129,6 +134,15 @@ NEXT_COMMAND:
     LBBO r2, r4, 0, 8                                       // Load pin command into r2 and r3, which is 8 bytes
     .assign SteppersCommand, r2,r3, pinCommand              // Assign the struct spanning onto r2 and r3
 
+    //A repeat command only sets how many more times the next command is executed
+    QBBC NOT_REPEAT, pinCommand.options, 2
+    MOV r28, pinCommand.delay
+    ADD r4, r4, SIZE(SteppersCommand)
+    SUB r1, r1, 1
+    QBNE NEXT_COMMAND, r1, 0                                // The command to repeat may be in the next block
+    QBA CANCEL_COMMAND_AFTER
+
+NOT_REPEAT:
     //First load the direction pins    
     XOR r21,pinCommand.direction,DIRECTION_MASK             // Invert the stepper direction mask
     AND r21,r21,0xFF                                        // Mask the direction to the last 8 bits
@@ -243,9 +257,10 @@ NEXT_COMMAND:
 
     QBNE notcancel, r7.b1,0
 
-    //Store the number of steps remaining
+    //Store the number of steps remaining, cancelable moves are never repeat encoded
     ADD r22, r22, r1
     SBCO r22, C28, 16, 4
+    MOV r28, 0
 
     //Remove all the command from the buffer
 start_loop_remove:
@@ -381,6 +396,12 @@ DELAY:
     SUB r0, r0, 1
     QBNE DELAY, r0, 0
 
+    QBEQ NOT_REPEATED, r28, 0                               // Is the command repeated?
+    SUB r28, r28, 1
+    SUB r4, r4, SIZE(SteppersCommand)                       // Yes, read it again
+    ADD r1, r1, 1                                           // and don't count it as done
+
+NOT_REPEATED:
     SUB r1, r1, 1                                           //r1 contains the number of stepper instructions in the DDR, we remove one.
 
 SELFSUSPEND:
@@ -10,24 +10,26 @@ License: CC BY-SA: http://creativecommons.org/licenses/by-sa/2.0/
 
 from GCodeCommand import GCodeCommand
 try:
-    from Path import Path, RelativePath, AbsolutePath, MixedPath
+    from Path import Path
 except ImportError:
-    from redeem.Path import Path, RelativePath, AbsolutePath, MixedPath
+    from redeem.Path import Path
 
 import logging
 
 
 class G0(GCodeCommand):
 
-    def execute(self, g):
+    def parse(self, g):
+        """ Update the feed rate and acceleration from g and return the
+        axes it moves """
         if g.has_letter("F"):  # Get the feed rate
             # Convert from mm/min to SI unit m/s
-            self.printer.feed_rate = float(g.get_value_by_letter("F"))
+            self.printer.feed_rate = g.get_float_by_letter("F", 0.0)
             self.printer.feed_rate /= 60000.0
             g.remove_token_by_letter("F")
         if  g.has_letter("Q"):  # Get the Accel
             # Convert from mm/min^2 to SI unit m/s^2
-            self.printer.accel = float(g.get_value_by_letter("Q"))
+            self.printer.accel = g.get_float_by_letter("Q", 0.0)
             self.printer.accel /= 3600000.0
             g.remove_token_by_letter("Q")
         smds = {}
@@ -39,19 +41,34 @@ class G0(GCodeCommand):
             if axis in ('E', 'H', 'A', 'B', 'C') and self.printer.extrude_factor != 1.0:
                 value *= self.printer.extrude_factor
             smds[axis] = value
-    
-        if self.printer.movement == Path.ABSOLUTE:
-            path = AbsolutePath(smds, self.printer.feed_rate * self.printer.factor, self.printer.accel)
-        elif self.printer.movement == Path.RELATIVE:
-            path = RelativePath(smds, self.printer.feed_rate * self.printer.factor, self.printer.accel)
-        elif self.printer.movement == Path.MIXED:
-            path = MixedPath(smds, self.printer.feed_rate * self.printer.factor, self.printer.accel)
-        else:
+        return smds
+
+    def execute(self, g):
+        smds = self.parse(g)
+
+        if self.printer.movement not in (Path.ABSOLUTE, Path.RELATIVE, Path.MIXED):
+            logging.error("invalid movement: " + str(self.printer.movement))
+            return
+
+        # Add the move. This blocks until the path planner has capacity
+        self.printer.path_planner.add_linear_move(
+            smds, self.printer.feed_rate * self.printer.factor,
+            self.printer.accel, self.printer.movement)
+
+    def execute_batch(self, gcodes):
+        """ Queue a run of consecutive G0/G1 with one call to the planner """
+        if self.printer.movement not in (Path.ABSOLUTE, Path.RELATIVE, Path.MIXED):
             logging.error("invalid movement: " + str(self.printer.movement))
             return
-        
-        # Add the path. This blocks until the path planner has capacity
-        self.printer.path_planner.add_path(path)
+
+        moves = []
+        for g in gcodes:
+            smds = self.parse(g)
+            moves.append((smds, self.printer.feed_rate * self.printer.factor,
+                          self.printer.accel))
+
+        # Add the moves. This blocks until the path planner has capacity
+        self.printer.path_planner.add_linear_moves(moves, self.printer.movement)
 
     def get_description(self):
         return "Control the printer head position as well as the currently " \
@@ -7,73 +7,91 @@ Author: Elias Bakken
 
 from GCodeCommand import GCodeCommand
 try:
-    from Path import Path, RelativePath, AbsolutePath
+    from Path import Path
 except ImportError:
-    from redeem.Path import Path, RelativePath, AbsolutePath
+    from redeem.Path import Path
 
 import logging
 
 
 class G2(GCodeCommand):
 
-    def execute_common(self, g):
+    clockwise = True
+
+    def parse(self, g):
+        """ Update the feed rate and acceleration from g and return the
+        axes it moves and the offset of the center, I and J """
         if g.has_letter("F"):  # Get the feed rate
             # Convert from mm/min to SI unit m/s
-            self.printer.feed_rate = float(g.get_value_by_letter("F"))
+            self.printer.feed_rate = g.get_float_by_letter("F", 0.0)
             self.printer.feed_rate /= 60000.0
             g.remove_token_by_letter("F")
+        if g.has_letter("Q"):  # Get the Accel
+            # Convert from mm/min^2 to SI unit m/s^2
+            self.printer.accel = g.get_float_by_letter("Q", 0.0)
+            self.printer.accel /= 3600000.0
+            g.remove_token_by_letter("Q")
+        # The center is always relative to the start
+        i = g.get_float_by_letter("I", 0.0) / 1000.0
+        j = g.get_float_by_letter("J", 0.0) / 1000.0
+        g.remove_token_by_letter("I")
+        g.remove_token_by_letter("J")
         smds = {}
-        for i in range(g.num_tokens()):
-            axis = g.token_letter(i)
-	    # Get the value, new position or vector
-	    value =  float(g.token_value(i)) / 1000.0
-	    if (axis == 'E' or axis == 'H') and self.printer.extrude_factor != 1.0:
-               value *= self.printer.extrude_factor
-            smds[axis] = value        
-
-        if self.printer.movement == Path.ABSOLUTE:
-            path = AbsolutePath(smds, self.printer.feed_rate * self.printer.factor, self.printer.accel)
-        elif self.printer.movement == Path.RELATIVE:
-            path = RelativePath(smds, self.printer.feed_rate * self.printer.factor, self.printer.accel)
-        else:
-            logging.error("invalid movement: " + str(self.printer.movement))
-            # TODO: fix this        
-
-        path.I = float(g.get_value_by_letter("I"))/1000.0 if g.has_letter("I") else 0.0
-        path.J = float(g.get_value_by_letter("J"))/1000.0 if g.has_letter("J") else 0.0
+        for t in range(g.num_tokens()):
+            axis = self.printer.movement_axis(g.token_letter(t))
 
-        return path        
+            # Get the value, new position or vector
+            value = float(g.token_value(t)) / 1000.0
+            if axis in ('E', 'H', 'A', 'B', 'C') and self.printer.extrude_factor != 1.0:
+                value *= self.printer.extrude_factor
+            smds[axis] = value
+        return smds, i, j
 
     def execute(self, g):
-        path = self.execute_common(g)
-        path.movement = Path.G2
+        smds, i, j = self.parse(g)
+
+        if self.printer.movement not in (Path.ABSOLUTE, Path.RELATIVE, Path.MIXED):
+            logging.error("invalid movement: " + str(self.printer.movement))
+            return
+
+        # Add the arc. This blocks until the path planner has capacity
+        self.printer.path_planner.add_arc(
+            smds, i, j, self.clockwise, self.printer.feed_rate * self.printer.factor,
+            self.printer.accel, self.printer.movement)
 
-        # Add the path. This blocks until the path planner has capacity
-        self.printer.path_planner.add_path(path)
-   
     def get_description(self):
-        return ("Clockwise arc (experimental, not tested) "
-               "")
+        return "Clockwise arc"
+
+    def get_long_description(self):
+        return ("Move in an arc in the XY plane from the current position to "
+                "the given one, around a center at I, J from the current "
+                "position. The other axes move linearly along the arc. If "
+                "the start and end are the same, a full circle is made.\n"
+                "X, Y, Z, E, H, A, B, C = end position like for G1 (mm)\n"
+                "I = X offset of the center from the start (mm)\n"
+                "J = Y offset of the center from the start (mm)\n"
+                "F = move speed (mm/min) - stored until daemon reset\n"
+                "Q = move acceleration (mm/min^2) - stored until daemon reset\n")
 
     def is_buffered(self):
         return True
 
     def get_test_gcodes(self):
         return [
-            "G1 Y10"
-            "G2 X12.803 Y15.303 I7.50", 
+            "G1 X0 Y10",
+            "G2 X12.803 Y15.303 I7.50",
         ]
 
-class G3(G2):
-    def execute(self, g):
-        path = self.execute_common(g)
-        path.movement = Path.G3
 
-        # Add the path. This blocks until the path planner has capacity
-        self.printer.path_planner.add_path(path)
+class G3(G2):
 
+    clockwise = False
 
     def get_description(self):
-        return ("Counter-clockwise arc (experimental, not tested) "
-               "")
+        return "Counter-clockwise arc"
 
+    def get_test_gcodes(self):
+        return [
+            "G1 X0 Y10",
+            "G3 X12.803 Y4.697 I7.50",
+        ]
@@ -11,6 +11,10 @@ License: CC BY-SA: http://creativecommons.org/licenses/by-sa/2.0/
 from GCodeCommand import GCodeCommand
 import logging
 import os
+try:
+    from PWM import PWM
+except ImportError:
+    from redeem.PWM import PWM
 
 
 class M106(GCodeCommand):
@@ -77,8 +81,9 @@ class M107(GCodeCommand):
         else: # Uee fan 0
             fans.append(self.printer.fans[0])
 
-        for fan in fans:
-            fan.set_value(0)
+        with PWM.batch():
+            for fan in fans:
+                fan.set_value(0)
 
     def get_description(self):
         return "set fan off"
@@ -11,6 +11,10 @@ License: CC BY-SA: http://creativecommons.org/licenses/by-sa/2.0/
 from GCodeCommand import GCodeCommand
 import logging
 import os
+try:
+    from PruInterface import PruInterface
+except ImportError:
+    from redeem.PruInterface import PruInterface
 
 class M119(GCodeCommand):
     def execute(self, g):
@@ -47,6 +51,10 @@ class M119(GCodeCommand):
             endstop = self.printer.end_stops[es]
             logging.info("Is {} hit? {}, inverted? {}".format(es, endstop.hit, endstop.invert))
         else:
+            # Read the end stops at once, so the answer is one snapshot
+            state = PruInterface.get_shared_state()[0]
+            for _, v in self.printer.end_stops.iteritems():
+                v.read_value(state)
             g.set_answer("ok "+", ".join([v.name+": "+str(v.hit) for _,v in sorted(self.printer.end_stops.iteritems())]))
 
     def get_description(self):
@@ -0,0 +1,74 @@
+"""
+GCode M122
+Report the path planner, SPI, PWM and thermal loop telemetry
+
+License: CC BY-SA: http://creativecommons.org/licenses/by-sa/2.0/
+"""
+
+from GCodeCommand import GCodeCommand
+try:
+    from ShiftRegister import ShiftRegister
+    from PWM import PWM
+except ImportError:
+    from redeem.ShiftRegister import ShiftRegister
+    from redeem.PWM import PWM
+
+
+class M122(GCodeCommand):
+
+    def execute(self, g):
+        if g.has_letter("R"):
+            self.printer.path_planner.reset_telemetry()
+            ShiftRegister.transfers = 0
+            PWM.reset_stats()
+            self.printer.thermal_loop.reset_stats()
+            return
+        t = self.printer.path_planner.get_telemetry()
+        pwm = PWM.get_stats()
+        s = self.printer.thermal_loop.get_stats()
+        g.set_answer("ok underruns: {}, min buffered: {} ticks, "
+                     "waited for lines: {:.3f} s, waited for space: {:.3f} s, "
+                     "waited for PRU: {:.3f} s, "
+                     "DDR in flight: {} bytes, {:.3f} s, "
+                     "PRU done: {} bytes in {:.3f} s, "
+                     "arcs: {} in {} segments, "
+                     "shift register transfers: {}, "
+                     "PWM writes: {} ({} unchanged skipped) in {:.3f} s, "
+                     "thermal loop: {} controller runs in {} passes, "
+                     "{} deadlines missed, jitter mean {:.4f} s, "
+                     "max {:.4f} s, busy {:.3f} s".format(
+                         t["underruns"], t["min_buffered_ticks"],
+                         t["line_wait_time"], t["line_space_wait_time"],
+                         t["pru_wait_time"], t["ddr_bytes_in_flight"],
+                         t["ddr_time_in_flight"],
+                         t["ddr_bytes_done"], t["pru_move_time"],
+                         t["arcs"], t["arc_segments"], ShiftRegister.transfers,
+                         pwm["writes"], pwm["dropped"], pwm["bus_time"],
+                         s["runs"], s["passes"], s["missed"],
+                         s["mean_jitter"], s["max_jitter"], s["busy_time"]))
+
+    def get_description(self):
+        return "Report the path planner, SPI, PWM and thermal loop telemetry"
+
+    def get_long_description(self):
+        return ("Report the path planner telemetry: the number of times the "
+                "PRU ran out of moves while printing, the fewest PRU ticks of "
+                "moves left when a line was sent (-1 if none was), the time "
+                "the planner waited for lines from the host, the time the host "
+                "waited for space in the planner, the time the planner waited "
+                "for the PRU, the bytes and seconds of step commands not yet "
+                "executed, the bytes and seconds of step commands the PRU "
+                "finished, the number of G2/G3 arcs and of the segments "
+                "they were split in, the number of SPI transfers to the "
+                "stepper shift registers and the I2C writes to the PWM chip, "
+                "the values it skipped as unchanged and the time the writes "
+                "took, and for the heater and cooler thermal loop the "
+                "controller runs and the passes they were grouped in, the "
+                "deadlines skipped since the loop was late by a whole period, "
+                "the mean and max seconds the runs started late and the time "
+                "spent running them.\n"
+                "Waiting for lines while printing means the host is too slow. "
+                "Use 'M122 R' to reset the counters, ie. before a print.")
+
+    def get_test_gcodes(self):
+        return ["M122", "M122 R"]
@@ -20,9 +20,10 @@ class M17(GCodeCommand):
 
     def execute(self, g):
         self.printer.path_planner.wait_until_done()
-        for name, stepper in self.printer.steppers.iteritems():
-            if self.printer.config.getboolean('Steppers', 'in_use_' + name):
-                stepper.set_enabled()
+        with Stepper.batch():
+            for name, stepper in self.printer.steppers.iteritems():
+                if self.printer.config.getboolean('Steppers', 'in_use_' + name):
+                    stepper.set_enabled()
 
     def get_description(self):
         return "Enable steppers"
@@ -28,9 +28,10 @@ class M18(GCodeCommand):
             if g.num_tokens() == 0:
                 g.set_tokens(self.printer.steppers.keys())
 
-            for i in range(g.num_tokens()):  # Run through all tokens
-                axis = g.token_letter(i)  # Get the axis, X, Y, Z or E
-                self.printer.steppers[axis].set_disabled()
+            with Stepper.batch():
+                for i in range(g.num_tokens()):  # Run through all tokens
+                    axis = g.token_letter(i)  # Get the axis, X, Y, Z or E
+                    self.printer.steppers[axis].set_disabled()
 
     def get_description(self):
         return "Disable all steppers or set power down"
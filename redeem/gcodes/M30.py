@@ -18,8 +18,9 @@ except ImportError:
 class M909(GCodeCommand):
 
     def execute(self, g):
-        for i in range(g.num_tokens()):
-            self.printer.steppers[g.token_letter(i)].set_microstepping(int(g.token_value(i)))
+        with Stepper.batch():
+            for i in range(g.num_tokens()):
+                self.printer.steppers[g.token_letter(i)].set_microstepping(int(g.token_value(i)))
         Stepper.commit()
 
     def get_description(self):
@@ -21,10 +21,11 @@ class M350(GCodeCommand):
     def execute(self, g):
         self.printer.path_planner.wait_until_done()
         
-        for i in range(g.num_tokens()):
-            axis = g.token_letter(i)
-            stepper = self.printer.steppers[axis]
-            stepper.set_microstepping(int(g.token_value(i)))
+        with Stepper.batch():
+            for i in range(g.num_tokens()):
+                axis = g.token_letter(i)
+                stepper = self.printer.steppers[axis]
+                stepper.set_microstepping(int(g.token_value(i)))
         self.printer.path_planner.update_steps_pr_meter()
         Stepper.commit()
 
@@ -0,0 +1,51 @@
+"""
+GCode M900
+Set the pressure advance of the extruders
+
+License: CC BY-SA: http://creativecommons.org/licenses/by-sa/2.0/
+"""
+
+from GCodeCommand import GCodeCommand
+import logging
+
+
+class M900(GCodeCommand):
+
+    def execute(self, g):
+        advance = self.printer.pressure_advance
+        if g.num_tokens() == 0:
+            g.set_answer("ok " + ", ".join(
+                "{}: {:.4f}".format(axis, advance[self.printer.axis_to_index(axis)])
+                for axis in ('E', 'H', 'A', 'B', 'C')
+                if axis in self.printer.steppers))
+            return
+
+        for i in range(g.num_tokens()):
+            axis = g.token_letter(i)
+            # K is for the current tool
+            if axis == 'K':
+                axis = self.printer.current_tool
+            if axis not in ('E', 'H', 'A', 'B', 'C'):
+                logging.warning("M900: {} is not an extruder".format(axis))
+                continue
+            value = float(g.token_value(i))
+            if value < 0:
+                logging.error("M900: pressure advance must not be negative")
+                continue
+            advance[self.printer.axis_to_index(axis)] = value
+
+        logging.debug("M900: pressure advance = " + str(advance))
+        self.printer.path_planner.native_planner.setPressureAdvance(tuple(advance))
+
+    def get_description(self):
+        return "Set the pressure advance of the extruders"
+
+    def get_long_description(self):
+        return ("Sets the pressure advance of the extruders in seconds, the "
+                "extruder runs ahead of its position by this times its speed "
+                "while printing. Example: M900 E0.05 sets it to 0.05 s for E, "
+                "M900 K0.05 for the current tool, 0 turns it off. Without "
+                "parameters it reports the pressure advance of each extruder.")
+
+    def get_test_gcodes(self):
+        return ["M900 E0.05", "M900 K0", "M900"]
@@ -9,13 +9,18 @@ License: CC BY-SA: http://creativecommons.org/licenses/by-sa/2.0/
 """
 
 from GCodeCommand import GCodeCommand
+try:
+    from Stepper import Stepper
+except ImportError:
+    from redeem.Stepper import Stepper
 import logging
 
 class M909(GCodeCommand):
 
     def execute(self, g):
-        for i in range(g.num_tokens()):
-            self.printer.steppers[g.token_letter(i)].set_microstepping(int(g.token_value(i)))
+        with Stepper.batch():
+            for i in range(g.num_tokens()):
+                self.printer.steppers[g.token_letter(i)].set_microstepping(int(g.token_value(i)))
         # Update the steps pr m in the native planner. 
         self.printer.path_planner.update_steps_pr_meter()
         logging.debug("Updated steps pr meter to "+str(self.printer.steps_pr_meter))
@@ -9,13 +9,18 @@ License: GPLv3
 """
 
 from GCodeCommand import GCodeCommand
+try:
+    from Stepper import Stepper
+except ImportError:
+    from redeem.Stepper import Stepper
 import logging
 
 class M910(GCodeCommand):
 
     def execute(self, g):
-        for i in range(g.num_tokens()):
-            self.printer.steppers[g.token_letter(i)].set_decay(int(g.token_value(i)))
+        with Stepper.batch():
+            for i in range(g.num_tokens()):
+                self.printer.steppers[g.token_letter(i)].set_decay(int(g.token_value(i)))
 
     def get_description(self):
         return "Set stepper controller decay mode"
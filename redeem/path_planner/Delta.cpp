@@ -40,6 +40,8 @@ Delta::Delta()
   A_tangential = 0.0;                                                                 
   B_tangential = 0.0;                                                                
   C_tangential = 0.0;
+
+  revision = 0;
 }
 
 Delta::~Delta() {}
@@ -113,6 +115,8 @@ void Delta::recalculate(void)
   p1 = Vector3(Avx, Avy, 0);
   p2 = Vector3(Bvx, Bvy, 0);
   p3 = Vector3(Cvx, Cvy, 0);
+
+  revision++;
   
   //~ LOG("Delta: Avx = " << Avx << ", Avy = " << Avy << "\n");
   //~ LOG("Delta: Bvx = " << Bvx << ", Bvy = " << Bvy << "\n");
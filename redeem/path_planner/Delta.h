@@ -42,6 +42,7 @@ class Delta {
   Vector3 p1, p2, p3;
   FLOAT_T A_radial, B_radial, C_radial;
   FLOAT_T A_tangential, B_tangential, C_tangential;
+  unsigned int revision;
 	
  public:
   Delta();
@@ -52,6 +53,8 @@ class Delta {
   void setRadialError(FLOAT_T A_radial_in, FLOAT_T B_radial_in, FLOAT_T C_radial_in);
   void setTangentError(FLOAT_T A_tangential_in, FLOAT_T B_tangential_in, FLOAT_T C_tangential_in);
   void recalculate();
+  // Incremented by recalculate, kinematics cached before are stale if it changed
+  unsigned int getRevision() { return revision; }
   void inverse_kinematics(FLOAT_T X, FLOAT_T Y, FLOAT_T Z, FLOAT_T* Az, FLOAT_T* Bz, FLOAT_T* Cz);
   void forward_kinematics(FLOAT_T Az, FLOAT_T Bz, FLOAT_T Cz, FLOAT_T* X, FLOAT_T* Y, FLOAT_T* Z);
   void vertical_offset(FLOAT_T Az, FLOAT_T Bz, FLOAT_T Cz, FLOAT_T* offset);
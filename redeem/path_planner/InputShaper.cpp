@@ -0,0 +1,269 @@
+/*
+ This file is part of Redeem - 3D Printer control software
+
+ License: GNU GPLv3 http://www.gnu.org/copyleft/gpl.html
+
+ Redeem is free software: you can redistribute it and/or modify
+ it under the terms of the GNU General Public License as published by
+ the Free Software Foundation, either version 3 of the License, or
+ (at your option) any later version.
+
+ Redeem is distributed in the hope that it will be useful,
+ but WITHOUT ANY WARRANTY; without even the implied warranty of
+ MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+ GNU General Public License for more details.
+
+ You should have received a copy of the GNU General Public License
+ along with Redeem.  If not, see <http://www.gnu.org/licenses/>.
+
+ */
+
+#include "InputShaper.h"
+#include <algorithm>
+#include <cmath>
+
+InputShaper::InputShaper() {
+  for(int axis=0; axis<INPUT_SHAPER_AXES; axis++){
+    types[axis] = INPUT_SHAPER_NONE;
+    frequencies[axis] = 0;
+    dampings[axis] = 0;
+  }
+  direction = 0;
+  clock = 0;
+  out = NULL;
+  outTick = 0;
+  configure(0, INPUT_SHAPER_NONE, 0, 0);
+}
+
+/**
+   The impulses of a shaper, with amplitudes adding up to 1 and times in seconds.
+   Returns the number of impulses.
+*/
+static int shaperImpulses(int type, FLOAT_T frequency, FLOAT_T damping, FLOAT_T* amplitudes, FLOAT_T* times) {
+  FLOAT_T root = sqrt(1 - damping*damping);
+  FLOAT_T period = 1/(frequency*root);
+  FLOAT_T k = exp(-damping*M_PI/root);
+  int count;
+
+  switch(type){
+  case INPUT_SHAPER_ZV:
+    count = 2;
+    amplitudes[0] = 1; amplitudes[1] = k;
+    times[0] = 0; times[1] = 0.5*period;
+    break;
+  case INPUT_SHAPER_ZVD:
+    count = 3;
+    amplitudes[0] = 1; amplitudes[1] = 2*k; amplitudes[2] = k*k;
+    times[0] = 0; times[1] = 0.5*period; times[2] = period;
+    break;
+  case INPUT_SHAPER_MZV:
+    k = exp(-0.75*damping*M_PI/root);
+    count = 3;
+    amplitudes[0] = 1 - M_SQRT1_2; amplitudes[1] = (M_SQRT2 - 1)*k; amplitudes[2] = (1 - M_SQRT1_2)*k*k;
+    times[0] = 0; times[1] = 0.375*period; times[2] = 0.75*period;
+    break;
+  default:
+    amplitudes[0] = 1;
+    times[0] = 0;
+    return 1;
+  }
+
+  FLOAT_T sum = 0;
+  for(int i=0; i<count; i++)
+    sum += amplitudes[i];
+  for(int i=0; i<count; i++)
+    amplitudes[i] /= sum;
+  return count;
+}
+
+void InputShaper::configure(int axis, int type, FLOAT_T frequency, FLOAT_T damping) {
+  if(axis < 0 || axis >= INPUT_SHAPER_AXES)
+    return;
+  types[axis] = frequency > 0 ? type : INPUT_SHAPER_NONE;
+  frequencies[axis] = frequency;
+  dampings[axis] = std::max<FLOAT_T>(0, std::min<FLOAT_T>(damping, 0.99));
+
+  FLOAT_T amplitudes[INPUT_SHAPER_AXES][INPUT_SHAPER_MAX_IMPULSES];
+  FLOAT_T times[INPUT_SHAPER_AXES][INPUT_SHAPER_MAX_IMPULSES];
+  FLOAT_T centroids[INPUT_SHAPER_AXES];
+  int counts[INPUT_SHAPER_AXES];
+  FLOAT_T latency = 0;
+  for(int a=0; a<INPUT_SHAPER_AXES; a++){
+    counts[a] = shaperImpulses(types[a], frequencies[a], dampings[a], amplitudes[a], times[a]);
+    centroids[a] = 0;
+    for(int i=0; i<counts[a]; i++)
+      centroids[a] += amplitudes[a][i]*times[a][i];
+    latency = std::max(latency, centroids[a]);
+  }
+
+  // Everything is delayed by the latency, the impulses of each axis are centered on it
+  streams.clear();
+  Stream unshaped = { -1, { 1, (uint64_t)llround(latency*F_CPU) }, 0 };
+  streams.push_back(unshaped);
+  for(int a=0; a<INPUT_SHAPER_AXES; a++){
+    for(int i=0; i<counts[a]; i++){
+      Stream stream = { a, { amplitudes[a][i], (uint64_t)llround((times[a][i] - centroids[a] + latency)*F_CPU) }, 0 };
+      streams.push_back(stream);
+    }
+  }
+  reset();
+}
+
+bool InputShaper::isEnabled() {
+  for(int axis=0; axis<INPUT_SHAPER_AXES; axis++)
+    if(types[axis] != INPUT_SHAPER_NONE)
+      return true;
+  return false;
+}
+
+void InputShaper::reset() {
+  moves.clear();
+  entries.clear();
+  firstMove = 0;
+  firstEntry = 0;
+  for(Stream& stream : streams)
+    stream.next = 0;
+  for(int motor=0; motor<NUM_AXES; motor++)
+    error[motor] = 0;
+}
+
+uint64_t InputShaper::shape(const SteppersCommand* commands, size_t count, const FLOAT_T* shapedSteps,
+			    bool flush, std::vector<SteppersCommand>& shaped) {
+  // What each command moves the motors by: the steps due to X and Y go through
+  // their shaper, the rest of the steps of the motor doesn't
+  if(count){
+    int steps[NUM_AXES] = { 0 };
+    for(size_t i=0; i<count; i++)
+      for(int motor=0; motor<NUM_AXES; motor++)
+	if(commands[i].step & (1 << motor))
+	  steps[motor] += (commands[i].direction & (1 << motor)) ? 1 : -1;
+
+    Move move;
+    move.shapedMask = 0;
+    for(int motor=0; motor<NUM_AXES; motor++){
+      FLOAT_T unshaped = steps[motor];
+      for(int a=0; a<INPUT_SHAPER_AXES; a++){
+	FLOAT_T s = shapedSteps[a*NUM_AXES + motor];
+	move.share[a + 1][motor] = s/count;
+	unshaped -= s;
+	if(s != 0)
+	  move.shapedMask |= 1 << motor;
+      }
+      move.share[0][motor] = unshaped/count;
+    }
+    moves.push_back(move);
+  }
+
+  uint64_t start = clock;
+  uint64_t tick = clock;
+  uint64_t moveNumber = firstMove + moves.size() - 1;
+  for(size_t i=0; i<count; i++){
+    Entry entry = { tick, moveNumber, commands[i].step, commands[i].direction };
+    entries.push_back(entry);
+    tick += commands[i].delay;
+  }
+  uint64_t end = tick;
+
+  // The block starts with a command without steps, for the time until the first one
+  out = &shaped;
+  shaped.clear();
+  SteppersCommand first = { 0, direction, 0, 0, 0 };
+  shaped.push_back(first);
+  outTick = start;
+
+  // Merge the streams of delayed commands in time order
+  for(;;){
+    Stream* next = NULL;
+    uint64_t nextTick = 0;
+    for(Stream& stream : streams){
+      if(stream.next - firstEntry >= entries.size())
+	continue;
+      uint64_t t = entries[stream.next - firstEntry].tick + stream.impulse.delay;
+      if(!next || t < nextTick){
+	next = &stream;
+	nextTick = t;
+      }
+    }
+    if(!next || (!flush && nextTick >= end))
+      break;
+    apply(*next, entries[next->next - firstEntry], nextTick);
+    next->next++;
+  }
+  release();
+
+  // Flushed, the block ends with the last step and what's left is rounding
+  if(flush){
+    uint32_t hold = count ? commands[count - 1].delay : 0;
+    end = std::max(end, outTick + hold);
+    for(int motor=0; motor<NUM_AXES; motor++)
+      error[motor] = 0;
+  }
+  wait(end);
+  out = NULL;
+
+  clock = end;
+  return end - start;
+}
+
+void InputShaper::apply(const Stream& stream, const Entry& entry, uint64_t tick) {
+  const Move& move = moves[entry.move - firstMove];
+  for(int motor=0; motor<NUM_AXES; motor++){
+    uint8_t bit = 1 << motor;
+    if(!(move.shapedMask & bit)){
+      if(stream.axis < 0 && (entry.step & bit))
+	step(motor, entry.direction & bit, tick);
+      continue;
+    }
+    error[motor] += stream.impulse.amplitude * move.share[stream.axis + 1][motor];
+    while(error[motor] >= 0.5){
+      error[motor] -= 1;
+      step(motor, true, tick);
+    }
+    while(error[motor] <= -0.5){
+      error[motor] += 1;
+      step(motor, false, tick);
+    }
+  }
+}
+
+void InputShaper::step(int motor, bool forward, uint64_t tick) {
+  uint8_t bit = 1 << motor;
+  if(tick - outTick >= INPUT_SHAPER_MERGE_TICKS || (out->back().step & bit)){
+    wait(tick);
+    SteppersCommand cmd = { 0, direction, 0, 0, 0 };
+    out->push_back(cmd);
+    outTick = tick;
+  }
+  direction = forward ? (direction | bit) : (direction & ~bit);
+  SteppersCommand& cmd = out->back();
+  cmd.step |= bit;
+  cmd.direction = direction;
+}
+
+// Set the delay of the last command to end at until, longer waits than a command can do
+// are split in commands without steps
+void InputShaper::wait(uint64_t until) {
+  while(until - outTick > UINT32_MAX){
+    out->back().delay = UINT32_MAX;
+    outTick += UINT32_MAX;
+    SteppersCommand cmd = { 0, direction, 0, 0, 0 };
+    out->push_back(cmd);
+  }
+  out->back().delay = (uint32_t)(until - outTick);
+}
+
+// Forget the commands every stream is done with and the moves they were from
+void InputShaper::release() {
+  uint64_t done = firstEntry + entries.size();
+  for(const Stream& stream : streams)
+    done = std::min(done, stream.next);
+  while(firstEntry < done){
+    entries.pop_front();
+    firstEntry++;
+  }
+  uint64_t used = entries.empty() ? firstMove + moves.size() : entries.front().move;
+  while(firstMove < used){
+    moves.pop_front();
+    firstMove++;
+  }
+}
@@ -0,0 +1,156 @@
+/*
+ This file is part of Redeem - 3D Printer control software
+
+ License: GNU GPLv3 http://www.gnu.org/copyleft/gpl.html
+
+ Redeem is free software: you can redistribute it and/or modify
+ it under the terms of the GNU General Public License as published by
+ the Free Software Foundation, either version 3 of the License, or
+ (at your option) any later version.
+
+ Redeem is distributed in the hope that it will be useful,
+ but WITHOUT ANY WARRANTY; without even the implied warranty of
+ MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+ GNU General Public License for more details.
+
+ You should have received a copy of the GNU General Public License
+ along with Redeem.  If not, see <http://www.gnu.org/licenses/>.
+
+ */
+
+#ifndef __PathPlanner__InputShaper__
+#define __PathPlanner__InputShaper__
+
+#include <stdint.h>
+#include <stddef.h>
+#include <deque>
+#include <vector>
+#include "config.h"
+#include "StepperCommand.h"
+
+#define INPUT_SHAPER_NONE 0
+#define INPUT_SHAPER_ZV   1
+#define INPUT_SHAPER_ZVD  2
+#define INPUT_SHAPER_MZV  3
+
+// Shaped axes, X and Y
+#define INPUT_SHAPER_AXES 2
+#define INPUT_SHAPER_MAX_IMPULSES 3
+
+// Steps closer than this to a command are done by it, the firmware needs about as
+// long for a command anyway
+#define INPUT_SHAPER_MERGE_TICKS 1000
+
+/**
+ * Input shaping of the X and Y axes against ringing.
+ *
+ * The toolhead rings at the resonance of its axis. A shaper splits the motion of
+ * the axis into a few delayed copies of it, impulses, whose vibrations at the
+ * resonance cancel out: ZV uses two impulses half a period apart, ZVD and MZV
+ * three, which also cancel the vibrations close to the resonance at the cost of
+ * a longer smoothing.
+ *
+ * The shaping is done on the step commands of the moves as generated, so it
+ * works with the ramps of any move. Each command is a step of the primary axis,
+ * an equal part of the move, and moves each motor by the share of its steps due
+ * to X and to Y, which go through the shaper of their axis, and the rest, which
+ * doesn't. With the transform of the axes taken into account in the shares, see
+ * Path::getShapedSteps, it is X and Y that are shaped on CoreXY, H-belt and delta
+ * printers too. The motors step where the shaped position crosses a step.
+ *
+ * All the motion is delayed by the longest shaper centroid so the unshaped axes
+ * stay in time with X and Y. The end of a move is shaped together with the start
+ * of the next one, it is only sent with the next one unless flushed.
+ */
+class InputShaper {
+ private:
+  struct Impulse {
+    FLOAT_T amplitude;
+    uint64_t delay;            /// PRU cycles after the command
+  };
+
+  struct Stream {
+    int axis;                  /// Shaped axis, -1 for the unshaped steps
+    Impulse impulse;
+    uint64_t next;             /// Index of the next command to apply
+  };
+
+  struct Move {
+    uint8_t shapedMask;        /// Motors moved by the shaped axes
+    FLOAT_T share[INPUT_SHAPER_AXES + 1][NUM_AXES]; /// Steps per command of each motor, unshaped then X and Y
+  };
+
+  struct Entry {
+    uint64_t tick;
+    uint64_t move;
+    uint8_t step;
+    uint8_t direction;
+  };
+
+  int types[INPUT_SHAPER_AXES];
+  FLOAT_T frequencies[INPUT_SHAPER_AXES];
+  FLOAT_T dampings[INPUT_SHAPER_AXES];
+  std::vector<Stream> streams;
+
+  std::deque<Move> moves;
+  std::deque<Entry> entries;
+  uint64_t firstMove;          /// Number of the first move kept
+  uint64_t firstEntry;         /// Number of the first command kept
+  uint64_t clock;              /// Start of the next block in PRU cycles
+
+  FLOAT_T error[NUM_AXES];     /// Shaped position minus the steps done
+  uint8_t direction;           /// Last direction of each motor
+
+  std::vector<SteppersCommand>* out;
+  uint64_t outTick;            /// Time of the last command of out
+
+  void apply(const Stream& stream, const Entry& entry, uint64_t tick);
+  void step(int motor, bool forward, uint64_t tick);
+  void wait(uint64_t until);
+  void release();
+
+ public:
+  InputShaper();
+
+  /**
+   * @brief Set the shaper of an axis
+   * @param axis 0 for X, 1 for Y
+   * @param type One of INPUT_SHAPER_NONE, _ZV, _ZVD or _MZV
+   * @param frequency Resonance frequency in Hz, 0 for none
+   * @param damping Damping ratio of the resonance
+   */
+  void configure(int axis, int type, FLOAT_T frequency, FLOAT_T damping);
+
+  /**
+   * @brief If any axis is shaped
+   */
+  bool isEnabled();
+
+  /**
+   * @brief If all the steps shaped so far are sent
+   */
+  bool isIdle() { return entries.empty(); }
+
+  /**
+   * @brief Shape the step commands of a move
+   * @details The commands are the steps of the move as generated, before any compression.
+   * The shaped commands take as long as the move, unless flushed, and then end with the
+   * last step.
+   *
+   * @param commands The commands of the move
+   * @param count Number of commands
+   * @param shapedSteps Steps of each motor due to X then to Y, see Path::getShapedSteps
+   * @param flush Send all the steps pending, to end with this move
+   * @param shaped Set to the commands to send
+   * @return Length of the shaped commands in PRU cycles
+   */
+  uint64_t shape(const SteppersCommand* commands, size_t count, const FLOAT_T* shapedSteps,
+		 bool flush, std::vector<SteppersCommand>& shaped);
+
+  /**
+   * @brief Forget the steps pending, after the PRU was reset
+   */
+  void reset();
+};
+
+#endif
@@ -53,10 +53,13 @@ void Path::zero() {
   accel = 0;
   fullInterval = 0;
   primaryAxisAcceleration = 0;
+  primaryAxisJerk = 0;
+  primaryAxisPeakAcceleration = 0;
   primaryAxisSteps = 0;
 
   startPos.assign(NUM_AXES, 0);
   endPos.assign(NUM_AXES, 0);
+  shapedSteps.assign(INPUT_SHAPER_AXES*NUM_AXES, 0);
 
   stepperPath = { 0 };
 }
@@ -90,10 +93,13 @@ Path::Path(const Path& path) {
   accel = path.accel;
   fullInterval = path.fullInterval;
   primaryAxisAcceleration = path.primaryAxisAcceleration;
+  primaryAxisJerk = path.primaryAxisJerk;
+  primaryAxisPeakAcceleration = path.primaryAxisPeakAcceleration;
   primaryAxisSteps = path.primaryAxisSteps;
 
   startPos = path.startPos;
   endPos = path.endPos;
+  shapedSteps = path.shapedSteps;
 
   stepperPath = path.stepperPath;
 }
@@ -153,7 +159,8 @@ void Path::initialize(const std::vector<FLOAT_T>& startPos,
 void Path::calculate(const std::vector<FLOAT_T>& axis_diff,
 		     const std::vector<FLOAT_T>& minSpeeds,
 		     const std::vector<FLOAT_T>& maxSpeeds,
-		     const std::vector<FLOAT_T>& maxAccelStepsPerSquareSecond) {
+		     const std::vector<FLOAT_T>& maxAccelStepsPerSquareSecond,
+		     const std::vector<FLOAT_T>& maxJerkStepsPerCubeSecond) {
 
   std::vector<unsigned int> axisInterval(NUM_AXES, 0);
 
@@ -213,6 +220,30 @@ void Path::calculate(const std::vector<FLOAT_T>& axis_diff,
   errors[0] = errors[1] = errors[2] = deltas[primaryAxis] >> 1;
   primaryAxisAcceleration = slowest_axis_plateau_time_repro / axisInterval[primaryAxis]; // a = v/t = F_CPU/(c*t): Steps/s^2
 
+  // The other axes step in proportion to the primary one, so do their jerks.
+  // Axes without an S-curve jerk follow the others.
+  primaryAxisJerk = 0;
+  for (int i = 0; i < NUM_AXES; i++) {
+    if (isAxisMove(i) && maxJerkStepsPerCubeSecond[i] > 0) {
+      FLOAT_T jerk = maxJerkStepsPerCubeSecond[i] * deltas[primaryAxis] / deltas[i];
+      primaryAxisJerk = (primaryAxisJerk > 0 ? std::min(primaryAxisJerk, jerk) : jerk);
+    }
+  }
+
+  // An S-curve from standstill to full speed that keeps to the acceleration and
+  // the jerk takes longer than the trapezoid. The move is planned at the average
+  // acceleration of that S-curve, so its ramps are given the time they need.
+  primaryAxisPeakAcceleration = primaryAxisAcceleration;
+  if (primaryAxisJerk > 0) {
+    FLOAT_T a = primaryAxisPeakAcceleration;
+    FLOAT_T v = F_CPU / (FLOAT_T)fullInterval; // steps/s
+    FLOAT_T rampTime = (v * primaryAxisJerk >= a * a ? v / a + a / primaryAxisJerk
+			: 2 * sqrt(v / primaryAxisJerk));
+    FLOAT_T scale = v / (rampTime * a);
+    primaryAxisAcceleration = std::max<FLOAT_T>(1, primaryAxisAcceleration * scale);
+    slowest_axis_plateau_time_repro *= scale;
+  }
+
   //Now we can calculate the new primary axis acceleration, so that the slowest axis max acceleration is not violated
   //LOG("p->accelerationPrim: " << p->accelerationPrim << " steps/s"<< std::endl);
 
@@ -276,5 +307,55 @@ void Path::updateStepperPathParameters() {
   }
   LOG("accelSteps: " << stepperPath.accelSteps << " steps" <<std::endl);
 
+  // Speed at the end of the acceleration, below vMax if the plateau is never reached
+  stepperPath.vPeak = std::min(stepperPath.vMax,
+			       (FLOAT_T)sqrt(stepperPath.vStart * stepperPath.vStart
+					     + 2.0 * primaryAxisAcceleration * stepperPath.accelSteps));
+  stepperPath.vPeak = std::max(stepperPath.vPeak, stepperPath.vStart);
+  stepperPath.acceleration = primaryAxisAcceleration;
+  stepperPath.peakAcceleration = primaryAxisPeakAcceleration;
+  stepperPath.jerk = primaryAxisJerk;
+
   joinFlags |= FLAG_JOIN_STEPPARAMS_COMPUTED;
 }
+
+void SCurveProfile::plan(FLOAT_T vFrom, FLOAT_T vTo, FLOAT_T acceleration, FLOAT_T peak, FLOAT_T jerk) {
+  this->vFrom = vFrom;
+  this->vTo = vTo;
+  FLOAT_T dv = std::fabs(vTo - vFrom);
+  duration = (acceleration > 0 ? dv / acceleration : 0);
+
+  // dv = jerk * jerkTime * (duration - jerkTime), the shorter solution.
+  // Without one the jerk is too low for the duration, take half of it each.
+  // Either way the acceleration, dv / (duration - jerkTime), stays at or
+  // below the peak, which shortens the jerk phases of small speed changes.
+  jerkTime = 0;
+  if (jerk > 0 && dv > 0) {
+    FLOAT_T discriminant = duration * duration - 4 * dv / jerk;
+    jerkTime = (discriminant > 0 ? (duration - sqrt(discriminant)) / 2 : duration / 2);
+    if (peak > 0)
+      jerkTime = std::max<FLOAT_T>(0, std::min(jerkTime, duration - dv / peak));
+  }
+  peakAcceleration = (duration > jerkTime ? dv / (duration - jerkTime) : acceleration);
+}
+
+FLOAT_T SCurveProfile::speedAt(FLOAT_T t) const {
+  if (t >= duration)
+    return vTo;
+  if (t <= 0)
+    return vFrom;
+
+  FLOAT_T dv;
+  if (jerkTime <= 0) {
+    dv = peakAcceleration * t;
+  } else {
+    FLOAT_T jerk = peakAcceleration / jerkTime;
+    if (t < jerkTime)
+      dv = jerk * t * t / 2;
+    else if (t < duration - jerkTime)
+      dv = peakAcceleration * (t - jerkTime / 2);
+    else
+      dv = std::fabs(vTo - vFrom) - jerk * (duration - t) * (duration - t) / 2;
+  }
+  return (vTo >= vFrom ? vFrom + dv : vFrom - dv);
+}
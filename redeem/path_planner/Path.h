@@ -34,12 +34,12 @@
 #include <vector>
 #include "config.h"
 #include "StepperCommand.h"
+#include "InputShaper.h"
 
 #define FLAG_WARMUP                (1 << 0)
 #define FLAG_WILL_REACH_FULL_SPEED (1 << 1)
 #define FLAG_ACCELERATION_ENABLED  (1 << 2)
 #define FLAG_CHECK_ENDSTOPS        (1 << 3)
-#define FLAG_BLOCKED               (1 << 4)
 #define FLAG_CANCELABLE            (1 << 5)
 #define FLAG_SYNC                  (1 << 6)
 #define FLAG_SYNC_WAIT             (1 << 7)
@@ -73,9 +73,35 @@ struct StepperPathParameters {
   FLOAT_T vMax;                   /// Maximum reached speed in steps/s.
   FLOAT_T vStart;                 /// Starting speed in steps/s.
   FLOAT_T vEnd;                   /// End speed in steps/s
+  FLOAT_T vPeak;                  /// Speed at the end of the acceleration in steps/s.
 
   unsigned int accelSteps;        /// How many steps does it take to reach the plateau.
   unsigned int decelSteps;        /// How many steps does it take to reach the end speed.
+
+  FLOAT_T acceleration;           /// Acceleration along the primary axis in steps/s^2.
+  FLOAT_T peakAcceleration;       /// Highest acceleration of an S-curve along the primary axis in steps/s^2.
+  FLOAT_T jerk;                   /// Jerk along the primary axis in steps/s^3, 0 for trapezoidal ramps.
+};
+
+/**
+ * A 7 segment S-curve speed change: the acceleration rises with a constant
+ * jerk, stays at its peak and falls back to 0 with the same jerk.
+ *
+ * The ramp takes as long as a trapezoidal one at the acceleration, so it
+ * covers the same distance as the planner expects. Moves with a jerk are
+ * planned at a lower acceleration than the configured one, the peak, see
+ * Path::calculate. The jerk phases are as long as the jerk allows, but no
+ * longer than keeps the acceleration at or below the peak.
+ */
+struct SCurveProfile {
+  FLOAT_T vFrom;
+  FLOAT_T vTo;
+  FLOAT_T duration;               /// Length of the ramp in seconds.
+  FLOAT_T jerkTime;               /// Length of each of the jerk phases in seconds.
+  FLOAT_T peakAcceleration;
+
+  void plan(FLOAT_T vFrom, FLOAT_T vTo, FLOAT_T acceleration, FLOAT_T peak, FLOAT_T jerk);
+  FLOAT_T speedAt(FLOAT_T t) const;
 };
 
 class Path {
@@ -101,10 +127,13 @@ private:
   FLOAT_T accel; // Acceleration in m/s^2
   unsigned int fullInterval;      /// interval at full speed in ticks/step.
   unsigned int primaryAxisAcceleration;  /// Acceleration along primary axis in steps/s²
+  FLOAT_T primaryAxisJerk;        /// S-curve jerk along primary axis in steps/s³, 0 for none
+  FLOAT_T primaryAxisPeakAcceleration; /// Highest S-curve acceleration along primary axis in steps/s²
   unsigned int primaryAxisSteps;  /// Total number of primary axis steps in the move
 
   std::vector<FLOAT_T> startPos;
   std::vector<FLOAT_T> endPos;
+  std::vector<FLOAT_T> shapedSteps; /// Steps of each motor due to X, then to Y, for the input shaper
 
 
 
@@ -127,7 +156,8 @@ public:
   void calculate(const std::vector<FLOAT_T>& axis_diff,
 		 const std::vector<FLOAT_T>& minSpeeds,
 		 const std::vector<FLOAT_T>& maxSpeeds,
-		 const std::vector<FLOAT_T>& maxAccelStepsPerSquareSecond);
+		 const std::vector<FLOAT_T>& maxAccelStepsPerSquareSecond,
+		 const std::vector<FLOAT_T>& maxJerkStepsPerCubeSecond);
 
   inline void clearJoinFlags() {
     joinFlags = 0;
@@ -181,18 +211,6 @@ public:
     primaryAxis = b;
   }
 
-  inline void block() {
-    flags |= FLAG_BLOCKED;
-  }
-
-  inline void unblock() {
-    flags &= ~FLAG_BLOCKED;
-  }
-
-  inline bool isBlocked() {
-    return flags & FLAG_BLOCKED;
-  }
-
   inline bool isCheckEndstops() {
     return flags & FLAG_CHECK_ENDSTOPS;
   }
@@ -249,6 +267,14 @@ public:
     return speeds;
   }
 
+  inline void setShapedSteps(const FLOAT_T* steps) {
+    shapedSteps.assign(steps, steps + INPUT_SHAPER_AXES*NUM_AXES);
+  }
+
+  inline const std::vector<FLOAT_T>& getShapedSteps() {
+    return shapedSteps;
+  }
+
   inline const std::vector<int>& getDeltas() {
     return deltas;
   }
@@ -299,6 +325,10 @@ public:
     return accelerationDistance2;
   }
 
+  inline FLOAT_T getDistance() {
+    return distance;
+  }
+
   inline unsigned int getFullInterval() {
     return fullInterval;
   }
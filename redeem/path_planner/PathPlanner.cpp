@@ -28,24 +28,48 @@
 #include <cmath>
 #include <assert.h>
 #include <thread>
+#include <chrono>
 #include <Python.h>
 
+// Nanoseconds spent since start, for the telemetry wait times
+static unsigned long long elapsedNanoseconds(std::chrono::steady_clock::time_point start) {
+  return std::chrono::duration_cast<std::chrono::nanoseconds>(std::chrono::steady_clock::now() - start).count();
+}
+
 
 PathPlanner::PathPlanner(unsigned int cacheSize) {
   linesPos = 0;
   linesWritePos = 0;
+  linesWritten = 0;
+  linesPublished = 0;
+  linesClaimed = 0;
+  linesConsumed = 0;
+  replanFrom = NO_LINE;
+  lineWaiters = 0;
   LOG( "PathPlanner " << PATH_PLANNER_VERSION << std::endl);
   moveCacheSize = cacheSize;
   lines.resize(moveCacheSize);
   printMoveBufferWait = 250;
   minBufferedMoveTime = 100;
   maxBufferedMoveTime = 6 * printMoveBufferWait;
-  linesCount = 0;
   linesTicksCount = 0;
+  pendingLines = 0;
+  pendingTicks = 0;
+  deferPlanning = false;
+  batchLines = 0;
+  planPending = false;
+  unplannedLine = 0;
+  unplannedLines = 0;
   stop = false;
   hasEndABC = false;
+  endABCRevision = 0;
+  hasPlannedABC = false;
 	
   max_path_length = 1e6;
+  junctionDeviation = 0;
+  arc_chord_error = 0.00001;
+  arc_max_segment_length = 0.002;
+  delta_max_deviation = 0;
   axis_config = AXIS_CONFIG_XY;
   has_slaves = false;
 
@@ -53,12 +77,30 @@ PathPlanner::PathPlanner(unsigned int cacheSize) {
   minSpeeds.resize(NUM_AXES, 0);
   maxJerks.resize(NUM_AXES, 0);
   maxAccelerationStepsPerSquareSecond.resize(NUM_AXES, 0);
+  maxJerkStepsPerCubeSecond.resize(NUM_AXES, 0);
+  sCurveJerks.resize(NUM_AXES, 0);
+  pressureAdvance.resize(NUM_AXES, 0);
   maxAccelerationMPerSquareSecond.resize(NUM_AXES, 0);
   axisStepsPerM.resize(NUM_AXES, 0);
 	
   soft_endstops_min.resize(NUM_AXES, 0);
   soft_endstops_max.resize(NUM_AXES, 0);
   state.resize(NUM_AXES, 0);
+  ideal_state.resize(NUM_AXES, 0);
+  stepErrors.resize(NUM_AXES, 0);
+  advanceSteps.resize(NUM_AXES, 0);
+  for(int i=0; i<INPUT_SHAPER_AXES; i++){
+    inputShaperTypes[i] = INPUT_SHAPER_NONE;
+    inputShaperFrequencies[i] = 0;
+    inputShaperDampings[i] = 0;
+  }
+  inputShaping = false;
+  inputShaperChanged = false;
+  inputShaperReset = false;
+  commandBufferGrows = 0;
+  queuedLines = 0;
+  pruIdleExpected = true;
+  resetTelemetry();
   backlash_compensation.resize(NUM_AXES, 0);
   backlash_state.resize(NUM_AXES, 0);
 	
@@ -71,6 +113,8 @@ PathPlanner::PathPlanner(unsigned int cacheSize) {
   
   startABC.resize(3, 0);
   endABC.resize(3, 0);
+  endXYZ.resize(3, 0);
+  plannedABC.resize(3, 0);
 
   recomputeParameters();
 
@@ -81,6 +125,8 @@ void PathPlanner::recomputeParameters() {
   for(int i=0; i<NUM_AXES; i++){
     /** Acceleration in steps/s^2 in printing mode.*/
     maxAccelerationStepsPerSquareSecond[i] =  maxAccelerationMPerSquareSecond[i] * axisStepsPerM[i];
+    /** S-curve jerk in steps/s^3, 0 for trapezoidal ramps.*/
+    maxJerkStepsPerCubeSecond[i] = sCurveJerks[i] * axisStepsPerM[i];
   }
 }
 
@@ -89,17 +135,15 @@ bool PathPlanner::queueSyncEvent(bool isBlocking /* = true */){
   PyThreadState *_save; 
   _save = PyEval_SaveThread();
 
-  // If the move command buffer isn't empty, make the last line a sync event
-  {	
-    std::unique_lock<std::mutex> lk(line_mutex);
-    if(linesCount > 0){
-      unsigned int lastLine = (linesWritePos == 0) ? moveCacheSize - 1 : linesWritePos - 1;
-      Path *p = &lines[lastLine];
-      p->setSyncEvent(isBlocking);
-      PyEval_RestoreThread(_save);
-      return true;
-    }
+  // If the last line isn't sent yet, make it a sync event
+  unsigned long long last = linesWritten - 1;
+  if(linesWritten > 0 && reserveLines(last) == last){
+    lines[last % moveCacheSize].setSyncEvent(isBlocking);
+    releaseLines();
+    PyEval_RestoreThread(_save);
+    return true;
   }
+  releaseLines();
 
   PyEval_RestoreThread(_save);
   return false;	// If the move command buffer is completly empty, it's too late.
@@ -130,11 +174,74 @@ void PathPlanner::queueMove(std::vector<FLOAT_T> startPos, std::vector<FLOAT_T>
 			    bool use_backlash_compensation, int tool_axis,
 			    bool virgin) 
 {
-
-  
   if ( startPos.size() != NUM_AXES ) {throw InputSizeError();}
   if ( endPos.size() != NUM_AXES ) {throw InputSizeError();}
 
+  PyThreadState *_save; 
+  _save = PyEval_SaveThread();
+
+  queueMoveUnlocked(startPos, endPos, speed, accel, cancelable, optimize,
+		    enable_soft_endstops, use_bed_matrix, use_backlash_compensation,
+		    tool_axis, virgin);
+  publishLines();
+
+  PyEval_RestoreThread(_save);
+}
+
+void PathPlanner::queueMoves(FLOAT_T* positions, int rows, int cols,
+			     FLOAT_T* speeds, int n_speeds,
+			     FLOAT_T* accels, int n_accels,
+			     int* flags, int n_flags,
+			     int tool_axis)
+{
+  if ( cols != NUM_AXES ) {throw InputSizeError();}
+  if ( n_speeds != rows || n_accels != rows || n_flags != rows ) {throw InputSizeError();}
+  if ( rows == 0 ) {
+    return;
+  }
+
+  PyThreadState *_save; 
+  _save = PyEval_SaveThread();
+
+  // The start position is unused apart from the soft endstop check
+  std::vector<FLOAT_T> startPos(NUM_AXES, 0);
+  std::vector<FLOAT_T> endPos(NUM_AXES, 0);
+
+  deferPlanning = true;
+  batchLines = 0;
+
+  for (int row = 0; row < rows && !stop; row++) {
+    FLOAT_T* position = positions + row * cols;
+    for (int i = 0; i<NUM_AXES; ++i) {
+      endPos[i] = position[i];
+    }
+    queueMoveUnlocked(startPos, endPos, speeds[row], accels[row],
+		      flags[row] & MOVE_FLAG_CANCELABLE,
+		      flags[row] & MOVE_FLAG_OPTIMIZE,
+		      flags[row] & MOVE_FLAG_SOFT_ENDSTOPS,
+		      flags[row] & MOVE_FLAG_BED_MATRIX,
+		      flags[row] & MOVE_FLAG_BACKLASH_COMPENSATION,
+		      tool_axis, true);
+  }
+
+  // The rows are ideal positions, the last one is where the user wants to be
+  for (int i = 0; i<NUM_AXES; ++i) {
+    ideal_state[i] = positions[(rows - 1) * cols + i];
+  }
+
+  deferPlanning = false;
+  publishLines();
+
+  PyEval_RestoreThread(_save);
+}
+
+void PathPlanner::queueMoveUnlocked(std::vector<FLOAT_T> startPos, std::vector<FLOAT_T> endPos, 
+				    FLOAT_T speed, FLOAT_T accel, 
+				    bool cancelable, bool optimize, 
+				    bool enable_soft_endstops, bool use_bed_matrix, 
+				    bool use_backlash_compensation, int tool_axis,
+				    bool virgin) 
+{
   ////////////////////////////////////////////////////////////////////
   // PRE-PROCESSING
   ////////////////////////////////////////////////////////////////////
@@ -210,6 +317,11 @@ void PathPlanner::queueMove(std::vector<FLOAT_T> startPos, std::vector<FLOAT_T>
   reverseTransformVector(vec);
 	
   // and now vec is back in physical space
+
+  FLOAT_T shapedSteps[INPUT_SHAPER_AXES*NUM_AXES];
+  if (inputShaping) {
+    computeShapedSteps(state, vec, shapedSteps);
+  }
 	
   // backlash compensation
   if (use_backlash_compensation) {
@@ -238,29 +350,15 @@ void PathPlanner::queueMove(std::vector<FLOAT_T> startPos, std::vector<FLOAT_T>
     
     
   std::vector<FLOAT_T> axis_diff(NUM_AXES, 0);        // Axis movement in m
-  PyThreadState *_save; 
-  _save = PyEval_SaveThread();
-
-  unsigned int linesQueued = 0;
-  unsigned int linesCacheRemaining = 0;
-  long long linesTicksRemaining = 0;
-  long long linesTicksQueued = 0;
 
   // wait for the worker
-  if(linesCacheRemaining == 0 || linesTicksRemaining == 0){
-    std::unique_lock<std::mutex> lk(line_mutex);
-    //LOG( "Waiting for free move command space... Current: " << moveCacheSize - linesCount << std::endl);
-    lineAvailable.wait(lk, [this]{return stop || (linesCount < moveCacheSize && !isLinesBufferFilled());});
-    linesCacheRemaining = moveCacheSize - linesCount;
-    linesTicksRemaining = maxBufferedMoveTime - linesTicksCount;
-  }	
-  if(stop){
-    PyEval_RestoreThread(_save);
-    LOG( "Stopped/aborted/Cancelled while waiting for free move command space. linesCount: " << linesCount << std::endl);
+  if(!waitForLineSpace()){
+    LOG( "Stopped/aborted/Cancelled while waiting for free move command space. linesCount: " << linesCount() << std::endl);
     return;
   }
 
-  Path *p = &lines[linesWritePos];
+  unsigned int index = linesWritePos;
+  Path *p = &lines[index];
   std::vector<FLOAT_T> stepperStartPos(NUM_AXES, 0);
   std::vector<FLOAT_T> stepperEndPos(NUM_AXES, 0);
   FLOAT_T distance = 0;
@@ -280,10 +378,12 @@ void PathPlanner::queueMove(std::vector<FLOAT_T> startPos, std::vector<FLOAT_T>
   FLOAT_T machineSpeed = distance / desiredTime;
 
   p->initialize(stepperStartPos, stepperEndPos, distance, speed, accel, cancelable);
+  if (inputShaping) {
+    p->setShapedSteps(shapedSteps);
+  }
 
   if(p->isNoMove()){
     LOG( "PathPlanner::queueMove: Warning: no move path" << std::endl);
-    PyEval_RestoreThread(_save);
     return; // No steps included
   }
 
@@ -291,35 +391,267 @@ void PathPlanner::queueMove(std::vector<FLOAT_T> startPos, std::vector<FLOAT_T>
   // PERFORM PLANNING
   ////////////////////////////////////////////////////////////////////
 
-  p->calculate(axis_diff, minSpeeds, maxSpeeds, maxAccelerationStepsPerSquareSecond);
-  updateTrapezoids();
-  linesWritePos++;
-  linesQueued++;
-  linesCacheRemaining--;
-  linesTicksQueued += p->getTimeInTicks();
-  linesTicksRemaining -= p->getTimeInTicks();
+  p->calculate(axis_diff, minSpeeds, maxSpeeds, maxAccelerationStepsPerSquareSecond, maxJerkStepsPerCubeSecond);
+  planLine(index);
+  nextPlannerIndex(index);
+  linesWritePos = index;
+  linesWritten++;
+  pendingLines++;
+  pendingTicks += p->getTimeInTicks();
+  queuedLines++;
 
   LOG("PathPlanner::queueMove: Move queued for the worker" << std::endl);
+}
 
-  if(linesWritePos>=moveCacheSize)
-    linesWritePos = 0;
+/**
+   Wait until there is room for one more line in the cache.
 
-  // Notify the run() thread to work
-  if((linesCacheRemaining == 0) || linesTicksRemaining <= 0){
-    {
-      std::lock_guard<std::mutex> lk(line_mutex);
-      linesCount += linesQueued;
-      linesTicksCount += linesTicksQueued;
-    }
-    linesQueued = 0;
-    linesTicksQueued = 0;
+   Lines queued but not yet handed to the worker count as used. If they are
+   what fills the cache they are handed over first, otherwise we would wait
+   for a worker that has nothing to do.
+*/
+bool PathPlanner::waitForLineSpace(){
+  auto hasSpace = [this]{return stop || (linesWritten - linesConsumed < moveCacheSize && !isLinesBufferFilled());};
+  if(pendingLines > 0 && !hasSpace())
+    publishLines();
+  //LOG( "Waiting for free move command space... Current: " << moveCacheSize - linesCount() << std::endl);
+  if(!hasSpace()){
+    std::chrono::steady_clock::time_point start = std::chrono::steady_clock::now();
+    waitLines(hasSpace);
+    lineSpaceWaitTime += elapsedNanoseconds(start);
+  }
+  return !stop;
+}
+
+/**
+   Plan the line just written at index.
+
+   Outside of a batch this is a plain updateTrapezoids. Inside a batch only the
+   junction speed to the previous line of the batch is computed and the
+   lookahead is run once for all of them in flushPlanning. A change between
+   extruder only and normal moves fixes the junction anyway, so the pending
+   lines are planned up to there first. So are long batches, before the
+   first pending line falls out of the PLANNER_REPLAN_WINDOW updateTrapezoids
+   goes back over.
+*/
+void PathPlanner::planLine(unsigned int index){
+  unsigned int previousIndex = index;
+  previousPlannerIndex(previousIndex);
+  Path *previous = &lines[previousIndex];
+  Path *act = &lines[index];
+
+  if(deferPlanning && batchLines > 0 && previous->isAxisOnlyMove(E_AXIS) == act->isAxisOnlyMove(E_AXIS)){
+    computeMaxJunctionSpeed(previous, act);
+    unplannedLine = index;
+    planPending = true;
+    if(++unplannedLines >= PLANNER_REPLAN_WINDOW / 2)
+      flushPlanning();
+  }
+  else{
+    flushPlanning();
+    updateTrapezoids(index);
+  }
+  if(deferPlanning)
+    batchLines++;
+}
+
+void PathPlanner::flushPlanning(){
+  if(planPending){
+    updateTrapezoids(unplannedLine);
+    planPending = false;
+  }
+  unplannedLines = 0;
+}
+
+// Hand the queued lines over to the run() thread
+void PathPlanner::publishLines(){
+  flushPlanning();
+  if(pendingLines == 0)
+    return;
+  linesTicksCount += pendingTicks;
+  linesPublished = linesWritten;
+  pendingLines = 0;
+  pendingTicks = 0;
+  notifyLines();
+  LOG("PathPlanner::queueMove: Poked the worker" << std::endl);
+}
+
+// Wake whoever waits for the ring to move, only taking the lock if someone does
+void PathPlanner::notifyLines(){
+  if(lineWaiters){
+    { std::lock_guard<std::mutex> lk(line_mutex); }
     lineAvailable.notify_all();
-    LOG("PathPlanner::queueMove: Poked the worker" << std::endl);
   }
+}
 
-  PyEval_RestoreThread(_save);
+/**
+   Announce that the planner updates the lines from first on and return the
+   first it may update, past the lines run() has taken. From the return to
+   releaseLines() run() doesn't take any of those lines.
+*/
+unsigned long long PathPlanner::reserveLines(unsigned long long first){
+  unsigned long long claimed;
+  replanFrom = first;
+  while((claimed = linesClaimed) > first){
+    first = claimed;
+    replanFrom = first;
+  }
+  return first;
 }
 
+void PathPlanner::releaseLines(){
+  replanFrom = NO_LINE;
+}
+
+/**
+   Take the line at linesPos for sending, waiting while the planner updates it.
+   Returns false if there is no line to take.
+*/
+bool PathPlanner::claimLine(){
+  unsigned long long line = linesConsumed;
+  if(line == linesPublished)
+    return false;
+  linesClaimed = line + 1;
+  while(replanFrom <= line)
+    std::this_thread::yield();
+  return true;
+}
+
+void PathPlanner::queueLinearMove(int axis_mask, std::vector<FLOAT_T> values,
+				  FLOAT_T speed, FLOAT_T accel,
+				  int movement, int relative_mask, int flags, int tool_axis)
+{
+  if ( values.size() != NUM_AXES ) {throw InputSizeError();}
+
+  std::vector<FLOAT_T> endPos(NUM_AXES, 0);
+
+  if (movement == MOVE_RELATIVE) {
+    // Relative moves are made from where we really are and bypass the bed matrix
+    for (int i = 0; i<NUM_AXES; ++i) {
+      endPos[i] = state[i];
+      if (axis_mask & (1 << i)) {
+        ideal_state[i] += values[i];
+        endPos[i] += values[i];
+      }
+    }
+  } else {
+    for (int i = 0; i<NUM_AXES; ++i) {
+      if (axis_mask & (1 << i)) {
+        if (movement == MOVE_MIXED && (relative_mask & (1 << i)))
+          ideal_state[i] += values[i];
+        else
+          ideal_state[i] = values[i];
+      }
+    }
+    endPos = ideal_state;
+    if (flags & MOVE_FLAG_BED_MATRIX) {
+      applyBedCompensation(endPos);
+    }
+  }
+
+  // The start position is unused apart from the soft endstop check
+  std::vector<FLOAT_T> startPos(NUM_AXES, 0);
+
+  queueMove(startPos, endPos, speed, accel,
+	    flags & MOVE_FLAG_CANCELABLE,
+	    flags & MOVE_FLAG_OPTIMIZE,
+	    flags & MOVE_FLAG_SOFT_ENDSTOPS,
+	    false,
+	    flags & MOVE_FLAG_BACKLASH_COMPENSATION,
+	    tool_axis, true);
+}
+
+void PathPlanner::queueArc(int axis_mask, std::vector<FLOAT_T> values,
+			   FLOAT_T i, FLOAT_T j, bool clockwise,
+			   FLOAT_T speed, FLOAT_T accel,
+			   int movement, int relative_mask, int flags, int tool_axis)
+{
+  if ( values.size() != NUM_AXES ) {throw InputSizeError();}
+
+  // Arcs are made from the ideal position, so the segments join up with the
+  // moves around them the way the user wrote them
+  std::vector<FLOAT_T> arcStart = ideal_state;
+  std::vector<FLOAT_T> arcEnd = ideal_state;
+  for (int a = 0; a<NUM_AXES; ++a) {
+    if (axis_mask & (1 << a)) {
+      if (movement == MOVE_RELATIVE || (movement == MOVE_MIXED && (relative_mask & (1 << a))))
+        arcEnd[a] += values[a];
+      else
+        arcEnd[a] = values[a];
+    }
+  }
+
+  FLOAT_T centerX = arcStart[0] + i;
+  FLOAT_T centerY = arcStart[1] + j;
+  FLOAT_T startRadius = sqrt(i*i + j*j);
+  FLOAT_T endRadius = sqrt((arcEnd[0]-centerX)*(arcEnd[0]-centerX) + (arcEnd[1]-centerY)*(arcEnd[1]-centerY));
+  FLOAT_T startAngle = atan2(-j, -i);
+  FLOAT_T endAngle = atan2(arcEnd[1]-centerY, arcEnd[0]-centerX);
+
+  // The angle swept, always positive, counter clockwise unless clockwise
+  FLOAT_T sweep = clockwise ? startAngle - endAngle : endAngle - startAngle;
+  if (sweep < 0)
+    sweep += 2*M_PI;
+  FLOAT_T dx = arcEnd[0] - arcStart[0];
+  FLOAT_T dy = arcEnd[1] - arcStart[1];
+  if (dx*dx + dy*dy < 1e-18)
+    sweep = 2*M_PI;
+
+  // The chord error bounds the angle of a segment, so the number of segments
+  // grows with the square root of the radius rather than with the length
+  unsigned int segments = 1;
+  if (startRadius > 0 && endRadius > 0) {
+    FLOAT_T radius = std::max(startRadius, endRadius);
+    FLOAT_T maxAngle = ARC_MAX_SEGMENT_ANGLE;
+    if (arc_chord_error > 0 && arc_chord_error < radius)
+      maxAngle = std::min(maxAngle, 2*acos(1 - arc_chord_error/radius));
+    if (arc_max_segment_length > 0)
+      maxAngle = std::min(maxAngle, arc_max_segment_length/radius);
+    segments = std::max<unsigned int>(1, ceil(sweep/maxAngle));
+  } else {
+    LOG("PathPlanner::queueArc: no radius, moving in a line" << std::endl);
+  }
+
+  PyThreadState *_save; 
+  _save = PyEval_SaveThread();
+
+  // The start position is unused apart from the soft endstop check
+  std::vector<FLOAT_T> startPos(NUM_AXES, 0);
+  std::vector<FLOAT_T> endPos(NUM_AXES, 0);
+
+  deferPlanning = true;
+  batchLines = 0;
+
+  for (unsigned int s = 1; s <= segments && !stop; s++) {
+    if (s == segments) {
+      endPos = arcEnd;
+    } else {
+      FLOAT_T t = s / (FLOAT_T)segments;
+      FLOAT_T angle = startAngle + (clockwise ? -sweep : sweep) * t;
+      FLOAT_T radius = startRadius + (endRadius - startRadius) * t;
+      for (int a = 0; a<NUM_AXES; ++a)
+        endPos[a] = arcStart[a] + (arcEnd[a] - arcStart[a]) * t;
+      endPos[0] = centerX + radius * cos(angle);
+      endPos[1] = centerY + radius * sin(angle);
+    }
+    queueMoveUnlocked(startPos, endPos, speed, accel,
+		      flags & MOVE_FLAG_CANCELABLE,
+		      flags & MOVE_FLAG_OPTIMIZE,
+		      flags & MOVE_FLAG_SOFT_ENDSTOPS,
+		      flags & MOVE_FLAG_BED_MATRIX,
+		      flags & MOVE_FLAG_BACKLASH_COMPENSATION,
+		      tool_axis, true);
+  }
+
+  ideal_state = arcEnd;
+  arcs++;
+  arcSegments += segments;
+
+  deferPlanning = false;
+  publishLines();
+
+  PyEval_RestoreThread(_save);
+}
 
 /**
    This is the path planner.
@@ -329,13 +661,15 @@ void PathPlanner::queueMove(std::vector<FLOAT_T> startPos, std::vector<FLOAT_T>
    is already optimal from previous updates.
    The first 2 entries in the queue are not checked. The first is the one that is already in print and the following will likely become active.
  
-   The method is called before lines_count is increased!
+   last is the line that was just written. The method is called before lines_count is increased!
 */
-void PathPlanner::updateTrapezoids(){
-  unsigned int first = linesWritePos;
-  Path *firstLine;
-  Path *act = &lines[linesWritePos];
-  unsigned int maxfirst = linesPos; // first non fixed segment
+void PathPlanner::updateTrapezoids(unsigned int last){
+  unsigned int first = last;
+  Path *act = &lines[last];
+  // The planner goes back over the lines of the window run() hasn't taken
+  unsigned long long lastNumber = lineNumber(last);
+  unsigned long long firstNumber = reserveLines(lastNumber > PLANNER_REPLAN_WINDOW ? lastNumber - PLANNER_REPLAN_WINDOW : 0);
+  unsigned int maxfirst = firstNumber % moveCacheSize; // first non fixed segment
 
   //LOG("UpdateTRapezoids:: "<<std::endl);
     
@@ -344,25 +678,22 @@ void PathPlanner::updateTrapezoids(){
     //LOG("caling previousPlannerIndex"<<std::endl);
     previousPlannerIndex(first);
   }
-  if(first != linesWritePos && lines[first].isEndSpeedFixed()){
+  if(first != last && lines[first].isEndSpeedFixed()){
     //LOG("caling nextPlannerIndex"<<std::endl);
     nextPlannerIndex(first);
   }
-  if(first == linesWritePos){   // Nothing to plan
+  if(first == last){   // Nothing to plan
     //LOG("Nothing to plan"<<std::endl);
-    act->block();
     act->setStartSpeedFixed(true);
     act->updateStepperPathParameters();
-    act->unblock();
+    releaseLines();
     return;
   }
   // now we have at least one additional move for optimization
   // that is not a wait move
   // First is now the new element or the first element with non fixed end speed.
   // anyhow, the start speed of first is fixed
-  firstLine = &lines[first];
-  firstLine->block(); // don't let printer touch this or following segments during update
-  unsigned int previousIndex = linesWritePos;
+  unsigned int previousIndex = last;
   previousPlannerIndex(previousIndex);
   Path *previous = &lines[previousIndex];
 
@@ -374,41 +705,66 @@ void PathPlanner::updateTrapezoids(){
     previous->setEndSpeedFixed(true);
     act->setStartSpeedFixed(true);
     act->updateStepperPathParameters();
-    firstLine->unblock();
+    releaseLines();
     return;
   }
-  backwardPlanner(linesWritePos,first);
+  backwardPlanner(last,first);
   // Reduce speed to reachable speeds
-  forwardPlanner(first);
+  forwardPlanner(first, last);
 	
   // Update precomputed data
   do{
     lines[first].updateStepperPathParameters();
-    lines[first].unblock();  // Flying block to release next used segment as early as possible
     nextPlannerIndex(first);
-    lines[first].block();
   }
-  while(first!=linesWritePos);
+  while(first!=last);
   act->updateStepperPathParameters();
-  act->unblock();
+  releaseLines();
 
   //LOG("UpdateTRapezoids:: done"<<std::endl);
 }
 
 void PathPlanner::computeMaxJunctionSpeed(Path *previous, Path *current){
   FLOAT_T factor = 1;
+  const std::vector<FLOAT_T>& previousSpeeds = previous->getSpeeds();
+  const std::vector<FLOAT_T>& currentSpeeds = current->getSpeeds();
     
   LOG("PathPlanner::computeMaxJunctionSpeed()"<<std::endl);
 
-  for(int i=0; i<NUM_AXES; i++){
-    FLOAT_T jerk = std::fabs(current->getSpeeds()[i] - previous->getSpeeds()[i]) * F_CPU; // m/tick * ticks/s = m/s
+  // XYZ direction of both segments, for junction deviation
+  FLOAT_T previousNorm = 0, currentNorm = 0, dot = 0;
+  for(int i=0; i<3; i++){
+    previousNorm += previousSpeeds[i] * previousSpeeds[i];
+    currentNorm += currentSpeeds[i] * currentSpeeds[i];
+    dot += previousSpeeds[i] * currentSpeeds[i];
+  }
+  bool useJunctionDeviation = junctionDeviation > 0 && previousNorm > 0 && currentNorm > 0;
+
+  for(int i=(useJunctionDeviation ? 3 : 0); i<NUM_AXES; i++){
+    FLOAT_T jerk = std::fabs(currentSpeeds[i] - previousSpeeds[i]) * F_CPU; // m/tick * ticks/s = m/s
 
     if (jerk > maxJerks[i]){
       factor = std::min(factor, maxJerks[i] / jerk);
     }
   }
 
-  previous->setMaxJunctionSpeed(std::min(previous->getFullSpeed() * factor, current->getFullSpeed()));
+  FLOAT_T junctionSpeed = std::min(previous->getFullSpeed() * factor, current->getFullSpeed());
+
+  if(useJunctionDeviation){
+    // cos of the angle between the segments, -1 going straight on, 1 going back
+    FLOAT_T cosTheta = -dot / sqrt(previousNorm * currentNorm);
+    if(cosTheta > 0.999999){
+      junctionSpeed = 0; // raised to the minimum speed by the planner
+    }
+    else if(cosTheta > -0.999999){
+      FLOAT_T sinThetaD2 = sqrt(0.5 * (1 - cosTheta));
+      FLOAT_T accel = std::min(previous->getAccelerationDistance2() / (2 * previous->getDistance()),
+			       current->getAccelerationDistance2() / (2 * current->getDistance()));
+      junctionSpeed = std::min(junctionSpeed, (FLOAT_T)sqrt(accel * junctionDeviation * sinThetaD2 / (1 - sinThetaD2)));
+    }
+  }
+
+  previous->setMaxJunctionSpeed(junctionSpeed);
   LOG("PathPlanner::computeMaxJunctionSpeed: Max junction speed = "<<previous->getMaxJunctionSpeed()<<std::endl);
 }
 
@@ -457,12 +813,12 @@ void PathPlanner::backwardPlanner(unsigned int start, unsigned int last){
   } // while loop
 }
 
-void PathPlanner::forwardPlanner(unsigned int first){
+void PathPlanner::forwardPlanner(unsigned int first, unsigned int last){
   Path *act;
   Path *next = &lines[first];
   FLOAT_T vmaxRight;
   FLOAT_T leftSpeed = next->getStartSpeed();
-  while(first != linesWritePos){   // All except last segment, which has fixed end speed
+  while(first != last){   // All except last segment, which has fixed end speed
     act = next;
     nextPlannerIndex(first);
     next = &lines[first];
@@ -502,9 +858,91 @@ void PathPlanner::forwardPlanner(unsigned int first){
   next->setStartSpeed(std::max(next->getMinSpeed(), leftSpeed)); // This is the new segment, which is updated anyway, no extra flag needed.
 }
 
+/**
+   Size the step command buffer for an average line when the cache holds
+   the maximum buffered move time, stepping as fast as the PRU firmware can.
+   Lines with more steps than that grow it.
+*/
+void PathPlanner::reserveCommandBuffer() {
+  unsigned long long ticksPerLine = (F_CPU/1000) * (unsigned long long)maxBufferedMoveTime / moveCacheSize;
+  size_t size = std::max<size_t>(ticksPerLine / PRU_MIN_STEP_INTERVAL, 1);
+  if(stepCommands.size() < size)
+    stepCommands.resize(size);
+  shapedCommands.reserve(size);
+}
+
+unsigned int PathPlanner::getCommandBufferGrowCount() {
+  return commandBufferGrows;
+}
+
+unsigned int PathPlanner::getCommandBufferSize() {
+  return stepCommands.size();
+}
+
+unsigned long long PathPlanner::getQueuedLineCount() {
+  return queuedLines;
+}
+
+unsigned long long PathPlanner::getUnderrunCount() {
+  return underruns;
+}
+
+long long PathPlanner::getMinBufferedTicks() {
+  return minBufferedTicks;
+}
+
+double PathPlanner::getLineWaitTime() {
+  return lineWaitTime / 1e9;
+}
+
+double PathPlanner::getLineSpaceWaitTime() {
+  return lineSpaceWaitTime / 1e9;
+}
+
+double PathPlanner::getPruWaitTime() {
+  return pruWaitTime / 1e9;
+}
+
+unsigned long PathPlanner::getDDRBytesInFlight() {
+  return pru.getDDRMemoryUsed();
+}
+
+double PathPlanner::getDDRTimeInFlight() {
+  return pru.getTotalQueuedMovesTime() / (double)F_CPU;
+}
+
+unsigned long long PathPlanner::getDDRBytesDone() {
+  return pru.getConsumedBytes() - pruBytesDoneBase;
+}
+
+double PathPlanner::getPruMoveTime() {
+  return (pru.getConsumedTicks() - pruTicksDoneBase) / (double)F_CPU;
+}
+
+unsigned long long PathPlanner::getArcCount() {
+  return arcs;
+}
+
+unsigned long long PathPlanner::getArcSegmentCount() {
+  return arcSegments;
+}
+
+void PathPlanner::resetTelemetry() {
+  underruns = 0;
+  minBufferedTicks = -1;
+  lineWaitTime = 0;
+  lineSpaceWaitTime = 0;
+  pruWaitTime = 0;
+  arcs = 0;
+  arcSegments = 0;
+  pruBytesDoneBase = pru.getConsumedBytes();
+  pruTicksDoneBase = pru.getConsumedTicks();
+}
+
 void PathPlanner::runThread() {
   stop=false;
   LOG("PathPlanner: starting thread" << std::endl);
+  reserveCommandBuffer();
   pru.runThread();	
   runningThread = std::thread([this]() {
       this->run();
@@ -515,6 +953,7 @@ void PathPlanner::stopThread(bool join) {
   Py_BEGIN_ALLOW_THREADS
     pru.stopThread(join);	
   stop=true;
+  { std::lock_guard<std::mutex> lk(line_mutex); }
   lineAvailable.notify_all();
   if(join && runningThread.joinable()) {
     runningThread.join();
@@ -530,20 +969,84 @@ PathPlanner::~PathPlanner() {
 
 void PathPlanner::waitUntilFinished() {
   Py_BEGIN_ALLOW_THREADS    
-    std::unique_lock<std::mutex> lk(line_mutex);
-  lineAvailable.wait(lk, [this]{
-      return linesCount==0 || stop;
-    });
+    waitLines([this]{
+	return linesCount()==0 || stop;
+      });
 	
   //Wait for PruTimer then
   if(!stop) {
     pru.waitUntilFinished();
   }
+  pruIdleExpected = true;
   Py_END_ALLOW_THREADS
     }
 
 void PathPlanner::reset() {
   pru.reset();
+  pruIdleExpected = true;
+  inputShaperReset = true;
+}
+
+// Take the shaper settings, once the steps shaped with the old ones are sent
+void PathPlanner::updateInputShaper() {
+  if(inputShaperReset.exchange(false))
+    inputShaper.reset();
+  if(inputShaperChanged && inputShaper.isIdle()){
+    std::lock_guard<std::mutex> lk(inputShaperMutex);
+    for(int i=0; i<INPUT_SHAPER_AXES; i++)
+      inputShaper.configure(i, inputShaperTypes[i], inputShaperFrequencies[i], inputShaperDampings[i]);
+    inputShaperChanged = false;
+  }
+}
+
+// If the end of the line being sent can be shaped with the next line, which is queued and
+// not cancelable
+bool PathPlanner::isNextLineShaped() {
+  if(linesCount() < 2)
+    return false;
+  unsigned int next = linesPos;
+  nextPlannerIndex(next);
+  return !lines[next].isCancelable();
+}
+
+// The extruders run ahead of their position by their advance times their speed, a target
+// number of steps that follows the step rate of the primary axis. Where the target moves
+// away from the steps sent, a step is added, dropped or sent backwards. That is one step per
+// command at most, an extruder that can't keep up catches up on the next commands.
+void PathPlanner::applyPressureAdvance(Path* cur, unsigned int nbSteps) {
+  const std::vector<int>& deltas = cur->getDeltas();
+  int primaryAxis = cur->getPrimaryAxis();
+
+  for(int i=E_AXIS; i<NUM_AXES; i++){
+    // The advance in steps is k/delay for a move that extrudes while moving X, Y or Z,
+    // 0 for any other move
+    FLOAT_T k = 0;
+    if(pressureAdvance[i] > 0 && primaryAxis < E_AXIS && cur->isAxisMove(i) && cur->isAxisPositiveMove(i))
+      k = pressureAdvance[i] * F_CPU * deltas[i] / deltas[primaryAxis];
+    int advance = advanceSteps[i];
+    if(k == 0 && advance == 0)
+      continue;
+
+    uint8_t bit = 1 << i;
+    int forward = cur->isAxisPositiveMove(i) ? 1 : -1;
+    for(unsigned int n=0; n<nbSteps; n++){
+      SteppersCommand& cmd = stepCommands[n];
+      int step = (cmd.step & bit) ? forward : 0;
+      int target = (k > 0 && cmd.delay) ? (int)(k/cmd.delay + 0.5) : 0;
+      int move = std::max(-1, std::min(1, step + target - advance));
+      advance += move - step;
+      if(move){
+	cmd.step |= bit;
+	if(move > 0)
+	  cmd.direction |= bit;
+	else
+	  cmd.direction &= ~bit;
+      }
+      else
+	cmd.step &= ~bit;
+    }
+    advanceSteps[i] = advance;
+  }
 }
 
 void PathPlanner::run() {
@@ -551,38 +1054,38 @@ void PathPlanner::run() {
   LOG("PathPLanner::run(): loop starting" << std::endl);
 	
   while(!stop) {		
-    std::unique_lock<std::mutex> lk(line_mutex);		
-    lineAvailable.wait(lk, [this]{return linesCount>0 || stop;});		
+    std::chrono::steady_clock::time_point waitStart = std::chrono::steady_clock::now();
+    // No line pending, the PRU may run dry before the next one is queued
+    if(linesCount() == 0)
+      pruIdleExpected = true;
+    waitLines([this]{return linesCount()>0 || stop;});		
     Path* cur = &lines[linesPos];
     assert(cur);
-    std::vector<SteppersCommand> commands(cur->getPrimaryAxisSteps());
-    std::vector<int> error = cur->getInitialErrors();
 
     // If the buffer is half or more empty and the line to print is an optimized one, 
     // wait for 500 ms again so that we can get some other path in the path planner buffer, 
     // and we do that until the buffer is not anymore half empty.
     if(!isLinesBufferFilled() && cur->getTimeInTicks() > 0 && waitUntilFilledUp) {
       unsigned lastCount = 0;
-      LOG("PathPLanner::run(): Waiting for buffer to fill up. " << linesCount  << " lines pending, lastCount is " << lastCount << std::endl);
+      LOG("PathPLanner::run(): Waiting for buffer to fill up. " << linesCount()  << " lines pending, lastCount is " << lastCount << std::endl);
       do {
-	lastCount = linesCount;				
-	lineAvailable.wait_for(lk,  std::chrono::milliseconds(printMoveBufferWait), [this,lastCount]{
-	    return linesCount>lastCount || stop;
+	lastCount = linesCount();				
+	waitLinesFor(printMoveBufferWait, [this,lastCount]{
+	    return linesCount()>lastCount || stop;
 	  });				
-      } while(lastCount<linesCount && linesCount<moveCacheSize && !stop);
-      LOG("PathPLanner::run(): Done waiting for buffer to fill up... " << linesCount  << " lines ready. " << lastCount << std::endl);			
+      } while(lastCount<linesCount() && linesCount()<moveCacheSize && !stop);
+      LOG("PathPLanner::run(): Done waiting for buffer to fill up... " << linesCount()  << " lines ready. " << lastCount << std::endl);			
       waitUntilFilledUp = false;
     }
+    lineWaitTime += elapsedNanoseconds(waitStart);
 		
     //The buffer is empty, we enable again the "wait until buffer is enough full" timing procedure.
-    if(linesCount<=1) {
+    if(linesCount()<=1) {
       waitUntilFilledUp = true;
       LOG("PathPLanner::run(): ### Move Command Buffer Empty ###" << std::endl);
     }
 		
-    lk.unlock();
-		
-    if(!linesCount || stop){
+    if(stop || !claimLine()){
       continue;
     }
 		
@@ -590,20 +1093,20 @@ void PathPlanner::run() {
     int directionMask = 0;      //0bCBAHEZYX
     int cancellableMask = 0;
     unsigned int vMaxReached;
-    unsigned int timer_accel = 0;
-    unsigned int timer_decel = 0;
     unsigned int interval = 0;
 		
-    if(cur->isBlocked()){   // This step is in computation - shouldn't happen
-      cur = NULL;
-      LOG( "PathPLanner::run():  thread: path " <<  std::dec << linesPos<< " is blocked, waiting... " << std::endl);
-      std::this_thread::sleep_for( std::chrono::milliseconds(100) );
-      continue;
-    }
-		
     // Only enable axes that are moving. If the axis doesn't need to move then it can stay disabled depending on configuration.
     cur->fixStartAndEndSpeed();
     cur_errupd = cur->getDeltas()[cur->getPrimaryAxis()];
+
+    unsigned int nbSteps = cur->getPrimaryAxisSteps();
+    if(stepCommands.size() < nbSteps){
+      stepCommands.resize(std::max<size_t>(nbSteps, 2*stepCommands.size()));
+      commandBufferGrows++;
+      LOG("PathPLanner::run(): Command buffer grown to " << stepCommands.size() << " commands" << std::endl);
+    }
+    const std::vector<int>& initialErrors = cur->getInitialErrors();
+    std::copy(initialErrors.begin(), initialErrors.end(), stepErrors.begin());
     if(!cur->areParameterUpToDate()){  // should never happen, but with bad timings???
       LOG("PathPLanner::run(): Path planner thread: Need to update paramters! This should not happen!" << std::endl);
       cur->updateStepperPathParameters();
@@ -611,8 +1114,6 @@ void PathPlanner::run() {
 
     StepperPathParameters stepperPath = cur->getStepperPathParameters();
     unsigned long long fPrimaryAxisAcceleration = 262144.0 * cur->getPrimaryAxisAcceleration() / F_CPU; // (2^18)
-		
-    vMaxReached = stepperPath.vStart;
 
     directionMask = 0;
     cancellableMask = 0;
@@ -634,80 +1135,116 @@ void PathPlanner::run() {
         
         
 
-    for(unsigned int stepNumber=0; stepNumber<cur->getPrimaryAxisSteps(); stepNumber++){
-      SteppersCommand& cmd = commands.at(stepNumber);
+    // Step intervals first. The ramps come from the ramp table, computed once for
+    // each distinct trapezoid or S-curve, the plateau has a constant interval.
+    unsigned int accelCount = std::min(stepperPath.accelSteps + 1, nbSteps);
+    unsigned int decelStart = std::max(accelCount, nbSteps >= stepperPath.decelSteps ? nbSteps - stepperPath.decelSteps : 0);
+    unsigned int stepNumber = 0;
+    SCurveProfile profile;
+
+    const uint32_t* ramp;
+    if(stepperPath.jerk > 0){
+      profile.plan(stepperPath.vStart, stepperPath.vPeak, stepperPath.acceleration,
+		   stepperPath.peakAcceleration, stepperPath.jerk);
+      ramp = rampTable.accelerate(profile, accelCount, vMaxReached);
+    }
+    else
+      ramp = rampTable.accelerate(stepperPath.vStart, stepperPath.vMax, fPrimaryAxisAcceleration, accelCount, vMaxReached);
+    for(; stepNumber < accelCount; stepNumber++){
+      if(ramp[stepNumber])
+	interval = ramp[stepNumber];
+      stepCommands[stepNumber].delay = interval;
+    }
+
+    interval = cur->getFullInterval();
+    for(; stepNumber < decelStart; stepNumber++)
+      stepCommands[stepNumber].delay = interval;
+
+    if(stepperPath.jerk > 0){
+      profile.plan(vMaxReached, stepperPath.vEnd, stepperPath.acceleration,
+		   stepperPath.peakAcceleration, stepperPath.jerk);
+      ramp = rampTable.decelerate(profile, nbSteps - decelStart);
+    }
+    else
+      ramp = rampTable.decelerate(vMaxReached, stepperPath.vEnd, fPrimaryAxisAcceleration, nbSteps - decelStart);
+    for(unsigned int i = 0; stepNumber < nbSteps; stepNumber++, i++){
+      if(ramp[i])
+	interval = ramp[i];
+      stepCommands[stepNumber].delay = interval;
+    }
+
+    // Then the Bresenham pass for the steps
+    for(stepNumber=0; stepNumber<nbSteps; stepNumber++){
+      SteppersCommand& cmd = stepCommands[stepNumber];
       cmd.direction = (uint8_t) directionMask;
       cmd.cancellableMask = (uint8_t) cancellableMask;
-			
-      if((stepNumber == cur->getPrimaryAxisSteps() - 1) && cur->isSyncEvent()){
-	if(cur->isSyncWaitEvent())
-	  cmd.options = STEPPER_COMMAND_OPTION_SYNCWAIT_EVENT;
-	else
-	  cmd.options = STEPPER_COMMAND_OPTION_SYNC_EVENT;
-      }
-      else 
-	cmd.options = 0;
-
-      //LOG( "Doing step " << stepNumber << " of "<<cur->getPrimaryAxisSteps() <<std::endl);
+      cmd.options = 0;
 
       cmd.step = 0;
       for(int i=0; i<NUM_AXES; i++){
 	if(cur->isAxisMove(i)){
-	  if((error[i] -= cur->getDeltas()[i]) < 0){
+	  if((stepErrors[i] -= cur->getDeltas()[i]) < 0){
 	    cmd.step |= (1 << i);
-	    error[i] += cur_errupd;
+	    stepErrors[i] += cur_errupd;
 	  }
 	}
       }
+    }
 
-      //If acceleration is enabled on this move and we are in the acceleration segment, calculate the current interval
-      if (stepNumber <= stepperPath.accelSteps){   // we are accelerating
-	//LOG( "Acceleration" << std::endl);
-	vMaxReached = ComputeV(timer_accel, fPrimaryAxisAcceleration) + stepperPath.vStart;
-	if(vMaxReached>stepperPath.vMax)
-	  vMaxReached = stepperPath.vMax;
-	unsigned long v = vMaxReached;
-	if (v > 0)
-	  interval = F_CPU/(v);
-	timer_accel+=interval;
-      }
-      else if (cur->getPrimaryAxisSteps() - stepNumber <= stepperPath.decelSteps){     // time to slow down
-	//LOG( "Decelleration "<<std::endl);
-	unsigned long v = ComputeV(timer_decel, fPrimaryAxisAcceleration);
-	if (v > vMaxReached)   // if deceleration goes too far it can become too large
-	  v = stepperPath.vEnd;
-	else{
-	  v=vMaxReached - v;
-	  if (v < stepperPath.vEnd)
-	    v = stepperPath.vEnd; // extra steps at the end of desceleration due to rounding erros
-	}
-	if (v > 0)
-	  interval = F_CPU/(v);
-	timer_decel += interval;
-      }
-      else{ // full speed reached
-	//LOG( "Cruising "<<std::endl);
-	interval = cur->getFullInterval();
-      }
+    // Cancelable moves, homing and probing, don't extrude and keep the steps as counted
+    if(!cur->isCancelable())
+      applyPressureAdvance(cur, nbSteps);
+
+    // Input shaping. The end of a line is shaped and sent with the next one, unless that
+    // one isn't queued yet or can't be shaped, or this line is a sync event.
+    SteppersCommand* commands = stepCommands.data();
+    size_t nbCommands = nbSteps;
+    updateInputShaper();
+    if(!cur->isCancelable() && (inputShaper.isEnabled() || !inputShaper.isIdle())){
+      bool flush = cur->isSyncEvent() || inputShaperChanged || !isNextLineShaped();
+      inputShaper.shape(commands, nbSteps, cur->getShapedSteps().data(), flush, shapedCommands);
+      commands = shapedCommands.data();
+      nbCommands = shapedCommands.size();
+    }
 
-      //LOG("Interval: " << interval << std::endl);
-      assert(interval < F_CPU*4);
-      cmd.delay = (uint32_t)interval;
+    if(nbCommands && cur->isSyncEvent()){
+      if(cur->isSyncWaitEvent())
+	commands[nbCommands - 1].options = STEPPER_COMMAND_OPTION_SYNCWAIT_EVENT;
+      else
+	commands[nbCommands - 1].options = STEPPER_COMMAND_OPTION_SYNC_EVENT;
     }
-		
+
+    // Cruise phases repeat the same command for many steps, send those run-length encoded.
+    // Cancelable moves are sent as is, the PRU reports the number of steps left after a
+    // cancel by counting the commands it skipped.
+    if(!cur->isCancelable())
+      nbCommands = compressSteppersCommands(commands, nbCommands);
 
     //LOG("Current move time " << pru.getTotalQueuedMovesTime() / (double) F_CPU << std::endl);
 		
     //Wait until we need to push some lines so that the path planner can fill up
+    std::chrono::steady_clock::time_point pruWaitStart = std::chrono::steady_clock::now();
     pru.waitUntilLowMoveTime((F_CPU/1000)*minBufferedMoveTime); //in seconds
+    pruWaitTime += elapsedNanoseconds(pruWaitStart);
 		
     LOG( "PathPLanner::run(): Sending " << std::dec << linesPos << ", Start speed=" << cur->getStartSpeed() << ", end speed="<<cur->getEndSpeed() << ", nb steps = " << cur->getPrimaryAxisSteps() << std::endl);
 		
-    pru.push_block((uint8_t*)commands.data(), sizeof(SteppersCommand)*cur->getPrimaryAxisSteps(), sizeof(SteppersCommand), linesPos, cur->getTimeInTicks());
+    // The PRU ran out of moves before this line was ready, the motion stalled.
+    // Expected when no line was pending, after the previous line emptied the buffer.
+    unsigned long bufferedTicks = pru.getTotalQueuedMovesTime();
+    if(!pruIdleExpected) {
+      if(bufferedTicks == 0)
+	underruns++;
+      if(minBufferedTicks < 0 || (long long)bufferedTicks < minBufferedTicks)
+	minBufferedTicks = bufferedTicks;
+    }
+    pruIdleExpected = false;
+
+    pru.push_block((uint8_t*)commands, sizeof(SteppersCommand)*nbCommands, sizeof(SteppersCommand), linesPos);
     LOG( "PathPLanner::run(): Done sending with " << std::dec << linesPos << std::endl);
 		
     removeCurrentLine();
-    lineAvailable.notify_all();
+    notifyLines();
   }
 }
 
@@ -715,3 +1252,8 @@ std::vector<FLOAT_T> PathPlanner::getState()
 {
   return state;
 }
+
+std::vector<FLOAT_T> PathPlanner::getIdealState()
+{
+  return ideal_state;
+}
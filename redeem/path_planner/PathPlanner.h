@@ -32,11 +32,15 @@
 #include <thread>
 #include <vector>
 #include <mutex>
+#include <condition_variable>
+#include <chrono>
 #include <string.h>
 #include <strings.h>
 #include <assert.h>
 #include "PruTimer.h"
 #include "Path.h"
+#include "RampTable.h"
+#include "InputShaper.h"
 #include "Delta.h"
 #include "config.h"
 
@@ -54,31 +58,74 @@
  * 	position.
  */
 
-// sign function
-#define ComputeV(timer,accel)  (((timer>>8)*accel)>>10)
-#define ComputeV2(timer,accel)  (((timer/256.0)*accel)/1024)
+// Movement types for queueLinearMove, these match Path.ABSOLUTE/RELATIVE/MIXED
+#define MOVE_ABSOLUTE 0
+#define MOVE_RELATIVE 1
+#define MOVE_MIXED    2
+
+// Option flags for queueLinearMove
+#define MOVE_FLAG_CANCELABLE            (1 << 0)
+#define MOVE_FLAG_OPTIMIZE              (1 << 1)
+#define MOVE_FLAG_SOFT_ENDSTOPS         (1 << 2)
+#define MOVE_FLAG_BED_MATRIX            (1 << 3)
+#define MOVE_FLAG_BACKLASH_COMPENSATION (1 << 4)
+
+// Shortest segment a delta move is split in, whatever the carriage deviation
+#define DELTA_MIN_SEGMENT_LENGTH 0.00005
+
+// Largest angle of an arc segment, whatever the chord error allows
+#define ARC_MAX_SEGMENT_ANGLE (M_PI/2)
+
+// Fewest PRU cycles firmware_runtime.p spends on a step
+#define PRU_MIN_STEP_INTERVAL 939
+
+// Most lines the planner goes back over when a line is added
+#define PLANNER_REPLAN_WINDOW 128
+
+// No line, for replanFrom
+#define NO_LINE (~0ULL)
+
 
 class PathPlanner {
  private:
-  void updateTrapezoids();
+  void updateTrapezoids(unsigned int last);
   void computeMaxJunctionSpeed(Path *previous,Path *current);
   void backwardPlanner(unsigned int start,unsigned int last);
-  void forwardPlanner(unsigned int first);
+  void forwardPlanner(unsigned int first, unsigned int last);
 	
 	
 	
   std::vector<FLOAT_T> maxSpeeds;
   std::vector<FLOAT_T> minSpeeds;
   std::vector<FLOAT_T> maxJerks;
+  FLOAT_T junctionDeviation;
   std::vector<FLOAT_T> maxAccelerationStepsPerSquareSecond;
   std::vector<FLOAT_T> maxAccelerationMPerSquareSecond;
+  std::vector<FLOAT_T> sCurveJerks;
+  std::vector<FLOAT_T> maxJerkStepsPerCubeSecond;
+  std::vector<FLOAT_T> pressureAdvance;
 	
   FLOAT_T minimumSpeed;			
   std::vector<FLOAT_T> axisStepsPerM;
 
-  std::atomic_uint_fast32_t linesPos; // Position for executing line movement
-  std::atomic_uint_fast32_t linesWritePos; // Position where we write the next cached line move
-  std::atomic_uint_fast32_t linesCount;      ///< Number of lines cached 0 = nothing to do.
+  /*
+   * The lines cache is a single producer, single consumer ring: the thread
+   * queueing moves writes and plans the lines, run() sends them. Lines are
+   * numbered from the start, line n is lines[n % moveCacheSize].
+   *
+   * The producer hands lines over by moving linesPublished, run() gives them
+   * back by moving linesConsumed. In between, the planner may still update the
+   * lines run() hasn't taken: run() claims a line before reading it and the
+   * planner announces the first line it updates in replanFrom, each checking
+   * the other's after setting its own, see claimLine() and reserveLines().
+   */
+  std::atomic<unsigned long long> linesPublished; ///< Lines handed to run()
+  std::atomic<unsigned long long> linesClaimed;   ///< Lines taken by run(), the one being sent included
+  std::atomic<unsigned long long> linesConsumed;  ///< Lines sent to the PRU
+  std::atomic<unsigned long long> replanFrom;     ///< First line being planned, NO_LINE if none
+  unsigned long long linesWritten; // Lines written by the producer, published or not
+  unsigned int linesWritePos; // Position where we write the next cached line move
+  unsigned int linesPos; // Position of the line run() sends
   std::atomic<long long> linesTicksCount;
 
   unsigned int moveCacheSize; // set on init
@@ -89,6 +136,17 @@ class PathPlanner {
 
   std::vector<Path> lines;
 
+  // Lines written to the cache but not yet handed to the run() thread
+  unsigned int pendingLines;
+  long long pendingTicks;
+
+  // Batch planning, see planLine()
+  bool deferPlanning;
+  unsigned int batchLines;
+  bool planPending;
+  unsigned int unplannedLine;
+  unsigned int unplannedLines;
+
   inline void previousPlannerIndex(unsigned int &p){
     p = (p ? p-1 : moveCacheSize-1);
   }
@@ -97,20 +155,60 @@ class PathPlanner {
     p = (p == moveCacheSize - 1 ? 0 : p + 1);
   }
 
+  // Lines published and not yet sent, 0 = nothing to do
+  inline unsigned long long linesCount(){
+    return linesPublished - linesConsumed;
+  }
+
+  // Number of the line at index, one of the lines the producer can still update
+  inline unsigned long long lineNumber(unsigned int index){
+    return linesWritten - (linesWritePos + moveCacheSize - index) % moveCacheSize;
+  }
+
   inline void removeCurrentLine(){
     linesTicksCount -= lines[linesPos].getTimeInTicks();
-    linesPos++;
-    if(linesPos>=moveCacheSize) 
-      linesPos=0;
-    --linesCount;
+    nextPlannerIndex(linesPos);
+    linesConsumed++;
   }
 
   inline bool isLinesBufferFilled(){
     return linesTicksCount >= (F_CPU/1000)*maxBufferedMoveTime;
   }
+
+  bool claimLine();
+  unsigned long long reserveLines(unsigned long long first);
+  void releaseLines();
 	
+  /*
+   * The lock and condition are only used to sleep until the other side of the
+   * ring moves, the side that moves only takes the lock if someone is waiting.
+   */
   std::mutex line_mutex;
   std::condition_variable lineAvailable;
+  std::atomic<int> lineWaiters;
+
+  template<typename Predicate>
+  void waitLines(Predicate ready){
+    if(ready())
+      return;
+    std::unique_lock<std::mutex> lk(line_mutex);
+    lineWaiters++;
+    lineAvailable.wait(lk, ready);
+    lineWaiters--;
+  }
+
+  template<typename Predicate>
+  bool waitLinesFor(int milliseconds, Predicate ready){
+    if(ready())
+      return true;
+    std::unique_lock<std::mutex> lk(line_mutex);
+    lineWaiters++;
+    bool result = lineAvailable.wait_for(lk, std::chrono::milliseconds(milliseconds), ready);
+    lineWaiters--;
+    return result;
+  }
+
+  void notifyLines();
 	
   std::thread runningThread;
   bool stop;
@@ -118,6 +216,53 @@ class PathPlanner {
   PruTimer pru;
   void recomputeParameters();
   void run();
+
+  // Step commands and Bresenham errors of the line being sent, reused for every line
+  std::vector<SteppersCommand> stepCommands;
+  std::vector<int> stepErrors;
+  // Steps each extruder is ahead of its position for pressure advance
+  std::vector<int> advanceSteps;
+  void applyPressureAdvance(Path* cur, unsigned int nbSteps);
+  std::atomic_uint_fast32_t commandBufferGrows;
+  std::atomic<unsigned long long> queuedLines;
+  std::atomic<bool> pruIdleExpected;
+
+  // Telemetry, see getUnderrunCount and the getters after it. Times are in ns.
+  std::atomic<unsigned long long> underruns;
+  std::atomic<long long> minBufferedTicks;
+  std::atomic<unsigned long long> lineWaitTime;
+  std::atomic<unsigned long long> lineSpaceWaitTime;
+  std::atomic<unsigned long long> pruWaitTime;
+  std::atomic<unsigned long long> arcs;
+  std::atomic<unsigned long long> arcSegments;
+  std::atomic<unsigned long long> pruBytesDoneBase;
+  std::atomic<unsigned long long> pruTicksDoneBase;
+  void reserveCommandBuffer();
+  RampTable rampTable;
+
+  // Input shaping, see setInputShaper. The shaper belongs to the run() thread, it takes the
+  // settings and resets when it's told to and has no steps pending.
+  InputShaper inputShaper;
+  std::vector<SteppersCommand> shapedCommands;
+  std::mutex inputShaperMutex;
+  int inputShaperTypes[INPUT_SHAPER_AXES];
+  FLOAT_T inputShaperFrequencies[INPUT_SHAPER_AXES];
+  FLOAT_T inputShaperDampings[INPUT_SHAPER_AXES];
+  std::atomic<bool> inputShaping;
+  std::atomic<bool> inputShaperChanged;
+  std::atomic<bool> inputShaperReset;
+  void updateInputShaper();
+  bool isNextLineShaped();
+
+  void queueMoveUnlocked(std::vector<FLOAT_T> startPos, std::vector<FLOAT_T> endPos, 
+			 FLOAT_T speed, FLOAT_T accel, 
+			 bool cancelable, bool optimize, 
+			 bool enable_soft_endstops, bool use_bed_matrix, 
+			 bool use_backlash_compensation, int tool_axis, bool virgin);
+  bool waitForLineSpace();
+  void planLine(unsigned int index);
+  void flushPlanning();
+  void publishLines();
 	
   // pre-processor functions
   int softEndStopApply(const std::vector<FLOAT_T> &startPos, const std::vector<FLOAT_T> &endPos);
@@ -126,10 +271,17 @@ class PathPlanner {
 		 FLOAT_T speed, FLOAT_T accel, bool cancelable, 
 		 bool optimize, bool use_backlash_compensation, 
 		 int tool_axis);
+  int splitDeltaInput(const std::vector<FLOAT_T> &startPos, const std::vector<FLOAT_T> &vec,
+		      FLOAT_T speed, FLOAT_T accel, bool cancelable,
+		      bool optimize, bool use_backlash_compensation,
+		      int tool_axis);
+  void subdivideDelta(const std::vector<FLOAT_T> &startPos, const std::vector<FLOAT_T> &vec,
+		      FLOAT_T length, FLOAT_T t0, const FLOAT_T* abc0, FLOAT_T t1, const FLOAT_T* abc1);
   void transformVector(std::vector<FLOAT_T> &vec, const std::vector<FLOAT_T> &startPos);
   void reverseTransformVector(std::vector<FLOAT_T> &vec);
   void backlashCompensation(std::vector<FLOAT_T> &delta);
   void handleSlaves(std::vector<FLOAT_T> &startPos, std::vector<FLOAT_T> &endPos);
+  void computeShapedSteps(const std::vector<FLOAT_T> &startPos, const std::vector<FLOAT_T> &vec, FLOAT_T* steps);
 	
 	
   // soft endstops
@@ -141,17 +293,33 @@ class PathPlanner {
 
   // maximum segment length
   FLOAT_T max_path_length;
+
+  // largest deviation of the delta carriages from their path, see setDeltaMaxDeviation
+  FLOAT_T delta_max_deviation;
+
+  // arc segmentation, see setArcSegmentation
+  FLOAT_T arc_chord_error;
+  FLOAT_T arc_max_segment_length;
 	
   // axis configuration (see config.h for options)
   int axis_config;
 	
   // delta bot options
-  bool hasEndABC;
+  bool hasEndABC;                // endABC and endXYZ are where the effector is
+  unsigned int endABCRevision;   // delta_bot revision they were computed with
   std::vector<FLOAT_T> startABC; // column positions 
   std::vector<FLOAT_T> endABC;   // column positions 
+  std::vector<FLOAT_T> endXYZ;   // forward kinematics of endABC
+  bool hasPlannedABC;            // the column positions at the end of the next move are known
+  std::vector<FLOAT_T> plannedABC;
+  std::vector<FLOAT_T> splitT;   // sub-points of the delta move being split, 0 to 1
+  std::vector<FLOAT_T> splitABC; // column positions at the sub-points, 3 per point
 	
   // the current state of the machine
   std::vector<FLOAT_T> state;
+
+  // where the user asked us to go, before bed compensation and rounding
+  std::vector<FLOAT_T> ideal_state;
 	
   // slaves
   bool has_slaves;
@@ -188,6 +356,41 @@ class PathPlanner {
     return pru.initPRU(firmware_stepper, firmware_endstops);
   }
 
+  /**
+   * @brief Use a simulated PRU instead of the real ones
+   * @details The simulated PRU executes the step commands like the stepper firmware,
+   * on a virtual clock, so the planner can run on any computer.
+   *
+   * @param trace_file File to record the steps to, see StepTrace.h. None if empty.
+   * @param speed How many times faster than real time to run, 0 for as fast as possible.
+   *
+   * @return true in case of success, false otherwise.
+   */
+  bool initSimulatedPRU(const std::string& trace_file, double speed) {
+    return pru.initSimulatedPRU(trace_file, speed);
+  }
+
+  /**
+   * @brief Time the moves executed by the simulated PRU take, in seconds
+   */
+  double getSimulatedTime() {
+    return pru.getSimulatedTime();
+  }
+
+  /**
+   * @brief Position of an axis in steps according to the simulated PRU
+   */
+  long long getSimulatedPosition(int axis) {
+    return pru.getSimulatedPosition(axis);
+  }
+
+  /**
+   * @brief Number of steps done by the simulated PRU, on all axes
+   */
+  unsigned long long getSimulatedStepCount() {
+    return pru.getSimulatedStepCount();
+  }
+
   /**
    * @brief Sets a syncronization point to be signaled by the PRU
    * @details Sets an option on the last queued move/segment to send a syncronization event when
@@ -238,6 +441,72 @@ class PathPlanner {
 		 bool cancelable=false, bool optimize=true, 
 		 bool enable_soft_endstops=true, bool use_bed_matrix=true, 
 		 bool use_backlash_compensation=true, int tool_axis=3, bool virgin=true);
+  /**
+   * @brief Queue a G0/G1 move given only the axes present in the command
+   * @details Resolves the end position from the tracked ideal position, the same way
+   * AbsolutePath, RelativePath and MixedPath do it in Python, applies the bed compensation
+   * matrix and queues the move. The ideal position is updated even if the move is rejected
+   * by the soft endstops, so it stays consistent with what the user asked for.
+   *
+   * @param axis_mask Bit i is set if axis i is part of the command
+   * @param values Position (or distance for relative axes) for each axis in meters, NUM_AXES long
+   * @param speed The feedrate of the move in m/s
+   * @param accel The acceleration of the move in m/s^2
+   * @param movement MOVE_ABSOLUTE, MOVE_RELATIVE or MOVE_MIXED
+   * @param relative_mask For MOVE_MIXED, bit i is set if axis i is relative
+   * @param flags A combination of the MOVE_FLAG_* options
+   * @param tool_axis which axis is our tool attached to
+   */
+  void queueLinearMove(int axis_mask, std::vector<FLOAT_T> values,
+		       FLOAT_T speed, FLOAT_T accel,
+		       int movement, int relative_mask, int flags, int tool_axis);
+
+  /**
+   * @brief Queue a batch of line moves for execution
+   * @details Queues one move per row of positions, in order, as queueMove would with
+   * virgin set. The GIL is released once for the whole batch, the lines are planned
+   * with a single lookahead pass where the junctions allow it and handed to the worker
+   * together. The ideal position is set to the last row.
+   *
+   * From Python the arrays are numpy arrays, the size arguments are implicit.
+   *
+   * @param positions rows x NUM_AXES array of end positions in meters, before bed compensation
+   * @param speeds The feedrate of each move in m/s
+   * @param accels The acceleration of each move in m/s^2
+   * @param flags A combination of the MOVE_FLAG_* options for each move
+   * @param tool_axis which axis is our tool attached to
+   */
+  void queueMoves(FLOAT_T* positions, int rows, int cols,
+		  FLOAT_T* speeds, int n_speeds,
+		  FLOAT_T* accels, int n_accels,
+		  int* flags, int n_flags,
+		  int tool_axis);
+
+  /**
+   * @brief Queue a G2/G3 arc in the XY plane
+   * @details Resolves the end position like queueLinearMove, from the tracked ideal position,
+   * splits the arc into as few line segments as setArcSegmentation allows and queues them
+   * as a batch like queueMoves. The other axes move linearly along the arc, for helices and
+   * extrusion. If the end is not at the same distance from the center as the start, the
+   * radius changes linearly along the arc. An arc ending where it starts is a full circle.
+   *
+   * @param axis_mask Bit i is set if axis i is part of the command
+   * @param values Position (or distance for relative axes) for each axis in meters, NUM_AXES long
+   * @param i X offset of the center from the start in meters
+   * @param j Y offset of the center from the start in meters
+   * @param clockwise true for G2, false for G3
+   * @param speed The feedrate of the move in m/s
+   * @param accel The acceleration of the move in m/s^2
+   * @param movement MOVE_ABSOLUTE, MOVE_RELATIVE or MOVE_MIXED
+   * @param relative_mask For MOVE_MIXED, bit i is set if axis i is relative
+   * @param flags A combination of the MOVE_FLAG_* options for the segments
+   * @param tool_axis which axis is our tool attached to
+   */
+  void queueArc(int axis_mask, std::vector<FLOAT_T> values,
+		FLOAT_T i, FLOAT_T j, bool clockwise,
+		FLOAT_T speed, FLOAT_T accel,
+		int movement, int relative_mask, int flags, int tool_axis);
+
   /**
    * @brief Run the path planner thread
    * @details Run the path planner thread that is in charge to compute the different delays and submit it to the PRU for execution.
@@ -259,6 +528,93 @@ class PathPlanner {
    */
   void waitUntilFinished();
 
+  /**
+   * @brief Number of times the step command buffer was too small for a line
+   * @details The buffer is sized when the thread starts, from the cache size and the
+   * maximum buffered move time. Each time a line has more steps than it holds it is
+   * reallocated, which should be rare.
+   */
+  unsigned int getCommandBufferGrowCount();
+
+  /**
+   * @brief Number of step commands the step command buffer currently holds
+   */
+  unsigned int getCommandBufferSize();
+
+  /**
+   * @brief Number of lines queued since the planner was created
+   */
+  unsigned long long getQueuedLineCount();
+
+  /**
+   * @brief Number of times the PRU ran out of moves while printing
+   * @details Counted when a line is sent to the PRU after it finished all the moves it had,
+   * unless it was expected to, ie. for the first line or after waitUntilFinished.
+   */
+  unsigned long long getUnderrunCount();
+
+  /**
+   * @brief Fewest PRU ticks of moves left when a line was sent, -1 if none was yet
+   * @details Counted like the underruns, a value close to 0 means the printer nearly stuttered.
+   */
+  long long getMinBufferedTicks();
+
+  /**
+   * @brief Seconds the planner thread waited for lines to send to the PRU
+   * @details Includes the time spent waiting for the buffer to fill up and the idle time
+   * when nothing is printed. A wait while printing means the host is too slow.
+   */
+  double getLineWaitTime();
+
+  /**
+   * @brief Seconds queueMove waited for free space in the line buffer
+   * @details The host is ahead of the printer, this is where it should wait.
+   */
+  double getLineSpaceWaitTime();
+
+  /**
+   * @brief Seconds the planner thread waited in PruTimer::waitUntilLowMoveTime
+   * @details The planner is ahead of the PRU, this is where it should wait.
+   */
+  double getPruWaitTime();
+
+  /**
+   * @brief Bytes of step commands written to the DDR that the PRU has not finished
+   */
+  unsigned long getDDRBytesInFlight();
+
+  /**
+   * @brief Seconds of moves written to the DDR that the PRU has not finished
+   * @details Counted from the step commands written, this is what min_buffered_move_time
+   * is compared to before a line is sent.
+   */
+  double getDDRTimeInFlight();
+
+  /**
+   * @brief Bytes of step commands the PRU finished
+   */
+  unsigned long long getDDRBytesDone();
+
+  /**
+   * @brief Seconds of moves the PRU finished
+   */
+  double getPruMoveTime();
+
+  /**
+   * @brief Number of G2/G3 arcs queued
+   */
+  unsigned long long getArcCount();
+
+  /**
+   * @brief Number of line segments the arcs were split in
+   */
+  unsigned long long getArcSegmentCount();
+
+  /**
+   * @brief Reset the underruns, the minimum buffered ticks, the wait times, the PRU work done and the arc counts
+   */
+  void resetTelemetry();
+
   /**
    * @brief Set the print move buffer wait time
    * @details Time to wait before processing a print command if the buffer is not full enough, expressed in milliseconds.
@@ -344,6 +700,68 @@ class PathPlanner {
    * @param maxJerk The maximum jerk for X and Y axis in m/s
    */
   void setJerks(std::vector<FLOAT_T> jerks);
+
+  /**
+   * @brief Use junction deviation instead of the jerk for the speed at the join of two segments
+   * @details The path is taken as turning on a circle that passes junctionDeviation away
+   * from the corner, and the speed at the join is the one that keeps the centripetal
+   * acceleration on it within the acceleration of the segments:
+   *
+   * v = sqrt(a * junctionDeviation * sin(theta/2) / (1 - sin(theta/2)))
+   *
+   * where theta is the angle between the two segments, pi for a straight line. Unlike the
+   * jerk, this depends on the angle only, so a curve made of many short segments is
+   * taken at the speed its radius allows rather than at the jerk. The XYZ axes are
+   * joined this way, the other ones keep their jerk limit. This is done in stepper space,
+   * where CoreXY and H-belt keep the angles and the short segments of deltas nearly do.
+   *
+   * @param deviation The junction deviation in meters, 0 to use the jerk for all axes
+   */
+  void setJunctionDeviation(FLOAT_T deviation);
+
+  /**
+   * @brief Set the jerk of S-curve accelerations for each axis
+   * @details With a jerk, a move changes its speed along an S-curve rather than a straight
+   * line: the acceleration builds up and falls off at no more than the jerk instead of
+   * starting and stopping at once, which excites less ringing. The acceleration never goes
+   * above the configured one, so the S-curves take longer than the trapezoids they replace:
+   * the moves are planned at the average acceleration of an S-curve from standstill to
+   * their full speed.
+   *
+   * A move uses the lowest jerk of its moving axes that have one, and a trapezoid if none do.
+   *
+   * @param jerks The jerk for each axis in m/s^3, 0 for trapezoidal accelerations
+   */
+  void setSCurveJerks(std::vector<FLOAT_T> jerks);
+
+  /**
+   * @brief Set the pressure advance of each extruder
+   * @details The pressure in the nozzle lags behind the extruder, so extrusion starts late
+   * when a move speeds up and goes on when it slows down. With pressure advance the
+   * extruder runs ahead of its position by the advance times its speed: it gets extra
+   * steps while the move accelerates and gives them back while it decelerates. Moves that
+   * don't extrude while moving X, Y or Z, like travels, bring the extruder back to its
+   * position.
+   *
+   * @param advance The advance for each axis in seconds, only used for the extruders, 0 for none
+   */
+  void setPressureAdvance(std::vector<FLOAT_T> advance);
+
+  /**
+   * @brief Set the input shaper of the X or the Y axis
+   * @details The toolhead rings at the resonance of each axis after a change of speed. The
+   * shaper sends the motion of the axis as a few delayed copies of it whose vibrations at the
+   * resonance cancel out: ZV has two of them, half a period apart, ZVD and MZV three, which
+   * also cancel the vibrations close to the resonance but smooth the motion more. It's X and Y
+   * that are shaped, with any axis config, and all the axes are delayed by as much as the
+   * shaping to stay in time with them.
+   *
+   * @param axis 0 for X, 1 for Y
+   * @param type INPUT_SHAPER_NONE, INPUT_SHAPER_ZV, INPUT_SHAPER_ZVD or INPUT_SHAPER_MZV
+   * @param frequency The resonance frequency in Hz, 0 for no shaping
+   * @param damping The damping ratio of the resonance, typically 0.05 to 0.15
+   */
+  void setInputShaper(int axis, int type, FLOAT_T frequency, FLOAT_T damping);
 	
   void suspend() {
     pru.suspend();
@@ -358,14 +776,39 @@ class PathPlanner {
   void setSoftEndstopsMax(std::vector<FLOAT_T> stops);
   void setBedCompensationMatrix(std::vector<FLOAT_T> matrix);
   void setMaxPathLength(FLOAT_T maxLength);
+
+  /**
+   * @brief Set how queueArc splits arcs in line segments
+   * @details Each segment is as long as it can be while staying within chordError of the
+   * arc, so small arcs get few segments and big ones many, but no longer than
+   * maxSegmentLength and no more than a quarter of a circle.
+   *
+   * @param chordError Largest distance between a segment and the arc in meters, 0 for none
+   * @param maxSegmentLength Longest segment in meters, 0 for no limit
+   */
+  void setArcSegmentation(FLOAT_T chordError, FLOAT_T maxSegmentLength);
+
+  /**
+   * @brief Set how far the delta carriages may deviate from their path
+   * @details A straight move of the effector is a curve for the carriages but each segment
+   * of it is a straight line for them. Moves are split where needed for the carriages to
+   * stay within maxDeviation of the curve, so long moves in the middle of the bed get few
+   * segments and moves close to the towers many. 0 splits every max path length instead.
+   *
+   * @param maxDeviation The largest deviation of a carriage in meters
+   */
+  void setDeltaMaxDeviation(FLOAT_T maxDeviation);
+
   void setAxisConfig(int axis);
   void setState(std::vector<FLOAT_T> set);
+  void setIdealState(std::vector<FLOAT_T> set);
   void enableSlaves(bool enable);
   void addSlave(int master_in, int slave_in);
   void setBacklashCompensation(std::vector<FLOAT_T> set);
   void resetBacklash();
 	
   std::vector<FLOAT_T> getState();
+  std::vector<FLOAT_T> getIdealState();
 
   void reset();
 	
@@ -9,10 +9,17 @@
 
 
 %{
+#define SWIG_FILE_WITH_INIT
 #include "PathPlanner.h"
 #include "Delta.h"
 %}
 
+%include "numpy.i"
+
+%init %{
+import_array();
+%}
+
 %include "config.h"
 
 %rename(PathPlannerNative) PathPlanner;
@@ -33,6 +40,10 @@ namespace std {
   %template(vector_FLOAT_T) vector<FLOAT_T>;
 }
 
+%apply (double* IN_ARRAY2, int DIM1, int DIM2) { (FLOAT_T* positions, int rows, int cols) };
+%apply (double* IN_ARRAY1, int DIM1) { (FLOAT_T* speeds, int n_speeds), (FLOAT_T* accels, int n_accels) };
+%apply (int* IN_ARRAY1, int DIM1) { (int* flags, int n_flags) };
+
 %apply FLOAT_T *OUTPUT { FLOAT_T* offset };
 %apply FLOAT_T *OUTPUT { FLOAT_T* X, FLOAT_T* Y , FLOAT_T* Z};
 %apply FLOAT_T *OUTPUT { FLOAT_T* Az, FLOAT_T* Bz , FLOAT_T* Cz};
@@ -57,6 +68,10 @@ class PathPlanner {
   Delta delta_bot;
   PathPlanner(unsigned int cacheSize);
   bool initPRU(const std::string& firmware_stepper, const std::string& firmware_endstops);
+  bool initSimulatedPRU(const std::string& trace_file, double speed);
+  double getSimulatedTime();
+  long long getSimulatedPosition(int axis);
+  unsigned long long getSimulatedStepCount();
   bool queueSyncEvent(bool isBlocking = true);
   int waitUntilSyncEvent();
   void clearSyncEvent();
@@ -65,9 +80,36 @@ class PathPlanner {
 		 bool cancelable, bool optimize, 
 		 bool enable_soft_endstops, bool use_bed_matrix, 
 		 bool use_backlash_compensation, int tool_axis, bool virgin);
+  void queueLinearMove(int axis_mask, std::vector<FLOAT_T> values,
+		       FLOAT_T speed, FLOAT_T accel,
+		       int movement, int relative_mask, int flags, int tool_axis);
+  void queueMoves(FLOAT_T* positions, int rows, int cols,
+		  FLOAT_T* speeds, int n_speeds,
+		  FLOAT_T* accels, int n_accels,
+		  int* flags, int n_flags,
+		  int tool_axis);
+  void queueArc(int axis_mask, std::vector<FLOAT_T> values,
+		FLOAT_T i, FLOAT_T j, bool clockwise,
+		FLOAT_T speed, FLOAT_T accel,
+		int movement, int relative_mask, int flags, int tool_axis);
   void runThread();
   void stopThread(bool join);
   void waitUntilFinished();
+  unsigned int getCommandBufferGrowCount();
+  unsigned int getCommandBufferSize();
+  unsigned long long getQueuedLineCount();
+  unsigned long long getUnderrunCount();
+  long long getMinBufferedTicks();
+  double getLineWaitTime();
+  double getLineSpaceWaitTime();
+  double getPruWaitTime();
+  unsigned long getDDRBytesInFlight();
+  double getDDRTimeInFlight();
+  unsigned long long getDDRBytesDone();
+  double getPruMoveTime();
+  unsigned long long getArcCount();
+  unsigned long long getArcSegmentCount();
+  void resetTelemetry();
   void setPrintMoveBufferWait(int dt);
   void setMinBufferedMoveTime(int dt);
   void setMaxBufferedMoveTime(int dt);
@@ -76,17 +118,25 @@ class PathPlanner {
   void setAxisStepsPerMeter(std::vector<FLOAT_T> stepPerM);
   void setAcceleration(std::vector<FLOAT_T> accel);
   void setJerks(std::vector<FLOAT_T> jerks);
+  void setJunctionDeviation(FLOAT_T deviation);
+  void setSCurveJerks(std::vector<FLOAT_T> jerks);
+  void setPressureAdvance(std::vector<FLOAT_T> advance);
+  void setInputShaper(int axis, int type, FLOAT_T frequency, FLOAT_T damping);
   void setSoftEndstopsMin(std::vector<FLOAT_T> stops);
   void setSoftEndstopsMax(std::vector<FLOAT_T> stops);
   void setBedCompensationMatrix(std::vector<FLOAT_T> matrix);
   void setMaxPathLength(FLOAT_T maxLength);
+  void setArcSegmentation(FLOAT_T chordError, FLOAT_T maxSegmentLength);
+  void setDeltaMaxDeviation(FLOAT_T maxDeviation);
   void setAxisConfig(int axis);
   void setState(std::vector<FLOAT_T> set);
+  void setIdealState(std::vector<FLOAT_T> set);
   void enableSlaves(bool enable);
   void addSlave(int master_in, int slave_in);
   void setBacklashCompensation(std::vector<FLOAT_T> set);
   void resetBacklash();
   std::vector<FLOAT_T> getState();
+  std::vector<FLOAT_T> getIdealState();
   void suspend();
   void resume();
   void reset();
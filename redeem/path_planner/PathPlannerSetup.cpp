@@ -64,6 +64,40 @@ void PathPlanner::setJerks(std::vector<FLOAT_T> jerks){
 
 }
 
+void PathPlanner::setJunctionDeviation(FLOAT_T deviation){
+  junctionDeviation = deviation;
+}
+
+void PathPlanner::setSCurveJerks(std::vector<FLOAT_T> jerks){
+  if ( jerks.size() != NUM_AXES ) {throw InputSizeError();}
+
+  sCurveJerks = jerks;
+
+  recomputeParameters();
+}
+
+void PathPlanner::setPressureAdvance(std::vector<FLOAT_T> advance){
+  if ( advance.size() != NUM_AXES ) {throw InputSizeError();}
+
+  // Copied in place, the planner thread reads it while sending moves
+  std::copy(advance.begin(), advance.end(), pressureAdvance.begin());
+}
+
+void PathPlanner::setInputShaper(int axis, int type, FLOAT_T frequency, FLOAT_T damping){
+  if ( axis < 0 || axis >= INPUT_SHAPER_AXES ) {throw InputSizeError();}
+
+  std::lock_guard<std::mutex> lk(inputShaperMutex);
+  inputShaperTypes[axis] = type;
+  inputShaperFrequencies[axis] = frequency;
+  inputShaperDampings[axis] = damping;
+
+  bool shaping = false;
+  for(int i=0; i<INPUT_SHAPER_AXES; i++)
+    shaping |= inputShaperTypes[i] != INPUT_SHAPER_NONE && inputShaperFrequencies[i] > 0;
+  inputShaping = shaping;
+  inputShaperChanged = true;
+}
+
 void PathPlanner::setAxisStepsPerMeter(std::vector<FLOAT_T> stepPerM) {
   if ( stepPerM.size() != NUM_AXES ) {throw InputSizeError();}
 
@@ -99,18 +133,38 @@ void PathPlanner::setMaxPathLength(FLOAT_T maxLength)
   max_path_length = maxLength;
 }
 
+// arc segmentation
+void PathPlanner::setArcSegmentation(FLOAT_T chordError, FLOAT_T maxSegmentLength)
+{
+  arc_chord_error = chordError;
+  arc_max_segment_length = maxSegmentLength;
+}
+
+// delta segmentation
+void PathPlanner::setDeltaMaxDeviation(FLOAT_T maxDeviation)
+{
+  delta_max_deviation = maxDeviation;
+}
+
 // axis configuration
 void PathPlanner::setAxisConfig(int axis)
 {
   axis_config = axis;
 }
 
-// the state of the machine
+// the state of the machine, in machine coordinates (bed compensation already applied)
 void PathPlanner::setState(std::vector<FLOAT_T> set)
 {
   if ( set.size() != NUM_AXES ) {throw InputSizeError();}
-  applyBedCompensation(set);
   state = set;
+  hasEndABC = false;
+}
+
+// the ideal position, as given by the user
+void PathPlanner::setIdealState(std::vector<FLOAT_T> set)
+{
+  if ( set.size() != NUM_AXES ) {throw InputSizeError();}
+  ideal_state = set;
 }
 
 
@@ -79,6 +79,16 @@ int PathPlanner::splitInput(const std::vector<FLOAT_T> startPos, const std::vect
   if (axis_config != AXIS_CONFIG_DELTA) {
     return 0;
   }
+
+  // a segment of a move that was already split
+  if (hasPlannedABC) {
+    return 0;
+  }
+
+  if (delta_max_deviation > 0) {
+    return splitDeltaInput(startPos, vec, speed, accel, cancelable, optimize,
+			   use_backlash_compensation, tool_axis);
+  }
     
   FLOAT_T xy2, z2, mag;
   xy2 = vec[0]*vec[0] + vec[1]*vec[1];
@@ -100,6 +110,13 @@ int PathPlanner::splitInput(const std::vector<FLOAT_T> startPos, const std::vect
         
     // LOG("move split into " << N << " pieces\n");
 		
+    // queue the segments as one batch so they are planned together
+    bool inBatch = deferPlanning;
+    if (!inBatch) {
+      deferPlanning = true;
+      batchLines = 0;
+    }
+
     // the sub segments
     std::vector<FLOAT_T> sub_start(startPos);
     std::vector<FLOAT_T> sub_stop(NUM_AXES);
@@ -117,13 +134,15 @@ int PathPlanner::splitInput(const std::vector<FLOAT_T> startPos, const std::vect
       // being split. We do, however, need to pass on whether we 
       // are applying backlash compensation and the tool axis
       // as these modifiers are applied at the end.
-      queueMove(sub_start, sub_stop, speed, accel, cancelable, 
-		optimize, false, false, use_backlash_compensation, 
-		tool_axis, false);
+      queueMoveUnlocked(sub_start, sub_stop, speed, accel, cancelable, 
+			optimize, false, false, use_backlash_compensation, 
+			tool_axis, false);
 			
       // load the end point in as the next starting point
       sub_start = sub_stop;
     }
+
+    deferPlanning = inBatch;
 		
     // return so we don't continue adding this path
     return 1;
@@ -132,13 +151,120 @@ int PathPlanner::splitInput(const std::vector<FLOAT_T> startPos, const std::vect
   return 0;
 }
 
+/**
+   Split a delta move where the carriages would deviate from their path.
+
+   The column positions of every sub-point are computed once, here, and handed
+   to transformVector through plannedABC, so each segment only costs the
+   forward kinematics of its end in reverseTransformVector.
+*/
+int PathPlanner::splitDeltaInput(const std::vector<FLOAT_T> &startPos, const std::vector<FLOAT_T> &vec,
+				 FLOAT_T speed, FLOAT_T accel, bool cancelable, bool optimize,
+				 bool use_backlash_compensation, int tool_axis)
+{
+  FLOAT_T abc0[3], abc1[3];
+  if (hasEndABC && endABCRevision == delta_bot.getRevision()) {
+    abc0[0] = endABC[0];
+    abc0[1] = endABC[1];
+    abc0[2] = endABC[2];
+  } else {
+    delta_bot.inverse_kinematics(startPos[0], startPos[1], startPos[2], &abc0[0], &abc0[1], &abc0[2]);
+  }
+  delta_bot.inverse_kinematics(startPos[0] + vec[0], startPos[1] + vec[1], startPos[2] + vec[2],
+			       &abc1[0], &abc1[1], &abc1[2]);
+
+  splitT.clear();
+  splitABC.clear();
+
+  // without movement in the xy plane the carriages move in a straight line too
+  if (vec[0] != 0 || vec[1] != 0) {
+    FLOAT_T length = sqrt(vec[0]*vec[0] + vec[1]*vec[1] + vec[2]*vec[2]);
+    subdivideDelta(startPos, vec, length, 0, abc0, 1, abc1);
+  }
+
+  if (splitT.empty()) {
+    plannedABC.assign(abc1, abc1 + 3);
+    hasPlannedABC = true;
+    return 0;
+  }
+
+  splitT.push_back(1);
+  splitABC.insert(splitABC.end(), abc1, abc1 + 3);
+
+  // LOG("move split into " << splitT.size() << " pieces\n");
+
+  // queue the segments as one batch so they are planned together
+  bool inBatch = deferPlanning;
+  if (!inBatch) {
+    deferPlanning = true;
+    batchLines = 0;
+  }
+
+  std::vector<FLOAT_T> sub_start(startPos);
+  std::vector<FLOAT_T> sub_stop(NUM_AXES);
+
+  for (size_t i=0; i<splitT.size(); ++i) {
+    for (size_t j=0; j<startPos.size(); ++j) {
+      sub_stop[j] = startPos[j] + vec[j]*splitT[i];
+    }
+    plannedABC.assign(&splitABC[3*i], &splitABC[3*i] + 3);
+    hasPlannedABC = true;
+
+    // as in splitInput, the options already handled for the whole move are off
+    queueMoveUnlocked(sub_start, sub_stop, speed, accel, cancelable,
+		      optimize, false, false, use_backlash_compensation,
+		      tool_axis, false);
+    hasPlannedABC = false;
+
+    sub_start = sub_stop;
+  }
+
+  deferPlanning = inBatch;
+
+  return 1;
+}
+
+/**
+   Add the sub-points needed between t0 and t1 to splitT and splitABC, in order.
+
+   Along a straight move each carriage height is the height of the effector, a
+   linear function, plus the square root of a concave quadratic, which makes it
+   concave. The largest distance between a concave function and its chord is at
+   most twice the distance in the middle, so checking the middle is enough.
+*/
+void PathPlanner::subdivideDelta(const std::vector<FLOAT_T> &startPos, const std::vector<FLOAT_T> &vec,
+				 FLOAT_T length, FLOAT_T t0, const FLOAT_T* abc0, FLOAT_T t1, const FLOAT_T* abc1)
+{
+  if ((t1 - t0) * length < 2 * DELTA_MIN_SEGMENT_LENGTH) {
+    return;
+  }
+
+  FLOAT_T t = (t0 + t1) / 2;
+  FLOAT_T abc[3];
+  delta_bot.inverse_kinematics(startPos[0] + vec[0]*t, startPos[1] + vec[1]*t, startPos[2] + vec[2]*t,
+			       &abc[0], &abc[1], &abc[2]);
+
+  FLOAT_T deviation = 0;
+  for (int i = 0; i < 3; i++) {
+    deviation = std::max(deviation, (FLOAT_T)fabs(abc[i] - (abc0[i] + abc1[i]) / 2));
+  }
+  if (2 * deviation <= delta_max_deviation) {
+    return;
+  }
+
+  subdivideDelta(startPos, vec, length, t0, abc0, t, abc);
+  splitT.push_back(t);
+  splitABC.insert(splitABC.end(), abc, abc + 3);
+  subdivideDelta(startPos, vec, length, t, abc, t1, abc1);
+}
+
 void PathPlanner::transformVector(std::vector<FLOAT_T> &vec, const std::vector<FLOAT_T> &startPos)
 {
   if (axis_config == AXIS_CONFIG_DELTA) {
 
     FLOAT_T start_x, start_y, start_z;
         
-    if (hasEndABC) {
+    if (hasEndABC && endABCRevision == delta_bot.getRevision()) {
       start_x = endABC[0];
       start_y = endABC[1];
       start_z = endABC[2];
@@ -151,7 +277,14 @@ void PathPlanner::transformVector(std::vector<FLOAT_T> &vec, const std::vector<F
     startABC[2] = start_z;
 		
     FLOAT_T end_x, end_y, end_z;
-    delta_bot.inverse_kinematics(startPos[0] + vec[0], startPos[1] + vec[1], startPos[2] + vec[2], &end_x, &end_y, &end_z);
+    if (hasPlannedABC) {
+      end_x = plannedABC[0];
+      end_y = plannedABC[1];
+      end_z = plannedABC[2];
+      hasPlannedABC = false;
+    } else {
+      delta_bot.inverse_kinematics(startPos[0] + vec[0], startPos[1] + vec[1], startPos[2] + vec[2], &end_x, &end_y, &end_z);
+    }
         
     vec[0] = end_x - start_x;
     vec[1] = end_y - start_y;
@@ -175,6 +308,8 @@ void PathPlanner::transformVector(std::vector<FLOAT_T> &vec, const std::vector<F
 void PathPlanner::reverseTransformVector(std::vector<FLOAT_T> &vec)
 {
 
+  // transformVector started from endABC, whose position we already know
+  bool startKnown = hasEndABC && endABCRevision == delta_bot.getRevision();
   hasEndABC = false;
   if (axis_config == AXIS_CONFIG_DELTA) {
 		
@@ -189,13 +324,26 @@ void PathPlanner::reverseTransformVector(std::vector<FLOAT_T> &vec)
     endABC[2] = end_z;
 
     FLOAT_T start_x, start_y, start_z;
-    delta_bot.forward_kinematics(startABC[0], startABC[1], startABC[2], &start_x, &start_y, &start_z);
+    if (startKnown) {
+      start_x = endXYZ[0];
+      start_y = endXYZ[1];
+      start_z = endXYZ[2];
+    } else {
+      delta_bot.forward_kinematics(startABC[0], startABC[1], startABC[2], &start_x, &start_y, &start_z);
+    }
 		
     delta_bot.forward_kinematics(endABC[0], endABC[1], endABC[2], &end_x, &end_y, &end_z);
 		
     vec[0] = end_x - start_x;
     vec[1] = end_y - start_y;
     vec[2] = end_z - start_z;
+
+    // the next move starts where this one ends
+    endXYZ[0] = end_x;
+    endXYZ[1] = end_y;
+    endXYZ[2] = end_z;
+    endABCRevision = delta_bot.getRevision();
+    hasEndABC = true;
 		
   } else {
     if (axis_config == AXIS_CONFIG_H_BELT) {
@@ -212,6 +360,51 @@ void PathPlanner::reverseTransformVector(std::vector<FLOAT_T> &vec)
   return;
 }
 
+/**
+   Steps of each motor due to the X and to the Y motion of a move, for the input shaper,
+   see InputShaper. On a delta they change along the move, it's what each carriage moves
+   for the X or the Y motion alone through the middle of the move.
+*/
+void PathPlanner::computeShapedSteps(const std::vector<FLOAT_T> &startPos, const std::vector<FLOAT_T> &vec, FLOAT_T* steps)
+{
+  std::fill(steps, steps + INPUT_SHAPER_AXES*NUM_AXES, 0);
+
+  for (int axis = 0; axis < INPUT_SHAPER_AXES; ++axis) {
+    if (vec[axis] == 0) {
+      continue;
+    }
+    FLOAT_T* axisSteps = steps + axis*NUM_AXES;
+
+    if (axis_config == AXIS_CONFIG_DELTA) {
+      FLOAT_T from[3], to[3], middle[3];
+      for (int i = 0; i < 3; ++i) {
+        middle[i] = startPos[i] + 0.5*vec[i];
+      }
+      middle[axis] -= 0.5*vec[axis];
+      delta_bot.inverse_kinematics(middle[0], middle[1], middle[2], &from[0], &from[1], &from[2]);
+      middle[axis] += vec[axis];
+      delta_bot.inverse_kinematics(middle[0], middle[1], middle[2], &to[0], &to[1], &to[2]);
+      for (int i = 0; i < 3; ++i) {
+        axisSteps[i] = (to[i] - from[i])*axisStepsPerM[i];
+      }
+    } else {
+      // the other transforms are linear
+      std::vector<FLOAT_T> part(NUM_AXES, 0);
+      part[axis] = vec[axis];
+      transformVector(part, startPos);
+      for (int i = 0; i < NUM_AXES; ++i) {
+        axisSteps[i] = part[i]*axisStepsPerM[i];
+      }
+    }
+
+    if (has_slaves) {
+      for (size_t i = 0; i < master.size(); ++i) {
+        axisSteps[slave[i]] = axisSteps[master[i]]*axisStepsPerM[slave[i]]/axisStepsPerM[master[i]];
+      }
+    }
+  }
+}
+
 void PathPlanner::backlashCompensation(std::vector<FLOAT_T> &delta) 
 {
 
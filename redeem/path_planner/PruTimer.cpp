@@ -30,6 +30,8 @@
 #include <sys/types.h>
 #include <sys/stat.h>
 #include <fcntl.h>
+#include <sys/epoll.h>
+#include <sys/eventfd.h>
 #include <assert.h>
 #include "prussdrv.h"
 #include "pruss_intc_mapping.h"
@@ -42,6 +44,11 @@
 
 #define DDR_MAGIC			0xbabe7175
 
+#define SIMULATED_DDR_SIZE	0x40000
+// Milliseconds to wait for the PRU0 interrupt before looking at the event count anyway
+#define PRU_EVENT_TIMEOUT	250
+
+
 PruTimer::PruTimer() {
 	ddr_mem = 0;
 	mem_fd=-1;
@@ -49,7 +56,24 @@ PruTimer::PruTimer() {
 	ddr_size = 0;
 	totalQueuedMovesTime = 0;
 	ddr_mem_used = 0;
+	ddr_write_location = NULL;
+	ddr_nr_events = NULL;
+	pru_control = NULL;
+	currentNbEvents = 0;
+	consumedBytes = 0;
+	consumedTicks = 0;
+	epoll_fd = -1;
+	wake_fd = -1;
 	stop = false;
+	
+	simulated = false;
+	simulationSpeed = 0;
+	simReadLocation = NULL;
+	simRepeat = 0;
+	simTicks = 0;
+	simSteps = 0;
+	simSyncEvents = 0;
+	bzero(simPosition, sizeof(simPosition));
 }
 
 bool PruTimer::initPRU(const std::string &firmware_stepper, const std::string &firmware_endstops) {
@@ -57,29 +81,8 @@ bool PruTimer::initPRU(const std::string &firmware_stepper, const std::string &f
 	
 	firmwareStepper = firmware_stepper;
 	firmwareEndstop = firmware_endstops;
+	simulated = false;
 	
-#ifdef DEMO_PRU
-	ddr_size=0x40000;
-	
-	ddr_mem = (uint8_t*)malloc(ddr_size);
-	ddr_addr = (unsigned long)ddr_mem;
-	
-	LOG( "The DDR memory reserved for the PRU is 0x" << std::hex <<  ddr_size << " and has addr 0x" <<  std::hex <<  ddr_addr << std::endl);
-	
-	if (ddr_mem == NULL) {
-        return false;
-    }
-	
-	ddr_write_location  = ddr_mem;
-	ddr_nr_events  = (uint32_t*)(ddr_mem+ddr_size-4);
-	ddr_mem_end = ddr_mem+ddr_size-8;
-	pru_control = (uint32_t*)(ddr_mem+ddr_size-8);
-	
-	*((uint32_t*)ddr_write_location)=0; //So that the PRU waits
-	*ddr_nr_events = 0;
-	
-	currentReadingAddress = ddr_write_location;
-#else
 	unsigned int ret;
     tpruss_intc_initdata pruss_intc_initdata = PRUSS_INTC_INITDATA;
 	
@@ -107,6 +110,10 @@ bool PruTimer::initPRU(const std::string &firmware_stepper, const std::string &f
     /* Get the interrupt initialized */
     prussdrv_pruintc_init(&pruss_intc_initdata);
 	
+	if(!initEventLoop()) {
+		LOG( "[WARNING] Unable to wait for PRU0 events with epoll, polling them instead" << std::endl);
+	}
+	
 	
 	std::ifstream faddr("/sys/class/uio/uio0/maps/map1/addr");
 	
@@ -189,21 +196,150 @@ bool PruTimer::initPRU(const std::string &firmware_stepper, const std::string &f
 	 
 	 prussdrv_pru_clear_event (PRU_EVTOUT_0, PRU0_ARM_INTERRUPT);*/
 	
-#endif
+	ddr_mem_used = 0;
+	blocksID = std::queue<BlockDef>();
+	currentNbEvents = 0;
+	totalQueuedMovesTime = 0;
+	consumedBytes = 0;
+	consumedTicks = 0;
+	
+	return true;
+}
+
+/**
+ Use a simulated PRU instead of the real ones. It executes the commands
+ written to a fake DDR like firmware_runtime.p and keeps a virtual clock
+ of the time they take on the PRU.
+ trace_file - file to record every step to, none if empty. See StepTrace.
+ speed - how many times faster than real time to run, 0 to run as fast as possible.
+*/
+bool PruTimer::initSimulatedPRU(const std::string& trace_file, double speed) {
+	std::unique_lock<std::mutex> lk(mutex_memory);
+	
+	simulated = true;
+	simulationSpeed = speed;
+	
+	ddr_size = SIMULATED_DDR_SIZE;
+	ddr_mem = (uint8_t*)malloc(ddr_size);
+	
+	if (ddr_mem == NULL) {
+		LOG( "Failed to allocate the simulated DDR" << std::endl);
+		return false;
+	}
+	
+	ddr_addr = (unsigned long)ddr_mem;
+	
+	LOG( "The DDR memory reserved for the simulated PRU is 0x" << std::hex <<  ddr_size << " and has addr 0x" <<  std::hex <<  ddr_addr << std::dec << std::endl);
+	
+	ddr_write_location  = ddr_mem;
+	ddr_nr_events  = (uint32_t*)(ddr_mem+ddr_size-4);
+	ddr_mem_end = ddr_mem+ddr_size-8;
+	pru_control = (uint32_t*)(ddr_mem+ddr_size-8);
+	
+	initalizePRURegisters();
+	
+	if(!trace_file.empty() && !trace.open(trace_file)) {
+		return false;
+	}
+	
+	simTicks = 0;
+	simSteps = 0;
+	simSyncEvents = 0;
+	bzero(simPosition, sizeof(simPosition));
 	
 	ddr_mem_used = 0;
 	blocksID = std::queue<BlockDef>();
 	currentNbEvents = 0;
 	totalQueuedMovesTime = 0;
+	consumedBytes = 0;
+	consumedTicks = 0;
 	
 	return true;
 }
 
+/**
+ Watch the UIO file of the PRU0 completion interrupt with epoll, along with
+ an eventfd stopThread uses to wake run() up.
+*/
+bool PruTimer::initEventLoop() {
+	closeEventLoop();
+	
+	int event_fd = prussdrv_pru_event_fd(PRU_EVTOUT_0);
+	if(event_fd < 0)
+		return false;
+	
+	epoll_fd = epoll_create1(EPOLL_CLOEXEC);
+	wake_fd = eventfd(0, EFD_NONBLOCK | EFD_CLOEXEC);
+	if(epoll_fd < 0 || wake_fd < 0) {
+		LOG( "Failed to create the PRU event loop " << strerror(errno) << std::endl);
+		closeEventLoop();
+		return false;
+	}
+	
+	struct epoll_event ev;
+	bzero(&ev, sizeof(ev));
+	ev.events = EPOLLIN;
+	ev.data.fd = event_fd;
+	if(epoll_ctl(epoll_fd, EPOLL_CTL_ADD, event_fd, &ev) == 0) {
+		ev.data.fd = wake_fd;
+		if(epoll_ctl(epoll_fd, EPOLL_CTL_ADD, wake_fd, &ev) == 0)
+			return true;
+	}
+	
+	LOG( "Failed to watch the PRU events " << strerror(errno) << std::endl);
+	closeEventLoop();
+	return false;
+}
+
+void PruTimer::closeEventLoop() {
+	if(epoll_fd >= 0)
+		close(epoll_fd);
+	if(wake_fd >= 0)
+		close(wake_fd);
+	epoll_fd = -1;
+	wake_fd = -1;
+}
+
+/**
+ Wait for the PRU0 completion interrupt, a stop or the timeout, whichever
+ comes first. Returns the number of interrupts read, 0 if there were none.
+ The event count in the DDR is checked after a timeout as well, in case an
+ interrupt was missed.
+*/
+unsigned int PruTimer::waitForEvent() {
+	if(epoll_fd < 0)
+		return prussdrv_pru_wait_event(PRU_EVTOUT_0, PRU_EVENT_TIMEOUT);
+	
+	struct epoll_event events[2];
+	int nb = epoll_wait(epoll_fd, events, 2, PRU_EVENT_TIMEOUT);
+	unsigned int nbEvents = 0;
+	
+	for(int i=0; i<nb; i++) {
+		if(events[i].data.fd == wake_fd) {
+			uint64_t count;
+			// Nothing to read means the wake up was consumed already
+			if(read(wake_fd, &count, sizeof(count)) < 0 && errno != EAGAIN)
+				LOG( "Failed to read the PRU wake up " << strerror(errno) << std::endl);
+		} else {
+			nbEvents = prussdrv_pru_wait_event(PRU_EVTOUT_0, 0);
+		}
+	}
+	
+	return nbEvents;
+}
+
 void PruTimer::initalizePRURegisters() {
 	*((uint32_t*)ddr_write_location)=0; //So that the PRU waits
 	*ddr_nr_events = 0;
 	*pru_control = 0;
 	
+	if(simulated) {
+		//Like RESET_R4 in the firmware
+		simReadLocation = ddr_mem;
+		simRepeat = 0;
+		return;
+	}
+	
 	//Set DDR location for PRU
 	//pypruss.pru_write_memory(0, 0, [self.ddr_addr, self.ddr_nr_events, 0])
 	uint32_t ddrstartData[3];
@@ -223,22 +359,27 @@ PruTimer::~PruTimer() {
 void PruTimer::reset() {
 	std::unique_lock<std::mutex> lk(mutex_memory);
 	
-	prussdrv_pru_disable(0);
-	prussdrv_pru_disable(1);
-	
-	initalizePRURegisters();
-	
-	/* Execute firmwares on PRU */
-    LOG( ("\tINFO: Starting stepper firmware on PRU0\r\n"));
-	unsigned int ret = prussdrv_exec_program (PRU_NUM0, firmwareStepper.c_str());
-	if(ret!=0) {
-		LOG( "[WARNING] Unable to execute firmware on PRU0" << std::endl);
-	}
-	
-    LOG( ("\tINFO: Starting endstop firmware on PRU1\r\n"));
-    ret=prussdrv_exec_program (PRU_NUM1, firmwareEndstop.c_str());
-	if(ret!=0) {
-		LOG( "[WARNING] Unable to execute firmware on PRU1" << std::endl);
+	if(simulated) {
+		initalizePRURegisters();
+		simWake.notify_all();
+	} else {
+		prussdrv_pru_disable(0);
+		prussdrv_pru_disable(1);
+		
+		initalizePRURegisters();
+		
+		/* Execute firmwares on PRU */
+		LOG( ("\tINFO: Starting stepper firmware on PRU0\r\n"));
+		unsigned int ret = prussdrv_exec_program (PRU_NUM0, firmwareStepper.c_str());
+		if(ret!=0) {
+			LOG( "[WARNING] Unable to execute firmware on PRU0" << std::endl);
+		}
+		
+		LOG( ("\tINFO: Starting endstop firmware on PRU1\r\n"));
+		ret=prussdrv_exec_program (PRU_NUM1, firmwareEndstop.c_str());
+		if(ret!=0) {
+			LOG( "[WARNING] Unable to execute firmware on PRU1" << std::endl);
+		}
 	}
 	
 	totalQueuedMovesTime = 0;
@@ -265,32 +406,58 @@ void PruTimer::stopThread(bool join) {
 	LOG( "Stopping PruTimer..." << std::endl);
 	stop=true;
 	
+	if(simulated) {
+		//The simulated PRU reads the DDR from our thread, it must be done before the DDR is freed
+		{
+			std::lock_guard<std::mutex> lk(mutex_memory);
+			simWake.notify_all();
+			simSync.notify_all();
+			blockAvailable.notify_all();
+		}
+		if(runningThread.joinable()) {
+			LOG( "Joining thread" << std::endl);
+			runningThread.join();
+		}
+		
+		trace.close();
+		
+		if(ddr_mem) {
+			free(ddr_mem);
+			ddr_mem = NULL;
+		}
+		
+		LOG( "Simulated PRU stopped." << std::endl);
+		return;
+	}
+	
+	//Wake run() up, it has to be done with the DDR before it is unmapped
+	if(wake_fd >= 0) {
+		uint64_t one = 1;
+		// run() wakes up within PRU_EVENT_TIMEOUT anyway
+		if(write(wake_fd, &one, sizeof(one)) < 0)
+			LOG( "Failed to wake the PRU thread up " << strerror(errno) << std::endl);
+	}
+	blockAvailable.notify_all();
+	if(join && runningThread.joinable()) {
+        LOG( "Joining thread" << std::endl);
+		runningThread.join();
+	}
+	
 	/* Disable PRU and close memory mapping*/
     prussdrv_pru_disable (PRU_NUM0);
     prussdrv_pru_disable (PRU_NUM1);
+    closeEventLoop();
     prussdrv_exit ();
 	
 	if(ddr_mem) {
-#ifdef DEMO_PRU
-		free(ddr_mem);
-		ddr_mem = NULL;
-#else
 		munmap(ddr_mem, ddr_size);
 		close(mem_fd);
 		ddr_mem = NULL;
 		mem_fd=-1;
-#endif
 	}
     
 	LOG( "PRU disabled, DDR released, FD closed." << std::endl);
 	
-	
-	blockAvailable.notify_all();
-	if(join && runningThread.joinable()) {
-        LOG( "Joining thread" << std::endl);
-		runningThread.join();
-	}
-	
 	LOG( "PruTimer stopped." << std::endl);
 }
 
@@ -300,9 +467,9 @@ blockMemory - the data.
 blockLen - number of data bytes. 
 unit - stepSize in bytes. 
 pathID - linespos. 
-totalTime - time it takes to complete the current block, in ticks. 
+The time each part of the block takes is counted from the commands written, see steppersCommandsCycles.
 */
-void PruTimer::push_block(uint8_t* blockMemory, size_t blockLen, unsigned int unit, unsigned int pathID, unsigned long totalTime) {
+void PruTimer::push_block(uint8_t* blockMemory, size_t blockLen, unsigned int unit, unsigned int pathID) {
 	
 	if(!ddr_write_location) 
         return;
@@ -323,6 +490,7 @@ void PruTimer::push_block(uint8_t* blockMemory, size_t blockLen, unsigned int un
 	assert(blockSize*nbBlocks>=blockLen);
 	
 	size_t nbStepsWritten = 0;
+	uint32_t repeat = 0; //Repetitions left at the end of the previous part
 	
 	for(unsigned int i=0;i<nbBlocks;i++) {
 		
@@ -392,8 +560,8 @@ void PruTimer::push_block(uint8_t* blockMemory, size_t blockLen, unsigned int un
 				}
 				
 				assert(maxSize>0);
-				unsigned long t = currentBlockSize-maxSize > 0 ? totalTime/2 : totalTime;
-				blocksID.emplace(maxSize+4,t); //FIXME: TotalTime is not /2 but doesn't it to be precise to make it work...
+				unsigned long t = steppersCommandsCycles((SteppersCommand*)blockStart, maxSize/unit, repeat);
+				blocksID.emplace(maxSize+4,t);
 				
 				ddr_mem_used+=maxSize+4;
 				totalQueuedMovesTime += t;
@@ -456,10 +624,11 @@ void PruTimer::push_block(uint8_t* blockMemory, size_t blockLen, unsigned int un
 					assert(remainingSize == (remainingSize/unit)*unit);
 
 					
-					blocksID.emplace(remainingSize+4,totalTime-t); //FIXME: TotalTime is not /2 but doesn't it to be precise to make it work...
+					t = steppersCommandsCycles((SteppersCommand*)(blockStart+maxSize), remainingSize/unit, repeat);
+					blocksID.emplace(remainingSize+4,t);
 					
 					ddr_mem_used+=remainingSize+4;
-					totalQueuedMovesTime += totalTime-t;
+					totalQueuedMovesTime += t;
 					
 
 					assert(ddr_write_location+remainingSize+sizeof(nb)*2<=ddr_mem_end);
@@ -501,9 +670,10 @@ void PruTimer::push_block(uint8_t* blockMemory, size_t blockLen, unsigned int un
 				
 				
 			} else {
-				blocksID.emplace(currentBlockSize+4,totalTime); //FIXME: TotalTime is not /2 but doesn't it to be precise to make it work...
+				unsigned long t = steppersCommandsCycles((SteppersCommand*)blockStart, currentBlockSize/unit, repeat);
+				blocksID.emplace(currentBlockSize+4,t);
 				ddr_mem_used+=currentBlockSize+4;
-				totalQueuedMovesTime += totalTime;
+				totalQueuedMovesTime += t;
 				//First copy the data
 				//LOG( std::hex << "Writing data to 0x" << (unsigned long)ddr_write_location+4 << std::endl);
 				//LOG( std::dec << "Writing " << currentBlockSize+4 << " bytes to 0x" << std::hex << (unsigned long)ddr_write_location << std::endl);
@@ -526,6 +696,9 @@ void PruTimer::push_block(uint8_t* blockMemory, size_t blockLen, unsigned int un
 				ddr_write_location+=currentBlockSize+sizeof(nb);
 				msync(ddr_write_location, sizeof(nb), MS_SYNC);
 			}
+			
+			if(simulated)
+				simWake.notify_all();
 		}
 	}
 	assert(nbStepsWritten == blockLen/unit);
@@ -546,29 +719,14 @@ void PruTimer::waitUntilLowMoveTime(unsigned long lowMoveTimeTicks) {
 void PruTimer::run() {
 	LOG( "Starting PruTimer thread..." << std::endl);
 	while(!stop) {
-#ifdef DEMO_PRU
+		unsigned int nbWaitedEvent = 0;
 		
-		unsigned int* nbCommand = (unsigned int *)currentReadingAddress;
-		
-		if(!nbCommand || stop || !*nbCommand)
-			continue;
-		SteppersCommand * cmd = (SteppersCommand*)(currentReadingAddress+4);
-		FLOAT_T totalWait = 0;
-		for(int i=0; i<(int)*nbCommand;i++) {
-			totalWait+=cmd->delay/200000.0;
-			cmd++;
-		}
-		
-		std::this_thread::sleep_for( std::chrono::milliseconds((unsigned)totalWait) );
-		currentReadingAddress+=(*nbCommand)*8+4;
-		nbCommand = (unsigned int *)currentReadingAddress;
-		if(*nbCommand == DDR_MAGIC) {
-			currentReadingAddress = ddr_mem;
+		if(simulated) {
+			if(!simulateBlock())
+				continue;
+		} else {
+			nbWaitedEvent = waitForEvent();
 		}
-		*ddr_nr_events=(*ddr_nr_events)+1;
-#else
-		unsigned int nbWaitedEvent = prussdrv_pru_wait_event (PRU_EVTOUT_0,1000); // 250ms timeout
-#endif
 
 		if(stop) 
             break;
@@ -581,10 +739,8 @@ void PruTimer::run() {
 		*/
 		
 		
-#ifndef DEMO_PRU
 		if(nbWaitedEvent)
 			prussdrv_pru_clear_event (PRU_EVTOUT_0, PRU0_ARM_INTERRUPT);
-#endif		
 		msync(ddr_nr_events, 4, MS_SYNC);
 		uint32_t nb = *ddr_nr_events;
 		{
@@ -594,6 +750,8 @@ void PruTimer::run() {
 				BlockDef & front = blocksID.front();
 				ddr_mem_used-=front.size;
 				totalQueuedMovesTime -=front.totalTime;
+				consumedBytes += front.size;
+				consumedTicks += front.totalTime;
 				assert(ddr_mem_used<ddr_size);
 //				LOG( "Block of size " << std::dec << front.size << " and time " << front.totalTime << " done." << std::endl);
 				blocksID.pop();
@@ -609,6 +767,13 @@ void PruTimer::run() {
 
 int PruTimer::waitUntilSync() {
     int ret;
+    if(simulated) {
+    	std::unique_lock<std::mutex> lk(mutex_memory);
+    	if(!simSync.wait_for(lk, std::chrono::milliseconds(1000), [this]{ return simSyncEvents>0 || stop; }) || !simSyncEvents)
+    		return 0;
+    	simSyncEvents--;
+    	return 1;
+    }
 	// Wait until the PRU sends a sync event.
     ret = prussdrv_pru_wait_event(PRU_EVTOUT_1, 1000);
     if(ret != 0)
@@ -626,4 +791,94 @@ void PruTimer::resume() {
 	//We lock it so that we are thread safe
 	std::unique_lock<std::mutex> lk(mutex_memory);
 	*pru_control = 0;
+	simWake.notify_all();
+}
+
+/**
+ Execute the next block of commands in the DDR like firmware_runtime.p does,
+ waiting for one to be written first. Returns false when stopped.
+ There are no endstops, so steps are never masked and cancelable moves always
+ run to the end.
+*/
+bool PruTimer::simulateBlock() {
+	std::unique_lock<std::mutex> lk(mutex_memory);
+	
+	simWake.wait(lk, [this]{
+		if(stop)
+			return true;
+		uint32_t nb = *(uint32_t*)simReadLocation;
+		//The end of the DDR is reached
+		if(nb == DDR_MAGIC) {
+			simReadLocation = ddr_mem;
+			nb = *(uint32_t*)simReadLocation;
+		}
+		return nb != 0 && nb != DDR_MAGIC;
+	});
+	
+	if(stop)
+		return false;
+	
+	uint32_t remaining = *(uint32_t*)simReadLocation;
+	SteppersCommand* cmd = (SteppersCommand*)(simReadLocation+4);
+	uint64_t blockStart = simTicks;
+	
+	while(remaining) {
+		//A repeat command only sets how many more times the next command is executed
+		if(cmd->options & STEPPER_COMMAND_OPTION_REPEAT) {
+			simRepeat = cmd->delay;
+			cmd++;
+			remaining--;
+			continue;
+		}
+		
+		const SteppersCommand done = *cmd;
+		simulateCommand(done);
+		
+		if(simRepeat) {
+			simRepeat--;
+		} else {
+			cmd++;
+			remaining--;
+		}
+		
+		if(done.options & STEPPER_COMMAND_OPTION_SYNC_EVENT) {
+			if((done.options & STEPPER_COMMAND_OPTION_SYNCWAIT_EVENT) == STEPPER_COMMAND_OPTION_SYNCWAIT_EVENT)
+				*pru_control = 1;
+			simSyncEvents++;
+			simSync.notify_all();
+		}
+		
+		//Suspended by the host or by the command
+		simWake.wait(lk, [this]{ return *pru_control == 0 || stop; });
+		if(stop)
+			return false;
+	}
+	
+	simReadLocation = (uint8_t*)cmd;
+	
+	if(simulationSpeed > 0) {
+		lk.unlock();
+		std::this_thread::sleep_for(std::chrono::nanoseconds((uint64_t)((simTicks-blockStart) * (1000000000.0/F_CPU) / simulationSpeed)));
+		lk.lock();
+	}
+	
+	*ddr_nr_events = (*ddr_nr_events)+1;
+	return true;
+}
+
+/**
+ Do the steps of a command and advance the virtual clock by the time
+ the firmware takes to execute it.
+*/
+void PruTimer::simulateCommand(const SteppersCommand& cmd) {
+	for(int axis=0; axis<NUM_AXES; axis++) {
+		if(!(cmd.step & (1 << axis)))
+			continue;
+		bool direction = cmd.direction & (1 << axis);
+		simPosition[axis] += direction ? 1 : -1;
+		simSteps++;
+		trace.record(simTicks, axis, direction);
+	}
+	
+	simTicks += steppersCommandCycles(cmd);
 }
@@ -17,8 +17,9 @@
 #include <strings.h>
 #include <condition_variable>
 #include "Logger.h"
-
-//#define DEMO_PRU
+#include "StepTrace.h"
+#include "StepperCommand.h"
+#include "config.h"
 
 class PruTimer {
 	
@@ -48,6 +49,14 @@ class PruTimer {
 	
 	uint32_t currentNbEvents;
 	
+	/* Moves the PRU finished since it was initialized */
+	uint64_t consumedBytes;
+	uint64_t consumedTicks;
+	
+	/* PRU0 completion interrupt and the stop wake up, see waitForEvent */
+	int epoll_fd;
+	int wake_fd;
+	
 	std::mutex mutex_memory;
 	
 	std::condition_variable blockAvailable;
@@ -55,16 +64,50 @@ class PruTimer {
 	std::thread runningThread;
 	bool stop;
 	
-#ifdef DEMO_PRU
-	uint8_t *currentReadingAddress;
-#endif
+	/* Simulated PRU, see initSimulatedPRU */
+	bool simulated;
+	double simulationSpeed;
+	uint8_t *simReadLocation; //Next command the simulated PRU executes
+	uint32_t simRepeat; //Remaining repetitions of the current command
+	uint64_t simTicks; //Virtual clock in PRU cycles
+	uint64_t simSteps;
+	uint32_t simSyncEvents;
+	int64_t simPosition[NUM_AXES];
+	std::condition_variable simWake;
+	std::condition_variable simSync;
+	StepTrace trace;
 	
 	void initalizePRURegisters();
+	bool initEventLoop();
+	void closeEventLoop();
+	unsigned int waitForEvent();
+	bool simulateBlock();
+	void simulateCommand(const SteppersCommand& cmd);
 	
 public:
 	PruTimer();
 	virtual ~PruTimer();
 	bool initPRU(const std::string& firmware_stepper, const std::string& firmware_endstops);
+	bool initSimulatedPRU(const std::string& trace_file, double speed);
+	
+	bool isSimulated() {
+		return simulated;
+	}
+	
+	double getSimulatedTime() {
+		std::lock_guard<std::mutex> lk(mutex_memory);
+		return simTicks / (double)F_CPU;
+	}
+	
+	int64_t getSimulatedPosition(int axis) {
+		std::lock_guard<std::mutex> lk(mutex_memory);
+		return simPosition[axis];
+	}
+	
+	uint64_t getSimulatedStepCount() {
+		std::lock_guard<std::mutex> lk(mutex_memory);
+		return simSteps;
+	}
 	
 	void run();
 	
@@ -77,11 +120,26 @@ public:
 		return ddr_size-ddr_mem_used-4;
 	}
 	
+	size_t getDDRMemoryUsed() {
+		std::lock_guard<std::mutex> lk(mutex_memory);
+		return ddr_mem_used;
+	}
+	
 	unsigned long getTotalQueuedMovesTime() {
 		std::lock_guard<std::mutex> lk(mutex_memory);
 		return totalQueuedMovesTime;
 	}
 	
+	uint64_t getConsumedBytes() {
+		std::lock_guard<std::mutex> lk(mutex_memory);
+		return consumedBytes;
+	}
+	
+	uint64_t getConsumedTicks() {
+		std::lock_guard<std::mutex> lk(mutex_memory);
+		return consumedTicks;
+	}
+	
 	void waitUntilLowMoveTime(unsigned long lowMoveTimeTicks);
 
 	int waitUntilSync();
@@ -92,7 +150,7 @@ public:
 	
 	void reset();
 	
-	void push_block(uint8_t* blockMemory, size_t blockLen, unsigned int unit, unsigned int pathID, unsigned long totalTime);
+	void push_block(uint8_t* blockMemory, size_t blockLen, unsigned int unit, unsigned int pathID);
 };
 
 #endif /* defined(__PathPlanner__PruTimer__) */
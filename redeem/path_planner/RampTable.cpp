@@ -0,0 +1,161 @@
+/*
+ This file is part of Redeem - 3D Printer control software
+
+ License: GNU GPLv3 http://www.gnu.org/copyleft/gpl.html
+
+ Redeem is free software: you can redistribute it and/or modify
+ it under the terms of the GNU General Public License as published by
+ the Free Software Foundation, either version 3 of the License, or
+ (at your option) any later version.
+
+ Redeem is distributed in the hope that it will be useful,
+ but WITHOUT ANY WARRANTY; without even the implied warranty of
+ MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+ GNU General Public License for more details.
+
+ You should have received a copy of the GNU General Public License
+ along with Redeem.  If not, see <http://www.gnu.org/licenses/>.
+
+ */
+
+#include "RampTable.h"
+#include <assert.h>
+#include <functional>
+
+RampTable::RampTable() {
+  for(int i=0; i<RAMP_TABLE_SLOTS; i++)
+    slots[i].valid = false;
+  hits = 0;
+  misses = 0;
+}
+
+RampTable::Ramp& RampTable::lookup(bool decelerate, FLOAT_T vFrom, FLOAT_T vTo, unsigned long long accel) {
+  std::hash<FLOAT_T> hashSpeed;
+  size_t hash = hashSpeed(vFrom) ^ (hashSpeed(vTo) * 31) ^ (std::hash<unsigned long long>()(accel) * 131) ^ decelerate;
+  Ramp& ramp = slots[hash % RAMP_TABLE_SLOTS];
+
+  if(ramp.valid && !ramp.sCurve && ramp.decelerate == decelerate && ramp.vFrom == vFrom && ramp.vTo == vTo && ramp.accel == accel) {
+    hits++;
+    return ramp;
+  }
+
+  // Evict whatever was there, the vectors keep their memory
+  misses++;
+  ramp.valid = true;
+  ramp.sCurve = false;
+  ramp.decelerate = decelerate;
+  ramp.vFrom = vFrom;
+  ramp.vTo = vTo;
+  ramp.accel = accel;
+  ramp.intervals.clear();
+  ramp.speeds.clear();
+  ramp.timer = 0;
+  ramp.interval = 0;
+  return ramp;
+}
+
+RampTable::Ramp& RampTable::lookup(bool decelerate, const SCurveProfile& profile) {
+  std::hash<FLOAT_T> hashSpeed;
+  size_t hash = hashSpeed(profile.vFrom) ^ (hashSpeed(profile.vTo) * 31)
+    ^ (hashSpeed(profile.duration) * 131) ^ (hashSpeed(profile.jerkTime) * 257) ^ decelerate;
+  Ramp& ramp = slots[hash % RAMP_TABLE_SLOTS];
+
+  if(ramp.valid && ramp.sCurve && ramp.decelerate == decelerate
+     && ramp.profile.vFrom == profile.vFrom && ramp.profile.vTo == profile.vTo
+     && ramp.profile.duration == profile.duration && ramp.profile.jerkTime == profile.jerkTime) {
+    hits++;
+    return ramp;
+  }
+
+  misses++;
+  ramp.valid = true;
+  ramp.sCurve = true;
+  ramp.profile = profile;
+  ramp.decelerate = decelerate;
+  ramp.vFrom = profile.vFrom;
+  ramp.vTo = profile.vTo;
+  ramp.accel = 0;
+  ramp.intervals.clear();
+  ramp.speeds.clear();
+  ramp.timer = 0;
+  ramp.interval = 0;
+  return ramp;
+}
+
+// Compute the ramp up to steps intervals, continuing from where it was left
+void RampTable::extend(Ramp& ramp, unsigned int steps) {
+  unsigned int timer = ramp.timer;
+  unsigned int interval = ramp.interval;
+
+  for(unsigned int n = ramp.intervals.size(); n < steps; n++) {
+    if(ramp.sCurve) {
+      unsigned long v = ramp.profile.speedAt(timer / (FLOAT_T)F_CPU);
+      ramp.intervals.push_back(v > 0 ? F_CPU/v : 0);
+      if(!ramp.decelerate)
+	ramp.speeds.push_back(v);
+      if(v > 0)
+	interval = F_CPU/v;
+    }
+    else if(!ramp.decelerate) {
+      unsigned int vReached = ComputeV(timer, ramp.accel) + ramp.vFrom;
+      if(vReached > ramp.vTo)
+	vReached = ramp.vTo;
+      unsigned long v = vReached;
+      ramp.intervals.push_back(v > 0 ? F_CPU/v : 0);
+      ramp.speeds.push_back(vReached);
+      if(v > 0)
+	interval = F_CPU/v;
+    }
+    else {
+      unsigned int vFrom = ramp.vFrom;
+      unsigned long v = ComputeV(timer, ramp.accel);
+      if(v > vFrom)   // if deceleration goes too far it can become too large
+	v = ramp.vTo;
+      else{
+	v = vFrom - v;
+	if(v < ramp.vTo)
+	  v = ramp.vTo; // extra steps at the end of deceleration due to rounding errors
+      }
+      ramp.intervals.push_back(v > 0 ? F_CPU/v : 0);
+      if(v > 0)
+	interval = F_CPU/v;
+    }
+    assert(interval < F_CPU*4);
+    timer += interval;
+  }
+
+  ramp.timer = timer;
+  ramp.interval = interval;
+}
+
+const uint32_t* RampTable::accelerate(FLOAT_T vStart, FLOAT_T vMax, unsigned long long accel,
+				      unsigned int steps, unsigned int& vReached) {
+  Ramp& ramp = lookup(false, vStart, vMax, accel);
+  if(ramp.intervals.size() < steps)
+    extend(ramp, steps);
+  vReached = steps ? ramp.speeds[steps - 1] : (unsigned int)vStart;
+  return ramp.intervals.data();
+}
+
+const uint32_t* RampTable::decelerate(unsigned int vFrom, FLOAT_T vEnd, unsigned long long accel,
+				      unsigned int steps) {
+  Ramp& ramp = lookup(true, vFrom, vEnd, accel);
+  if(ramp.intervals.size() < steps)
+    extend(ramp, steps);
+  return ramp.intervals.data();
+}
+
+const uint32_t* RampTable::accelerate(const SCurveProfile& profile, unsigned int steps, unsigned int& vReached) {
+  Ramp& ramp = lookup(false, profile);
+  if(ramp.intervals.size() < steps)
+    extend(ramp, steps);
+  vReached = steps ? ramp.speeds[steps - 1] : (unsigned int)profile.vFrom;
+  return ramp.intervals.data();
+}
+
+const uint32_t* RampTable::decelerate(const SCurveProfile& profile, unsigned int steps) {
+  Ramp& ramp = lookup(true, profile);
+  if(ramp.intervals.size() < steps)
+    extend(ramp, steps);
+  return ramp.intervals.data();
+}
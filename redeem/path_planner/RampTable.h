@@ -0,0 +1,123 @@
+/*
+ This file is part of Redeem - 3D Printer control software
+
+ License: GNU GPLv3 http://www.gnu.org/copyleft/gpl.html
+
+ Redeem is free software: you can redistribute it and/or modify
+ it under the terms of the GNU General Public License as published by
+ the Free Software Foundation, either version 3 of the License, or
+ (at your option) any later version.
+
+ Redeem is distributed in the hope that it will be useful,
+ but WITHOUT ANY WARRANTY; without even the implied warranty of
+ MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+ GNU General Public License for more details.
+
+ You should have received a copy of the GNU General Public License
+ along with Redeem.  If not, see <http://www.gnu.org/licenses/>.
+
+ */
+
+#ifndef __PathPlanner__RampTable__
+#define __PathPlanner__RampTable__
+
+#include <stdint.h>
+#include <stddef.h>
+#include <vector>
+#include "config.h"
+#include "Path.h"
+
+// Speed reached after timer cycles at accel
+#define ComputeV(timer,accel)  (((timer>>8)*accel)>>10)
+#define ComputeV2(timer,accel)  (((timer/256.0)*accel)/1024)
+
+// Number of ramps kept, direct mapped on the ramp parameters
+#define RAMP_TABLE_SLOTS 64
+
+/**
+ * Step intervals of the acceleration and deceleration ramps of a move.
+ *
+ * The interval of a step depends on the time spent in the ramp so far, so a
+ * ramp is a function of its speeds and acceleration only and the intervals of
+ * a shorter ramp are a prefix of those of a longer one. Ramps are computed once
+ * and kept, infill and other repeated moves reuse them.
+ *
+ * An interval of 0 means the speed was 0 and the previous interval is kept.
+ *
+ * S-curve ramps are kept the same way, keyed on their profile.
+ */
+class RampTable {
+ private:
+  struct Ramp {
+    bool valid;
+    bool decelerate;
+    FLOAT_T vFrom;
+    FLOAT_T vTo;
+    unsigned long long accel;
+    bool sCurve;
+    SCurveProfile profile;
+
+    std::vector<uint32_t> intervals;  /// PRU cycles for each step
+    std::vector<unsigned int> speeds; /// Speed reached at each step, accelerations only
+
+    // State to continue the ramp from
+    unsigned int timer;
+    unsigned int interval;
+  };
+
+  Ramp slots[RAMP_TABLE_SLOTS];
+  unsigned long long hits;
+  unsigned long long misses;
+
+  Ramp& lookup(bool decelerate, FLOAT_T vFrom, FLOAT_T vTo, unsigned long long accel);
+  Ramp& lookup(bool decelerate, const SCurveProfile& profile);
+  void extend(Ramp& ramp, unsigned int steps);
+
+ public:
+  RampTable();
+
+  /**
+   * @brief Intervals of the first steps of an acceleration
+   * @param vStart Start speed in steps/s
+   * @param vMax Speed to stop accelerating at in steps/s
+   * @param accel Acceleration, scaled as in PathPlanner::run
+   * @param steps Number of intervals needed
+   * @param vReached Set to the speed reached at the last step
+   * @return steps intervals, valid until the next call
+   */
+  const uint32_t* accelerate(FLOAT_T vStart, FLOAT_T vMax, unsigned long long accel,
+			     unsigned int steps, unsigned int& vReached);
+
+  /**
+   * @brief Intervals of the first steps of a deceleration
+   * @param vFrom Speed the deceleration starts from in steps/s
+   * @param vEnd End speed in steps/s
+   * @param accel Acceleration, scaled as in PathPlanner::run
+   * @param steps Number of intervals needed
+   * @return steps intervals, valid until the next call
+   */
+  const uint32_t* decelerate(unsigned int vFrom, FLOAT_T vEnd, unsigned long long accel,
+			     unsigned int steps);
+
+  /**
+   * @brief Intervals of the first steps of an S-curve acceleration
+   * @param profile The speed change, in steps/s
+   * @param steps Number of intervals needed
+   * @param vReached Set to the speed reached at the last step
+   * @return steps intervals, valid until the next call
+   */
+  const uint32_t* accelerate(const SCurveProfile& profile, unsigned int steps, unsigned int& vReached);
+
+  /**
+   * @brief Intervals of the first steps of an S-curve deceleration
+   * @param profile The speed change, in steps/s
+   * @param steps Number of intervals needed
+   * @return steps intervals, valid until the next call
+   */
+  const uint32_t* decelerate(const SCurveProfile& profile, unsigned int steps);
+
+  unsigned long long getHits() { return hits; }
+  unsigned long long getMisses() { return misses; }
+};
+
+#endif
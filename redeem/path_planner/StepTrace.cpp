@@ -0,0 +1,116 @@
+/*
+ This file is part of Redeem - 3D Printer control software
+
+ License: GNU GPLv3 http://www.gnu.org/copyleft/gpl.html
+
+ Redeem is free software: you can redistribute it and/or modify
+ it under the terms of the GNU General Public License as published by
+ the Free Software Foundation, either version 3 of the License, or
+ (at your option) any later version.
+
+ Redeem is distributed in the hope that it will be useful,
+ but WITHOUT ANY WARRANTY; without even the implied warranty of
+ MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+ GNU General Public License for more details.
+
+ You should have received a copy of the GNU General Public License
+ along with Redeem.  If not, see <http://www.gnu.org/licenses/>.
+
+ */
+
+#include "StepTrace.h"
+
+#include <unistd.h>
+#include <fcntl.h>
+#include <errno.h>
+#include <string.h>
+#include <sys/mman.h>
+#include "Logger.h"
+
+StepTrace::StepTrace() {
+  fd = -1;
+  mem = NULL;
+  capacity = 0;
+}
+
+StepTrace::~StepTrace() {
+  close();
+}
+
+bool StepTrace::map(size_t records) {
+  size_t size = sizeof(StepTraceHeader) + records * sizeof(StepTraceRecord);
+
+  if(ftruncate(fd, size) != 0) {
+    LOGERROR("Unable to grow the step trace: " << strerror(errno) << std::endl);
+    return false;
+  }
+
+  uint8_t* newMem = (uint8_t*)mmap(0, size, PROT_WRITE | PROT_READ, MAP_SHARED, fd, 0);
+  if(newMem == MAP_FAILED) {
+    LOGERROR("Unable to map the step trace: " << strerror(errno) << std::endl);
+    return false;
+  }
+
+  if(mem)
+    munmap(mem, sizeof(StepTraceHeader) + capacity * sizeof(StepTraceRecord));
+
+  mem = newMem;
+  capacity = records;
+  return true;
+}
+
+bool StepTrace::open(const std::string& filename) {
+  close();
+
+  fd = ::open(filename.c_str(), O_RDWR | O_CREAT | O_TRUNC, 0644);
+  if(fd < 0) {
+    LOGERROR("Unable to open the step trace " << filename << ": " << strerror(errno) << std::endl);
+    return false;
+  }
+
+  if(!map(STEP_TRACE_GROW_RECORDS)) {
+    ::close(fd);
+    fd = -1;
+    return false;
+  }
+
+  StepTraceHeader* header = (StepTraceHeader*)mem;
+  memcpy(header->magic, STEP_TRACE_MAGIC, sizeof(header->magic));
+  header->count = 0;
+  return true;
+}
+
+void StepTrace::close() {
+  if(!mem)
+    return;
+
+  uint64_t count = getCount();
+  munmap(mem, sizeof(StepTraceHeader) + capacity * sizeof(StepTraceRecord));
+  mem = NULL;
+  capacity = 0;
+
+  // Drop the unused records
+  if(ftruncate(fd, sizeof(StepTraceHeader) + count * sizeof(StepTraceRecord)) != 0)
+    LOGERROR("Unable to truncate the step trace: " << strerror(errno) << std::endl);
+  ::close(fd);
+  fd = -1;
+}
+
+void StepTrace::record(uint64_t tick, uint8_t axis, bool direction) {
+  if(!mem)
+    return;
+
+  StepTraceHeader* header = (StepTraceHeader*)mem;
+  if(header->count == capacity && !map(capacity + STEP_TRACE_GROW_RECORDS)) {
+    close();
+    return;
+  }
+
+  header = (StepTraceHeader*)mem;
+  StepTraceRecord* rec = (StepTraceRecord*)(mem + sizeof(StepTraceHeader)) + header->count;
+  rec->tick = tick;
+  rec->axis = axis;
+  rec->direction = direction;
+  memset(rec->reserved, 0, sizeof(rec->reserved));
+  header->count++;
+}
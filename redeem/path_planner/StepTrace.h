@@ -0,0 +1,79 @@
+/*
+ This file is part of Redeem - 3D Printer control software
+
+ License: GNU GPLv3 http://www.gnu.org/copyleft/gpl.html
+
+ Redeem is free software: you can redistribute it and/or modify
+ it under the terms of the GNU General Public License as published by
+ the Free Software Foundation, either version 3 of the License, or
+ (at your option) any later version.
+
+ Redeem is distributed in the hope that it will be useful,
+ but WITHOUT ANY WARRANTY; without even the implied warranty of
+ MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+ GNU General Public License for more details.
+
+ You should have received a copy of the GNU General Public License
+ along with Redeem.  If not, see <http://www.gnu.org/licenses/>.
+
+ */
+
+#ifndef __PathPlanner__StepTrace__
+#define __PathPlanner__StepTrace__
+
+#include <stdint.h>
+#include <stddef.h>
+#include <string>
+
+#define STEP_TRACE_MAGIC "RDMSTEP1"
+
+// Records allocated at once when the file grows
+#define STEP_TRACE_GROW_RECORDS (1 << 20)
+
+typedef struct StepTraceHeader {
+	char        magic[8];            //STEP_TRACE_MAGIC
+	uint64_t    count;               //Number of records written so far
+} StepTraceHeader;
+
+typedef struct StepTraceRecord {
+	uint64_t    tick;                //PRU cycles since the simulation started
+	uint8_t     axis;                //Axis index, 0 for X
+	uint8_t     direction;           //1 for a step in the positive direction
+	uint8_t     reserved[6];
+} StepTraceRecord;
+
+static_assert(sizeof(StepTraceHeader)==16,"Invalid step trace header size");
+static_assert(sizeof(StepTraceRecord)==16,"Invalid step trace record size");
+
+/**
+ * Memory mapped file of the steps done by the simulated PRU.
+ *
+ * The header count is updated after every record so the file can be
+ * read while the simulation runs. It is truncated to the records
+ * written when closed.
+ */
+class StepTrace {
+ private:
+  int fd;
+  uint8_t* mem;
+  size_t capacity; /// Records the mapping can hold
+
+  bool map(size_t records);
+
+ public:
+  StepTrace();
+  virtual ~StepTrace();
+
+  bool open(const std::string& filename);
+  void close();
+
+  bool isOpen() { return mem != NULL; }
+
+  void record(uint64_t tick, uint8_t axis, bool direction);
+
+  uint64_t getCount() {
+    return mem ? ((StepTraceHeader*)mem)->count : 0;
+  }
+};
+
+#endif
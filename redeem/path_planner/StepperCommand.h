@@ -24,9 +24,17 @@
 #define PathPlanner_StepperCommand_h
 
 #include <stdint.h>
+#include <stddef.h>
 
 #define STEPPER_COMMAND_OPTION_SYNC_EVENT 1
 #define STEPPER_COMMAND_OPTION_SYNCWAIT_EVENT 3
+// Not a step: delay holds how many more times the next command is executed
+#define STEPPER_COMMAND_OPTION_REPEAT 4
+
+// Cycles the firmware spends on a command before its delay starts counting
+#define PRU_STEP_SETUP_CYCLES 559
+// Minimum cycles the firmware waits after a step
+#define PRU_STEP_HOLD_CYCLES 380
 
 typedef struct SteppersCommand {
 	uint8_t     step;                //Steppers are defined as 0b000HEZYX - A 1 for a stepper means we will do a step for this stepper
@@ -38,4 +46,70 @@ typedef struct SteppersCommand {
 
 static_assert(sizeof(SteppersCommand)==8,"Invalid stepper command size");
 
+inline bool isSameSteppersCommand(const SteppersCommand& a, const SteppersCommand& b) {
+	return a.step == b.step && a.direction == b.direction && a.cancellableMask == b.cancellableMask
+		&& a.options == b.options && a.delay == b.delay;
+}
+
+/**
+ * Run-length encode a command stream in place.
+ * A run of three or more identical commands becomes a STEPPER_COMMAND_OPTION_REPEAT
+ * command followed by a single copy of the command. Commands with other options
+ * are never merged. Returns the new number of commands.
+ */
+inline size_t compressSteppersCommands(SteppersCommand* commands, size_t count) {
+	size_t out = 0;
+	size_t i = 0;
+	while(i < count) {
+		SteppersCommand cmd = commands[i];
+		size_t run = 1;
+		while(i + run < count && isSameSteppersCommand(commands[i + run], cmd))
+			run++;
+		if(run > 2 && cmd.options == 0) {
+			SteppersCommand& repeat = commands[out++];
+			repeat.step = 0;
+			repeat.direction = cmd.direction;
+			repeat.cancellableMask = 0;
+			repeat.options = STEPPER_COMMAND_OPTION_REPEAT;
+			repeat.delay = (uint32_t)(run - 1);
+			commands[out++] = cmd;
+		}
+		else {
+			for(size_t j = 0; j < run; j++)
+				commands[out++] = cmd;
+		}
+		i += run;
+	}
+	return out;
+}
+
+/**
+ * PRU cycles firmware_runtime.p takes to execute a command once.
+ * The delay excludes the time to set up the step, and the delay loop takes 2 cycles.
+ */
+inline uint32_t steppersCommandCycles(const SteppersCommand& cmd) {
+	uint32_t delay = cmd.delay > PRU_STEP_SETUP_CYCLES ? cmd.delay - PRU_STEP_SETUP_CYCLES : 0;
+	if(delay < PRU_STEP_HOLD_CYCLES)
+		delay = PRU_STEP_HOLD_CYCLES;
+	return PRU_STEP_SETUP_CYCLES + (delay & ~1u);
+}
+
+/**
+ * PRU cycles firmware_runtime.p takes to execute a command stream, repetitions included.
+ * repeat holds the repetitions left from a repeat command at the end of the previous
+ * stream, and is set to those left at the end of this one.
+ */
+inline uint64_t steppersCommandsCycles(const SteppersCommand* commands, size_t count, uint32_t& repeat) {
+	uint64_t cycles = 0;
+	for(size_t i = 0; i < count; i++) {
+		if(commands[i].options & STEPPER_COMMAND_OPTION_REPEAT) {
+			repeat = commands[i].delay;
+			continue;
+		}
+		cycles += (uint64_t)steppersCommandCycles(commands[i]) * (repeat + 1);
+		repeat = 0;
+	}
+	return cycles;
+}
+
 #endif
@@ -3,6 +3,7 @@
 from distutils.core import setup, Extension
 
 import os
+import numpy as np
 from distutils.sysconfig import get_config_vars
 
 (opt,) = get_config_vars('OPT')
@@ -18,12 +19,16 @@ pathplanner = Extension('_PathPlannerNative',
                 'PathPlannerSetup.cpp',
                 'Preprocessor.cpp',
                 'Path.cpp', 
+                'RampTable.cpp',
+                'InputShaper.cpp',
                 'Delta.cpp',
                 'vector3.cpp',
                 'PruTimer.cpp',
+                'StepTrace.cpp',
                 'prussdrv.c',
                 'Logger.cpp'],  
     swig_opts=['-c++','-builtin'], 
+    include_dirs=[np.get_include()],
     extra_compile_args = [
         '-std=c++0x',
         '-g',
@@ -0,0 +1,93 @@
+/*
+ This file is part of Redeem - 3D Printer control software
+
+ License: GNU GPLv3 http://www.gnu.org/copyleft/gpl.html
+
+ Redeem is free software: you can redistribute it and/or modify
+ it under the terms of the GNU General Public License as published by
+ the Free Software Foundation, either version 3 of the License, or
+ (at your option) any later version.
+
+ Redeem is distributed in the hope that it will be useful,
+ but WITHOUT ANY WARRANTY; without even the implied warranty of
+ MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+ GNU General Public License for more details.
+
+ You should have received a copy of the GNU General Public License
+ along with Redeem.  If not, see <http://www.gnu.org/licenses/>.
+
+ Queues a circle with queueArc, planned as one batch of more segments than
+ PLANNER_REPLAN_WINDOW, and the same segments with one queueMove each, on
+ the simulated PRU. The batch has to be planned as well as the single
+ moves, so both have to take the same time.
+
+ Build and run from the path_planner directory:
+   g++ -std=c++0x -O2 -pthread -DNDEBUG -I. $(python3-config --includes) tests/arc_planning_test.cpp PathPlanner.cpp PathPlannerSetup.cpp Preprocessor.cpp Path.cpp RampTable.cpp InputShaper.cpp Delta.cpp vector3.cpp PruTimer.cpp StepTrace.cpp prussdrv.c Logger.cpp $(python3-config --ldflags --embed) -o arc_planning_test
+   ./arc_planning_test
+ */
+
+#include <Python.h>
+#include <stdio.h>
+#include <cmath>
+#include "PathPlanner.h"
+
+#define RADIUS 0.05
+#define SEGMENT_LENGTH 0.002
+#define SPEED 0.1
+#define ACCELERATION 3.0
+
+static int failures = 0;
+
+#define CHECK(cond) do { if(!(cond)) { printf("FAILED: %s (line %d)\n", #cond, __LINE__); failures++; } } while(0)
+
+static void setup(PathPlanner& planner) {
+  planner.initSimulatedPRU("", 0);
+  planner.setAxisStepsPerMeter(std::vector<FLOAT_T>(NUM_AXES, 80000.0));
+  planner.setAcceleration(std::vector<FLOAT_T>(NUM_AXES, ACCELERATION));
+  planner.setMaxSpeeds(std::vector<FLOAT_T>(NUM_AXES, 1.0));
+  planner.setMinSpeeds(std::vector<FLOAT_T>(NUM_AXES, 0.005));
+  planner.setJerks(std::vector<FLOAT_T>(NUM_AXES, 0.01));
+  planner.setBedCompensationMatrix({1,0,0,0,1,0,0,0,1});
+  planner.setMaxPathLength(1);
+  planner.setArcSegmentation(0, SEGMENT_LENGTH);
+  planner.setAxisConfig(0);
+  planner.setState(std::vector<FLOAT_T>(NUM_AXES, 0.0));
+  planner.runThread();
+}
+
+int main() {
+  Py_Initialize();
+  int segments = (int)ceil(2*M_PI*RADIUS/SEGMENT_LENGTH);
+  CHECK(segments > PLANNER_REPLAN_WINDOW);
+
+  // A full circle around (RADIUS, 0)
+  PathPlanner arc(1024);
+  setup(arc);
+  arc.queueArc(0x03, std::vector<FLOAT_T>(NUM_AXES, 0.0), RADIUS, 0, false,
+	       SPEED, ACCELERATION, MOVE_ABSOLUTE, 0, MOVE_FLAG_OPTIMIZE, 3);
+  arc.waitUntilFinished();
+  double arcTime = arc.getSimulatedTime();
+  CHECK(arc.getSimulatedPosition(0) == 0 && arc.getSimulatedPosition(1) == 0);
+  arc.stopThread(true);
+
+  // The same segments one by one
+  PathPlanner moves(1024);
+  setup(moves);
+  std::vector<FLOAT_T> start(NUM_AXES, 0.0), end(NUM_AXES, 0.0);
+  for(int s = 1; s <= segments; s++) {
+    FLOAT_T angle = M_PI + 2*M_PI*s/segments;
+    end[0] = s == segments ? 0 : RADIUS + RADIUS*cos(angle);
+    end[1] = s == segments ? 0 : RADIUS*sin(angle);
+    moves.queueMove(start, end, SPEED, ACCELERATION, false, true, false, false, false, 3, true);
+    start = end;
+  }
+  moves.waitUntilFinished();
+  double movesTime = moves.getSimulatedTime();
+  moves.stopThread(true);
+
+  printf("%d segments, arc %f s, moves %f s\n", segments, arcTime, movesTime);
+  CHECK(fabs(arcTime - movesTime) < 0.01*movesTime);
+
+  printf("%s\n", failures ? "FAILED" : "OK");
+  return failures ? 1 : 0;
+}
@@ -0,0 +1,342 @@
+/*
+ This file is part of Redeem - 3D Printer control software
+
+ License: GNU GPLv3 http://www.gnu.org/copyleft/gpl.html
+
+ Redeem is free software: you can redistribute it and/or modify
+ it under the terms of the GNU General Public License as published by
+ the Free Software Foundation, either version 3 of the License, or
+ (at your option) any later version.
+
+ Redeem is distributed in the hope that it will be useful,
+ but WITHOUT ANY WARRANTY; without even the implied warranty of
+ MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+ GNU General Public License for more details.
+
+ You should have received a copy of the GNU General Public License
+ along with Redeem.  If not, see <http://www.gnu.org/licenses/>.
+
+ Generates the step commands of a few moves in the XY plane for each axis
+ config, the way PathPlanner::run does, sends them through the input shaper
+ and runs the step stream it makes through a spring-mass model of the
+ toolhead, one resonance for X and one for Y. Checks that the motors end
+ where they should and that the toolhead rings less after the moves with
+ each shaper than without.
+
+ Build and run from the path_planner directory:
+   g++ -std=c++0x -O2 -I. tests/input_shaper_test.cpp InputShaper.cpp Delta.cpp vector3.cpp Logger.cpp -o input_shaper_test
+   ./input_shaper_test
+ */
+
+#include <stdio.h>
+#include <cmath>
+#include <vector>
+#include "InputShaper.h"
+#include "Delta.h"
+
+#define AXIS_CONFIG_XY 0
+#define AXIS_CONFIG_H_BELT 1
+#define AXIS_CONFIG_CORE_XY 2
+#define AXIS_CONFIG_DELTA 3
+
+#define STEPS_PER_M 80000.0
+#define SPEED 0.3
+#define ACCELERATION 10.0
+#define SEGMENT_LENGTH 0.002
+#define DELTA_Z 0.05
+
+// Resonances of the toolhead
+#define FREQUENCY_X 40.0
+#define FREQUENCY_Y 52.0
+#define DAMPING 0.1
+
+// Largest ringing left with a shaper, relative to none. What's left is about the
+// size of a step, which is larger in XY on a delta.
+#define MAX_RINGING_RATIO 0.15
+
+static int failures = 0;
+
+#define CHECK(cond) do { if(!(cond)) { printf("FAILED: %s (line %d)\n", #cond, __LINE__); failures++; } } while(0)
+
+static Delta delta;
+
+// Motor positions in steps of an XY position
+static void motorPositions(int config, FLOAT_T x, FLOAT_T y, FLOAT_T* motors) {
+  switch(config){
+  case AXIS_CONFIG_H_BELT:
+    motors[0] = (-0.5*x + 0.5*y)*STEPS_PER_M;
+    motors[1] = (-0.5*x - 0.5*y)*STEPS_PER_M;
+    motors[2] = 0;
+    break;
+  case AXIS_CONFIG_CORE_XY:
+    motors[0] = (x + y)*STEPS_PER_M;
+    motors[1] = (x - y)*STEPS_PER_M;
+    motors[2] = 0;
+    break;
+  case AXIS_CONFIG_DELTA:
+    delta.inverse_kinematics(x, y, DELTA_Z, &motors[0], &motors[1], &motors[2]);
+    for(int i=0; i<3; i++)
+      motors[i] *= STEPS_PER_M;
+    break;
+  default:
+    motors[0] = x*STEPS_PER_M;
+    motors[1] = y*STEPS_PER_M;
+    motors[2] = 0;
+  }
+}
+
+// XY position of motor positions in steps
+static void toolheadPosition(int config, const long long* motors, FLOAT_T* x, FLOAT_T* y) {
+  FLOAT_T a = motors[0]/STEPS_PER_M, b = motors[1]/STEPS_PER_M, c = motors[2]/STEPS_PER_M;
+  switch(config){
+  case AXIS_CONFIG_H_BELT:
+    *x = -a - b;
+    *y = a - b;
+    break;
+  case AXIS_CONFIG_CORE_XY:
+    *x = 0.5*(a + b);
+    *y = 0.5*(a - b);
+    break;
+  case AXIS_CONFIG_DELTA: {
+    FLOAT_T z;
+    delta.forward_kinematics(a, b, c, x, y, &z);
+    break;
+  }
+  default:
+    *x = a;
+    *y = b;
+  }
+}
+
+// Time to cover distance along a trapezoid from and to a stop
+static FLOAT_T trapezoidTime(FLOAT_T length, FLOAT_T distance) {
+  FLOAT_T speed = std::min<FLOAT_T>(SPEED, sqrt(ACCELERATION*length));
+  FLOAT_T ramp = speed*speed/(2*ACCELERATION);
+  FLOAT_T rampTime = speed/ACCELERATION;
+  if(distance < ramp)
+    return sqrt(2*distance/ACCELERATION);
+  if(distance <= length - ramp)
+    return rampTime + (distance - ramp)/speed;
+  return 2*rampTime + (length - 2*ramp)/speed - sqrt(2*(length - distance)/ACCELERATION);
+}
+
+struct Segment {
+  std::vector<SteppersCommand> commands;
+  std::vector<uint64_t> ticks;
+  FLOAT_T shapedSteps[INPUT_SHAPER_AXES*NUM_AXES];
+};
+
+/**
+   The step commands of stop to stop moves between points, split in segments like the
+   planner does for deltas. Each command is a step of the primary motor of its segment.
+   Returns the end of the last move in PRU cycles.
+*/
+static uint64_t makeMoves(int config, const std::vector<FLOAT_T>& points, std::vector<Segment>& segments) {
+  uint64_t moveStart = 0;
+  FLOAT_T motors[3];
+  motorPositions(config, points[0], points[1], motors);
+  long long position[3];
+  for(int i=0; i<3; i++)
+    position[i] = llround(motors[i]);
+
+  for(size_t p=2; p+1<points.size(); p+=2){
+    FLOAT_T x0 = points[p-2], y0 = points[p-1];
+    FLOAT_T dx = points[p] - x0, dy = points[p+1] - y0;
+    FLOAT_T length = sqrt(dx*dx + dy*dy);
+    int pieces = (int)ceil(length/SEGMENT_LENGTH);
+    size_t first = segments.size();
+
+    for(int s=0; s<pieces; s++){
+      FLOAT_T from = length*s/pieces, to = length*(s + 1)/pieces;
+      FLOAT_T sx = x0 + dx*from/length, sy = y0 + dy*from/length;
+      FLOAT_T ex = x0 + dx*to/length, ey = y0 + dy*to/length;
+      motorPositions(config, ex, ey, motors);
+      long long deltas[3];
+      long long primary = 0;
+      for(int i=0; i<3; i++){
+	deltas[i] = llround(motors[i]) - position[i];
+	position[i] += deltas[i];
+	primary = std::max(primary, std::abs(deltas[i]));
+      }
+      if(!primary)
+	continue;
+
+      Segment segment;
+      // The steps due to X and Y, as PathPlanner::computeShapedSteps
+      for(int i=0; i<INPUT_SHAPER_AXES*NUM_AXES; i++)
+	segment.shapedSteps[i] = 0;
+      FLOAT_T mx = 0.5*(sx + ex), my = 0.5*(sy + ey);
+      FLOAT_T a[3], b[3];
+      motorPositions(config, mx - 0.5*(ex - sx), my, a);
+      motorPositions(config, mx + 0.5*(ex - sx), my, b);
+      for(int i=0; i<3; i++)
+	segment.shapedSteps[i] = b[i] - a[i];
+      motorPositions(config, mx, my - 0.5*(ey - sy), a);
+      motorPositions(config, mx, my + 0.5*(ey - sy), b);
+      for(int i=0; i<3; i++)
+	segment.shapedSteps[NUM_AXES + i] = b[i] - a[i];
+
+      // Bresenham along the primary motor
+      long long done[3] = { 0, 0, 0 };
+      for(long long n=0; n<primary; n++){
+	SteppersCommand cmd = { 0, 0, 0, 0, 0 };
+	for(int i=0; i<3; i++){
+	  long long count = ((n + 1)*std::abs(deltas[i]) + primary/2)/primary;
+	  if(count > done[i]){
+	    cmd.step |= 1 << i;
+	    done[i] = count;
+	  }
+	  if(deltas[i] > 0)
+	    cmd.direction |= 1 << i;
+	}
+	FLOAT_T distance = from + (to - from)*(n + 0.5)/primary;
+	segment.commands.push_back(cmd);
+	segment.ticks.push_back(moveStart + llround(trapezoidTime(length, distance)*F_CPU));
+      }
+      segments.push_back(segment);
+    }
+    moveStart += llround(trapezoidTime(length, length)*F_CPU);
+
+    // A command waits until the next one
+    for(size_t s=first; s<segments.size(); s++){
+      Segment& segment = segments[s];
+      for(size_t n=0; n<segment.commands.size(); n++){
+	uint64_t next;
+	if(n + 1 < segment.commands.size())
+	  next = segment.ticks[n + 1];
+	else if(s + 1 < segments.size())
+	  next = segments[s + 1].ticks[0];
+	else
+	  next = moveStart;
+	segment.commands[n].delay = next - segment.ticks[n];
+      }
+    }
+  }
+  return moveStart;
+}
+
+/**
+   Runs the steps through the spring-mass model of the toolhead and returns its largest
+   distance in m from where the steps put it after the last step, for X and Y.
+*/
+static void ringing(int config, const std::vector<SteppersCommand>& commands, FLOAT_T* ringingX, FLOAT_T* ringingY,
+		    long long* position) {
+  const FLOAT_T dt = 1e-5;
+  const FLOAT_T omega[2] = { 2*M_PI*FREQUENCY_X, 2*M_PI*FREQUENCY_Y };
+  FLOAT_T head[2], speed[2] = { 0, 0 };
+  for(int i=0; i<3; i++)
+    position[i] = 0;
+
+  // The toolhead starts at rest where the motors are
+  long long motors[3];
+  FLOAT_T origin[3];
+  motorPositions(config, 0, 0, origin);
+  for(int i=0; i<3; i++)
+    motors[i] = llround(origin[i]);
+  toolheadPosition(config, motors, &head[0], &head[1]);
+
+  uint64_t last = 0;
+  for(const SteppersCommand& cmd : commands)
+    last += cmd.delay;
+  FLOAT_T end = (FLOAT_T)last/F_CPU;
+
+  size_t next = 0;
+  uint64_t tick = 0;
+  FLOAT_T ring[2] = { 0, 0 };
+  for(FLOAT_T t=0; t<end + 0.3; t+=dt){
+    while(next < commands.size() && tick <= t*F_CPU){
+      for(int i=0; i<3; i++){
+	if(commands[next].step & (1 << i)){
+	  int step = (commands[next].direction & (1 << i)) ? 1 : -1;
+	  motors[i] += step;
+	  position[i] += step;
+	}
+      }
+      tick += commands[next].delay;
+      next++;
+    }
+    FLOAT_T target[2];
+    toolheadPosition(config, motors, &target[0], &target[1]);
+    for(int k=0; k<2; k++){
+      speed[k] += (-omega[k]*omega[k]*(head[k] - target[k]) - 2*DAMPING*omega[k]*speed[k])*dt;
+      head[k] += speed[k]*dt;
+      if(t > end + 0.005)
+	ring[k] = std::max(ring[k], std::abs(head[k] - target[k]));
+    }
+  }
+  *ringingX = ring[0];
+  *ringingY = ring[1];
+}
+
+int main() {
+  const char* configs[] = { "cartesian", "H-belt", "CoreXY", "delta" };
+  const char* shapers[] = { "none", "ZV", "ZVD", "MZV" };
+
+  delta.setMainDimensions(0.0, 0.215, 0.105);
+  delta.recalculate();
+
+  // Two moves along the axes and a diagonal back, in m
+  std::vector<FLOAT_T> points = { 0, 0, 0.04, 0, 0.04, 0.03, 0, 0 };
+
+  for(int config=0; config<4; config++){
+    std::vector<Segment> segments;
+    uint64_t duration = makeMoves(config, points, segments);
+    FLOAT_T noneX = 0, noneY = 0;
+
+    for(int type=INPUT_SHAPER_NONE; type<=INPUT_SHAPER_MZV; type++){
+      InputShaper shaper;
+      shaper.configure(0, type, FREQUENCY_X, DAMPING);
+      shaper.configure(1, type, FREQUENCY_Y, DAMPING);
+
+      std::vector<SteppersCommand> commands, shaped;
+      uint64_t shapedDuration = 0;
+      for(size_t s=0; s<segments.size(); s++){
+	const Segment& segment = segments[s];
+	if(type == INPUT_SHAPER_NONE){
+	  commands.insert(commands.end(), segment.commands.begin(), segment.commands.end());
+	  continue;
+	}
+	uint64_t ticks = shaper.shape(segment.commands.data(), segment.commands.size(), segment.shapedSteps,
+				      s + 1 == segments.size(), shaped);
+	uint64_t sum = 0;
+	for(const SteppersCommand& cmd : shaped)
+	  sum += cmd.delay;
+	CHECK(sum == ticks);
+	shapedDuration += ticks;
+	commands.insert(commands.end(), shaped.begin(), shaped.end());
+      }
+      if(type != INPUT_SHAPER_NONE){
+	CHECK(shaper.isIdle());
+	// As long as the moves and the smoothing, about half a period
+	CHECK(shapedDuration >= duration);
+	CHECK(shapedDuration < duration + F_CPU/FREQUENCY_X);
+      }
+
+      FLOAT_T ringX, ringY;
+      long long position[3];
+      ringing(config, commands, &ringX, &ringY, position);
+      for(int i=0; i<3; i++)
+	CHECK(position[i] == 0);
+
+      if(type == INPUT_SHAPER_NONE){
+	noneX = ringX;
+	noneY = ringY;
+	CHECK(noneX > 0.00002 && noneY > 0.00002);
+      }
+      else{
+	CHECK(ringX < MAX_RINGING_RATIO*noneX);
+	CHECK(ringY < MAX_RINGING_RATIO*noneY);
+      }
+      printf("%-9s %-4s ringing X %7.2f um (%5.1f%%), Y %7.2f um (%5.1f%%), %zu commands\n",
+	     configs[config], shapers[type], ringX*1e6, 100*ringX/noneX, ringY*1e6, 100*ringY/noneY,
+	     commands.size());
+    }
+  }
+
+  if(failures) {
+    printf("%d checks failed\n", failures);
+    return 1;
+  }
+  printf("OK\n");
+  return 0;
+}
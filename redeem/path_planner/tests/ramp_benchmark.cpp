@@ -0,0 +1,178 @@
+/*
+ This file is part of Redeem - 3D Printer control software
+
+ License: GNU GPLv3 http://www.gnu.org/copyleft/gpl.html
+
+ Redeem is free software: you can redistribute it and/or modify
+ it under the terms of the GNU General Public License as published by
+ the Free Software Foundation, either version 3 of the License, or
+ (at your option) any later version.
+
+ Redeem is distributed in the hope that it will be useful,
+ but WITHOUT ANY WARRANTY; without even the implied warranty of
+ MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+ GNU General Public License for more details.
+
+ You should have received a copy of the GNU General Public License
+ along with Redeem.  If not, see <http://www.gnu.org/licenses/>.
+
+ Benchmark of the step interval generation in PathPlanner::run, comparing
+ the per step computation it used to do with the cached ramp tables.
+ The intervals of both are checked to be identical.
+
+ Build and run from the path_planner directory:
+   g++ -std=c++0x -O2 -I. tests/ramp_benchmark.cpp RampTable.cpp Path.cpp Logger.cpp -o ramp_benchmark
+   ./ramp_benchmark
+ */
+
+#include <algorithm>
+#include <chrono>
+#include <cmath>
+#include <cstdio>
+#include <cstdlib>
+#include <vector>
+#include "RampTable.h"
+
+struct Trapezoid {
+  FLOAT_T vStart;
+  FLOAT_T vMax;
+  FLOAT_T vEnd;
+  unsigned int accelSteps;
+  unsigned int decelSteps;
+  unsigned int steps;
+  unsigned int fullInterval;
+  unsigned long long accel;
+};
+
+// The interval computation PathPlanner::run did for every step
+static void legacyIntervals(const Trapezoid& t, uint32_t* delays) {
+  unsigned int vMaxReached = t.vStart;
+  unsigned int timer_accel = 0;
+  unsigned int timer_decel = 0;
+  unsigned int interval = 0;
+
+  for(unsigned int stepNumber=0; stepNumber<t.steps; stepNumber++){
+    if (stepNumber <= t.accelSteps){
+      vMaxReached = ComputeV(timer_accel, t.accel) + t.vStart;
+      if(vMaxReached>t.vMax)
+	vMaxReached = t.vMax;
+      unsigned long v = vMaxReached;
+      if (v > 0)
+	interval = F_CPU/(v);
+      timer_accel+=interval;
+    }
+    else if (t.steps - stepNumber <= t.decelSteps){
+      unsigned long v = ComputeV(timer_decel, t.accel);
+      if (v > vMaxReached)
+	v = t.vEnd;
+      else{
+	v=vMaxReached - v;
+	if (v < t.vEnd)
+	  v = t.vEnd;
+      }
+      if (v > 0)
+	interval = F_CPU/(v);
+      timer_decel += interval;
+    }
+    else{
+      interval = t.fullInterval;
+    }
+    delays[stepNumber] = interval;
+  }
+}
+
+// The same as done by PathPlanner::run now
+static void tableIntervals(RampTable& table, const Trapezoid& t, uint32_t* delays) {
+  unsigned int vMaxReached;
+  unsigned int interval = 0;
+  unsigned int accelCount = std::min(t.accelSteps + 1, t.steps);
+  unsigned int decelStart = std::max(accelCount, t.steps >= t.decelSteps ? t.steps - t.decelSteps : 0);
+  unsigned int stepNumber = 0;
+
+  const uint32_t* ramp = table.accelerate(t.vStart, t.vMax, t.accel, accelCount, vMaxReached);
+  for(; stepNumber < accelCount; stepNumber++){
+    if(ramp[stepNumber])
+      interval = ramp[stepNumber];
+    delays[stepNumber] = interval;
+  }
+
+  interval = t.fullInterval;
+  for(; stepNumber < decelStart; stepNumber++)
+    delays[stepNumber] = interval;
+
+  ramp = table.decelerate(vMaxReached, t.vEnd, t.accel, t.steps - decelStart);
+  for(unsigned int i = 0; stepNumber < t.steps; stepNumber++, i++){
+    if(ramp[i])
+      interval = ramp[i];
+    delays[stepNumber] = interval;
+  }
+}
+
+static Trapezoid makeTrapezoid(FLOAT_T vStart, FLOAT_T vMax, FLOAT_T vEnd, FLOAT_T accel, unsigned int steps) {
+  Trapezoid t;
+  t.vStart = vStart;
+  t.vMax = vMax;
+  t.vEnd = vEnd;
+  t.accel = 262144.0 * accel / F_CPU;
+  t.accelSteps = (vMax*vMax - vStart*vStart) / (2*accel);
+  t.decelSteps = (vMax*vMax - vEnd*vEnd) / (2*accel);
+  t.steps = std::max(steps, t.accelSteps + t.decelSteps);
+  t.fullInterval = F_CPU / vMax;
+  return t;
+}
+
+int main(int argc, const char * argv[])
+{
+  // Steps/s and steps/s^2 of a 80 steps/mm axis
+  const FLOAT_T accel = 3000 * 80;
+  std::vector<Trapezoid> moves;
+
+  // Infill: the same few trapezoids over and over
+  for(int i=0; i<2000; i++) {
+    moves.push_back(makeTrapezoid(800, 60*80, 800, accel, 8000));
+    moves.push_back(makeTrapezoid(800, 20*80, 800, accel, 200));
+  }
+  // Perimeters: a different trapezoid for every move
+  srand(1);
+  for(int i=0; i<2000; i++) {
+    FLOAT_T vMax = (20 + rand() % 400 / 10.0) * 80;
+    moves.push_back(makeTrapezoid(800 + rand() % 400, vMax, 800 + rand() % 400, accel, 500 + rand() % 4000));
+  }
+
+  unsigned long long totalSteps = 0;
+  unsigned int maxSteps = 0;
+  for(size_t i=0; i<moves.size(); i++) {
+    totalSteps += moves[i].steps;
+    maxSteps = std::max(maxSteps, moves[i].steps);
+  }
+  std::vector<uint32_t> expected(maxSteps), delays(maxSteps);
+
+  RampTable table;
+  for(size_t i=0; i<moves.size(); i++) {
+    legacyIntervals(moves[i], expected.data());
+    tableIntervals(table, moves[i], delays.data());
+    if(!std::equal(expected.begin(), expected.begin() + moves[i].steps, delays.begin())) {
+      printf("Move %u: intervals differ\n", (unsigned int)i);
+      return 1;
+    }
+  }
+
+  const int rounds = 5;
+  std::chrono::duration<double> legacy(0), cached(0);
+  for(int round=0; round<rounds; round++) {
+    auto start = std::chrono::steady_clock::now();
+    for(size_t i=0; i<moves.size(); i++)
+      legacyIntervals(moves[i], delays.data());
+    auto middle = std::chrono::steady_clock::now();
+    for(size_t i=0; i<moves.size(); i++)
+      tableIntervals(table, moves[i], delays.data());
+    auto end = std::chrono::steady_clock::now();
+    legacy += middle - start;
+    cached += end - middle;
+  }
+
+  printf("per step:     %12.0f steps/s\n", rounds * totalSteps / legacy.count());
+  printf("ramp tables:  %12.0f steps/s\n", rounds * totalSteps / cached.count());
+  printf("ramp table hits %llu, misses %llu\n", table.getHits(), table.getMisses());
+  return 0;
+}
@@ -0,0 +1,134 @@
+/*
+ This file is part of Redeem - 3D Printer control software
+
+ License: GNU GPLv3 http://www.gnu.org/copyleft/gpl.html
+
+ Redeem is free software: you can redistribute it and/or modify
+ it under the terms of the GNU General Public License as published by
+ the Free Software Foundation, either version 3 of the License, or
+ (at your option) any later version.
+
+ Redeem is distributed in the hope that it will be useful,
+ but WITHOUT ANY WARRANTY; without even the implied warranty of
+ MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+ GNU General Public License for more details.
+
+ You should have received a copy of the GNU General Public License
+ along with Redeem.  If not, see <http://www.gnu.org/licenses/>.
+
+ Plans X moves with S-curve accelerations, for long and short moves and
+ high and low jerks, with the start and end speeds PathPlanner gives them.
+ Checks that the acceleration of the S-curves never goes above the
+ configured one, that they cover the distance the move gives them and that
+ a ramp from standstill to full speed keeps to the jerk as well.
+
+ Build and run from the path_planner directory:
+   g++ -std=c++0x -O2 -I. tests/s_curve_test.cpp Path.cpp Logger.cpp -o s_curve_test
+   ./s_curve_test
+ */
+
+#include <stdio.h>
+#include <cmath>
+#include <vector>
+#include "Path.h"
+
+#define STEPS_PER_M 80000.0
+#define ACCELERATION 3.0
+#define SPEED 0.2
+#define SAMPLES 10000
+
+static int failures = 0;
+
+#define CHECK(cond) do { if(!(cond)) { printf("FAILED: %s (line %d)\n", #cond, __LINE__); failures++; } } while(0)
+
+/**
+   Samples the profile, checks that its acceleration stays at or below the peak
+   and returns the steps it covers. maxJerk is set to the highest jerk seen.
+*/
+static FLOAT_T checkProfile(const SCurveProfile& profile, FLOAT_T peak, FLOAT_T& maxJerk) {
+  FLOAT_T dt = profile.duration / SAMPLES;
+  FLOAT_T steps = 0, lastAccel = 0;
+  maxJerk = 0;
+  if (profile.duration == 0)
+    return 0;
+  for (int i = 0; i < SAMPLES; i++) {
+    FLOAT_T v0 = profile.speedAt(i * dt), v1 = profile.speedAt((i + 1) * dt);
+    FLOAT_T accel = std::fabs(v1 - v0) / dt;
+    CHECK(accel <= peak * 1.001);
+    if (i > 0)
+      maxJerk = std::max(maxJerk, std::fabs(accel - lastAccel) / dt);
+    lastAccel = accel;
+    steps += (v0 + v1) / 2 * dt;
+  }
+  CHECK(profile.speedAt(profile.duration) == profile.vTo);
+  return steps;
+}
+
+/**
+   Checks the ramps of the path with the given start and end speeds, in m/s
+*/
+static void checkRamps(Path& path, FLOAT_T startSpeed, FLOAT_T endSpeed) {
+  path.setStartSpeed(startSpeed);
+  path.setEndSpeed(endSpeed);
+  path.fixStartAndEndSpeed();
+  path.invalidateStepperPathParameters();
+  path.updateStepperPathParameters();
+  StepperPathParameters p = path.getStepperPathParameters();
+
+  CHECK(p.peakAcceleration == (FLOAT_T)(unsigned int)(ACCELERATION * STEPS_PER_M));
+  CHECK(p.acceleration <= p.peakAcceleration);
+
+  FLOAT_T maxJerk;
+  SCurveProfile profile;
+  profile.plan(p.vStart, p.vPeak, p.acceleration, p.peakAcceleration, p.jerk);
+  FLOAT_T accelSteps = checkProfile(profile, p.peakAcceleration, maxJerk);
+  CHECK(accelSteps <= p.accelSteps + 1);
+  profile.plan(p.vPeak, p.vEnd, p.acceleration, p.peakAcceleration, p.jerk);
+  FLOAT_T decelSteps = checkProfile(profile, p.peakAcceleration, maxJerk);
+  CHECK(decelSteps <= p.decelSteps + 1);
+
+  // From standstill to full speed the S-curve keeps to the jerk
+  profile.plan(0, p.vMax, p.acceleration, p.peakAcceleration, p.jerk);
+  checkProfile(profile, p.peakAcceleration, maxJerk);
+  CHECK(maxJerk <= p.jerk * 1.01);
+
+  printf("  %.3f to %.3f m/s: acceleration %.2f of %.2f m/s^2, %.0f + %.0f steps of ramps\n",
+	 startSpeed, endSpeed, p.acceleration / STEPS_PER_M, p.peakAcceleration / STEPS_PER_M,
+	 accelSteps, decelSteps);
+}
+
+static void checkMove(FLOAT_T length, FLOAT_T jerk) {
+  std::vector<FLOAT_T> start(NUM_AXES, 0), end(NUM_AXES, 0), diff(NUM_AXES, 0);
+  end[X_AXIS] = round(length * STEPS_PER_M);
+  diff[X_AXIS] = length;
+  std::vector<FLOAT_T> minSpeeds(NUM_AXES, 0.005), maxSpeeds(NUM_AXES, 1.0);
+  std::vector<FLOAT_T> accels(NUM_AXES, ACCELERATION * STEPS_PER_M);
+  std::vector<FLOAT_T> jerks(NUM_AXES, jerk * STEPS_PER_M);
+
+  Path path;
+  path.initialize(start, end, length, SPEED, ACCELERATION, false);
+  path.calculate(diff, minSpeeds, maxSpeeds, accels, jerks);
+  printf("%.3f m, jerk %g m/s^3:\n", length, jerk);
+
+  if (path.willMoveReachFullSpeed()) {
+    // In a straight run of these moves forwardPlanner lets the first one
+    // accelerate to full speed and the last one decelerate from it
+    checkRamps(path, path.getMinSpeed(), path.getFullSpeed());
+    checkRamps(path, path.getFullSpeed(), path.getMinSpeed());
+  }
+  else {
+    // A move on its own starts and stops at the safe speed
+    checkRamps(path, path.getMinSpeed(), path.getMinSpeed());
+  }
+}
+
+int main() {
+  FLOAT_T lengths[] = { 0.1, 0.01, 0.001 };
+  FLOAT_T jerks[] = { 1000, 50, 5 };
+  for (FLOAT_T length : lengths)
+    for (FLOAT_T jerk : jerks)
+      checkMove(length, jerk);
+
+  printf("%s\n", failures ? "FAILED" : "OK");
+  return failures ? 1 : 0;
+}
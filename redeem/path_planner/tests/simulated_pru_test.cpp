@@ -0,0 +1,114 @@
+/*
+ This file is part of Redeem - 3D Printer control software
+
+ License: GNU GPLv3 http://www.gnu.org/copyleft/gpl.html
+
+ Redeem is free software: you can redistribute it and/or modify
+ it under the terms of the GNU General Public License as published by
+ the Free Software Foundation, either version 3 of the License, or
+ (at your option) any later version.
+
+ Redeem is distributed in the hope that it will be useful,
+ but WITHOUT ANY WARRANTY; without even the implied warranty of
+ MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+ GNU General Public License for more details.
+
+ You should have received a copy of the GNU General Public License
+ along with Redeem.  If not, see <http://www.gnu.org/licenses/>.
+
+ Runs blocks of step commands through the simulated PRU, enough of them
+ for the DDR to wrap around, and checks the positions, the virtual clock,
+ the step trace and the time accounted for the blocks against what the
+ commands describe.
+
+ Build and run from the path_planner directory:
+   g++ -std=c++0x -O2 -pthread -I. tests/simulated_pru_test.cpp PruTimer.cpp StepTrace.cpp prussdrv.c Logger.cpp -o simulated_pru_test
+   ./simulated_pru_test
+ */
+
+#include <stdio.h>
+#include <fcntl.h>
+#include <unistd.h>
+#include <sys/mman.h>
+#include <sys/stat.h>
+#include <vector>
+#include "PruTimer.h"
+#include "StepperCommand.h"
+
+#define TRACE_FILE "/tmp/simulated_pru_test.trace"
+
+static int failures = 0;
+
+#define CHECK(cond) do { if(!(cond)) { printf("FAILED: %s (line %d)\n", #cond, __LINE__); failures++; } } while(0)
+
+int main() {
+  PruTimer pru;
+  CHECK(pru.initSimulatedPRU(TRACE_FILE, 0));
+  pru.runThread();
+
+  // X forward and Y backward every step, Z forward on every fourth one
+  const int steps = 4000;
+  const int blocks = 50;
+  const uint32_t delay = 20001; // The firmware waits in loops of 2 cycles after the step setup
+  std::vector<SteppersCommand> commands(steps);
+  for(int i = 0; i < steps; i++) {
+    commands[i].step = (i % 4 == 3) ? 0x07 : 0x03;
+    commands[i].direction = 0x05;
+    commands[i].cancellableMask = 0;
+    commands[i].options = 0;
+    commands[i].delay = delay;
+  }
+  // One run long enough to be repeat encoded
+  for(int i = 0; i < 100; i++)
+    commands[i].step = 0x01;
+  commands[steps - 1].options = STEPPER_COMMAND_OPTION_SYNC_EVENT;
+
+  for(int b = 0; b < blocks; b++) {
+    std::vector<SteppersCommand> block(commands);
+    size_t nb = compressSteppersCommands(block.data(), block.size());
+    pru.push_block((uint8_t*)block.data(), nb * sizeof(SteppersCommand), sizeof(SteppersCommand), b);
+  }
+  pru.waitUntilFinished();
+
+  int syncs = 0;
+  while(pru.waitUntilSync())
+    syncs++;
+  CHECK(syncs == blocks);
+
+  long long x = 0, y = 0, z = 0;
+  for(int i = 0; i < steps; i++) {
+    x += (commands[i].step & 1) ? 1 : 0;
+    y -= (commands[i].step & 2) ? 1 : 0;
+    z += (commands[i].step & 4) ? 1 : 0;
+  }
+  CHECK(pru.getSimulatedPosition(0) == x * blocks);
+  CHECK(pru.getSimulatedPosition(1) == y * blocks);
+  CHECK(pru.getSimulatedPosition(2) == z * blocks);
+  CHECK(pru.getSimulatedStepCount() == (uint64_t)(x - y + z) * blocks);
+  CHECK(pru.getSimulatedTime() == (double)steps * blocks * delay / F_CPU);
+  // Blocks split at the end of the DDR are accounted for exactly as well
+  CHECK(pru.getConsumedTicks() == (uint64_t)steps * blocks * delay);
+  CHECK(pru.getTotalQueuedMovesTime() == 0);
+
+  pru.stopThread(true);
+
+  int fd = open(TRACE_FILE, O_RDONLY);
+  struct stat st;
+  CHECK(fd >= 0 && fstat(fd, &st) == 0);
+  uint8_t* mem = (uint8_t*)mmap(0, st.st_size, PROT_READ, MAP_SHARED, fd, 0);
+  StepTraceHeader* header = (StepTraceHeader*)mem;
+  StepTraceRecord* records = (StepTraceRecord*)(mem + sizeof(StepTraceHeader));
+  CHECK(header->count == (uint64_t)(x - y + z) * blocks);
+  CHECK((size_t)st.st_size == sizeof(StepTraceHeader) + header->count * sizeof(StepTraceRecord));
+
+  // The first steps are X only, one command apart
+  CHECK(records[0].axis == 0 && records[0].direction == 1 && records[0].tick == 0);
+  CHECK(records[1].axis == 0 && records[1].tick == delay);
+  CHECK(records[100].axis == 0 && records[101].axis == 1 && records[101].direction == 0);
+  munmap(mem, st.st_size);
+  close(fd);
+  unlink(TRACE_FILE);
+
+  printf("%s\n", failures ? "FAILED" : "OK");
+  return failures ? 1 : 0;
+}
@@ -0,0 +1,70 @@
+/*
+ This file is part of Redeem - 3D Printer control software
+
+ License: GNU GPLv3 http://www.gnu.org/copyleft/gpl.html
+
+ Redeem is free software: you can redistribute it and/or modify
+ it under the terms of the GNU General Public License as published by
+ the Free Software Foundation, either version 3 of the License, or
+ (at your option) any later version.
+
+ Redeem is distributed in the hope that it will be useful,
+ but WITHOUT ANY WARRANTY; without even the implied warranty of
+ MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+ GNU General Public License for more details.
+
+ You should have received a copy of the GNU General Public License
+ along with Redeem.  If not, see <http://www.gnu.org/licenses/>.
+
+ Queues moves with pauses longer than the moves in between on the
+ simulated PRU. The PRU runs dry in the pauses because no line is
+ pending, which is not an underrun.
+
+ Build and run from the path_planner directory:
+   g++ -std=c++0x -O2 -pthread -DNDEBUG -I. $(python3-config --includes) tests/underrun_test.cpp PathPlanner.cpp PathPlannerSetup.cpp Preprocessor.cpp Path.cpp RampTable.cpp InputShaper.cpp Delta.cpp vector3.cpp PruTimer.cpp StepTrace.cpp prussdrv.c Logger.cpp $(python3-config --ldflags --embed) -o underrun_test
+   ./underrun_test
+ */
+
+#include <Python.h>
+#include <stdio.h>
+#include <chrono>
+#include <thread>
+#include "PathPlanner.h"
+
+#define MOVES 3
+
+static int failures = 0;
+
+#define CHECK(cond) do { if(!(cond)) { printf("FAILED: %s (line %d)\n", #cond, __LINE__); failures++; } } while(0)
+
+int main() {
+  Py_Initialize();
+  PathPlanner planner(1024);
+  planner.initSimulatedPRU("", 0);
+  planner.setAxisStepsPerMeter(std::vector<FLOAT_T>(NUM_AXES, 80000.0));
+  planner.setAcceleration(std::vector<FLOAT_T>(NUM_AXES, 3.0));
+  planner.setMaxSpeeds(std::vector<FLOAT_T>(NUM_AXES, 1.0));
+  planner.setMinSpeeds(std::vector<FLOAT_T>(NUM_AXES, 0.005));
+  planner.setJerks(std::vector<FLOAT_T>(NUM_AXES, 0.01));
+  planner.setBedCompensationMatrix({1,0,0,0,1,0,0,0,1});
+  planner.setMaxPathLength(1);
+  planner.setAxisConfig(0);
+  planner.setState(std::vector<FLOAT_T>(NUM_AXES, 0.0));
+  planner.runThread();
+
+  std::vector<FLOAT_T> start(NUM_AXES, 0.0), end(NUM_AXES, 0.0);
+  for(int m = 0; m < MOVES; m++) {
+    end[0] = start[0] + 0.01;
+    planner.queueMove(start, end, 0.1, 3.0, false, true, false, false, false, 3, true);
+    start = end;
+    // Long enough for the move to be sent and run
+    std::this_thread::sleep_for(std::chrono::seconds(1));
+    CHECK(planner.getUnderrunCount() == 0);
+  }
+  planner.waitUntilFinished();
+  CHECK(planner.getSimulatedPosition(0) == 800 * MOVES);
+  planner.stopThread(true);
+
+  printf("%s\n", failures ? "FAILED" : "OK");
+  return failures ? 1 : 0;
+}
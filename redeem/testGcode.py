@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+"""
+Unit test suite for Gcode.py
+
+License: GNU GPL v3: http://www.gnu.org/copyleft/gpl.html
+
+ Redeem is free software: you can redistribute it and/or modify
+ it under the terms of the GNU General Public License as published by
+ the Free Software Foundation, either version 3 of the License, or
+ (at your option) any later version.
+
+ Redeem is distributed in the hope that it will be useful,
+ but WITHOUT ANY WARRANTY; without even the implied warranty of
+ MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+ GNU General Public License for more details.
+
+ You should have received a copy of the GNU General Public License
+ along with Redeem.  If not, see <http://www.gnu.org/licenses/>.
+"""
+import unittest
+
+from Gcode import Gcode
+
+
+class TestGcode(unittest.TestCase):
+
+    def parse(self, message):
+        return Gcode({"message": message, "prot": "testing"})
+
+    def test_tokens(self):
+        g = self.parse("G1  X10.5 Y-2\tE0.3 F3000 ; comment")
+        self.assertEqual(g.code(), "G1")
+        self.assertEqual(g.get_tokens(), ["X10.5", "Y-2", "E0.3", "F3000"])
+        self.assertEqual(g.token_letter(1), "Y")
+        self.assertEqual(g.token_value(1), "-2")
+
+    def test_lookup(self):
+        g = self.parse("G1 X10.5 Y-2 E")
+        self.assertTrue(g.has_letter("X"))
+        self.assertFalse(g.has_letter("Z"))
+        self.assertEqual(g.get_value_by_letter("X"), "10.5")
+        self.assertEqual(g.get_value_by_letter("Z"), None)
+        self.assertTrue(g.has_letter("E"))
+        self.assertFalse(g.has_letter_value("E"))
+        self.assertEqual(g.get_float_by_letter("Y", 0.0), -2.0)
+        self.assertEqual(g.get_float_by_letter("E", 1.5), 1.5)
+        self.assertEqual(g.get_float_by_letter("Z", 1.5), 1.5)
+
+    def test_int_from_float(self):
+        g = self.parse("M104 S255.0")
+        self.assertEqual(g.get_int_by_letter("S", 0), 255)
+        self.assertEqual(g.get_int_by_letter("T", 1), 1)
+
+    def test_remove_and_set_tokens(self):
+        g = self.parse("G1 X1 F1200")
+        self.assertEqual(g.get_float_by_letter("F", 0), 1200.0)
+        g.remove_token_by_letter("F")
+        self.assertFalse(g.has_letter("F"))
+        self.assertEqual(g.get_float_by_letter("F", 0), 0)
+        self.assertEqual(g.num_tokens(), 1)
+        g.set_tokens(["Z3"])
+        self.assertFalse(g.has_letter("X"))
+        self.assertEqual(g.get_float_by_letter("Z", 0), 3.0)
+
+    def test_numbered_line(self):
+        g = self.parse("N12 G1 X5*99")
+        self.assertTrue(g.is_crc())
+        self.assertEqual(g.line_number, 12)
+        self.assertEqual(g.code(), "G1")
+        self.assertEqual(g.message, "G1 X5")
+        self.assertEqual(g.get_float_by_letter("X", 0), 5.0)
+
+    def test_empty(self):
+        self.assertFalse(self.parse("  ; only a comment").is_valid())
+        self.assertFalse(self.parse("").is_valid())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python
+"""
+Unit test suite for PWM.py
+
+License: GNU GPL v3: http://www.gnu.org/copyleft/gpl.html
+
+ Redeem is free software: you can redistribute it and/or modify
+ it under the terms of the GNU General Public License as published by
+ the Free Software Foundation, either version 3 of the License, or
+ (at your option) any later version.
+
+ Redeem is distributed in the hope that it will be useful,
+ but WITHOUT ANY WARRANTY; without even the implied warranty of
+ MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+ GNU General Public License for more details.
+
+ You should have received a copy of the GNU General Public License
+ along with Redeem.  If not, see <http://www.gnu.org/licenses/>.
+"""
+import unittest
+
+from PWM import PWM
+
+
+class FakeI2C(object):
+
+    def __init__(self):
+        self.written = []
+        self.fail = False
+
+    def writeList(self, reg, list):
+        self.written.append((reg, list))
+        if self.fail:
+            return -1
+
+
+class TestPWM(unittest.TestCase):
+
+    def setUp(self):
+        PWM.i2c = FakeI2C()
+        PWM.written = {}
+        PWM.pending = {}
+        PWM.reset_stats()
+
+    def test_set_value(self):
+        PWM.set_value(1.0, 2)
+        self.assertEqual(PWM.i2c.written, [(0x06+8, [0, 0, 0xFF, 0x0F])])
+
+    def test_unchanged_value_is_not_sent(self):
+        PWM.set_value(0.5, 0)
+        PWM.set_value(0.5, 0)
+        stats = PWM.get_stats()
+        self.assertEqual(stats["writes"], 1)
+        self.assertEqual(stats["dropped"], 1)
+
+    def test_failed_write_is_retried(self):
+        PWM.set_value(1.0, 0)
+        PWM.i2c.fail = True
+        PWM.set_value(0.0, 0)
+        PWM.i2c.fail = False
+        PWM.set_value(0.0, 0)
+        self.assertEqual(len(PWM.i2c.written), 3)
+        self.assertEqual(PWM.written[0], 0)
+        PWM.set_value(0.0, 0)
+        self.assertEqual(len(PWM.i2c.written), 3)
+
+    def test_failed_batch_is_retried(self):
+        PWM.i2c.fail = True
+        with PWM.batch():
+            PWM.set_value(1.0, 0)
+            PWM.set_value(1.0, 1)
+        self.assertEqual(PWM.written, {})
+        PWM.i2c.fail = False
+        PWM.set_value(1.0, 1)
+        self.assertEqual(PWM.i2c.written[-1], (0x06+4, [0, 0, 0xFF, 0x0F]))
+
+    def test_batch(self):
+        with PWM.batch():
+            PWM.set_value(0.0, 3)
+            PWM.set_value(1.0, 1)
+            with PWM.batch():
+                PWM.set_value(1.0, 2)
+            PWM.set_value(1.0, 3)
+            PWM.set_value(0.0, 7)
+            self.assertEqual(PWM.i2c.written, [])
+        # Channels 1 to 3 are consecutive and go in one write
+        self.assertEqual(PWM.i2c.written, [
+            (0x06+4, [0, 0, 0xFF, 0x0F]*3),
+            (0x06+28, [0, 0, 0, 0])])
+        self.assertEqual(PWM.get_stats()["bytes"], 16)
+
+    def test_batch_drops_unchanged_values(self):
+        PWM.set_value(0.25, 4)
+        with PWM.batch():
+            PWM.set_value(0.25, 4)
+            PWM.set_value(0.75, 5)
+        self.assertEqual(len(PWM.i2c.written), 2)
+        self.assertEqual(PWM.i2c.written[1][0], 0x06+20)
+
+    def test_long_run_is_split(self):
+        with PWM.batch():
+            for channel in range(10):
+                PWM.set_value(1.0, channel)
+        self.assertEqual([(reg, len(l)) for reg, l in PWM.i2c.written],
+                         [(0x06, 4*PWM.MAX_CHANNELS_PER_WRITE),
+                          (0x06+4*PWM.MAX_CHANNELS_PER_WRITE, 8)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+#!/usr/bin/env python
+"""
+Unit test suite for PruInterface.py, on a file standing in for /dev/mem
+
+License: GNU GPL v3: http://www.gnu.org/copyleft/gpl.html
+
+ Redeem is free software: you can redistribute it and/or modify
+ it under the terms of the GNU General Public License as published by
+ the Free Software Foundation, either version 3 of the License, or
+ (at your option) any later version.
+
+ Redeem is distributed in the hope that it will be useful,
+ but WITHOUT ANY WARRANTY; without even the implied warranty of
+ MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+ GNU General Public License for more details.
+
+ You should have received a copy of the GNU General Public License
+ along with Redeem.  If not, see <http://www.gnu.org/licenses/>.
+"""
+import os
+import struct
+import tempfile
+import unittest
+
+from PruInterface import *
+
+
+class TestPruInterface(unittest.TestCase):
+
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp()
+        os.write(fd, b"\0" * SHARED_RAM_LEN)
+        os.close(fd)
+        PruInterface.open(self.path, 0)
+
+    def tearDown(self):
+        PruInterface.close()
+        os.remove(self.path)
+
+    def read_file(self, offset):
+        with open(self.path, "rb") as f:
+            f.seek(offset)
+            return struct.unpack("<I", f.read(4))[0]
+
+    def write_file(self, offset, value):
+        with open(self.path, "r+b") as f:
+            f.seek(offset)
+            f.write(struct.pack("<I", value))
+
+    def test_set_shared_long(self):
+        PruInterface.set_active_endstops(0b101101)
+        PruInterface.mem.flush()
+        self.assertEqual(self.read_file(8), 0b101101)
+
+    def test_get_shared_long(self):
+        self.write_file(0, 0b000110)
+        self.write_file(16, 1234)
+        self.assertEqual(PruInterface.get_endstop_states(), 0b000110)
+        self.assertEqual(PruInterface.get_steps_remaining(), 1234)
+
+    def test_get_shared_state(self):
+        for i in range(SHARED_WORDS):
+            self.write_file(i * 4, i + 1)
+        self.assertEqual(PruInterface.get_shared_state(), (1, 2, 3, 4, 5))
+
+    def test_mapping_is_kept(self):
+        mem = PruInterface.mem
+        PruInterface.set_shared_long(4, 0xffff)
+        self.assertEqual(PruInterface.get_shared_long(4), 0xffff)
+        self.assertIs(PruInterface.mem, mem)
+
+    def test_close(self):
+        PruInterface.close()
+        self.assertIsNone(PruInterface.mem)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+"""
+Unit test suite for ShiftRegister.py
+
+License: GNU GPL v3: http://www.gnu.org/copyleft/gpl.html
+
+ Redeem is free software: you can redistribute it and/or modify
+ it under the terms of the GNU General Public License as published by
+ the Free Software Foundation, either version 3 of the License, or
+ (at your option) any later version.
+
+ Redeem is distributed in the hope that it will be useful,
+ but WITHOUT ANY WARRANTY; without even the implied warranty of
+ MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+ GNU General Public License for more details.
+
+ You should have received a copy of the GNU General Public License
+ along with Redeem.  If not, see <http://www.gnu.org/licenses/>.
+"""
+import unittest
+
+import ShiftRegister as module
+from ShiftRegister import ShiftRegister
+
+
+class FakeSPI(object):
+
+    def __init__(self):
+        self.written = []
+
+    def writebytes(self, bytes):
+        self.written.append(list(bytes))
+
+
+class TestShiftRegister(unittest.TestCase):
+
+    def setUp(self):
+        self.spi = module.spi
+        module.spi = FakeSPI()
+        ShiftRegister.registers = list()
+        ShiftRegister.sent = None
+        ShiftRegister.transfers = 0
+        ShiftRegister.make(4)
+
+    def tearDown(self):
+        module.spi = self.spi
+
+    def test_commit_on_change(self):
+        ShiftRegister.registers[0].add_state(0x01)
+        ShiftRegister.registers[3].set_state(0x20, 0xF0)
+        self.assertEqual(module.spi.written, [[0, 0, 0, 1], [0x20, 0, 0, 1]])
+        self.assertEqual(ShiftRegister.transfers, 2)
+
+    def test_set_state_commits_once(self):
+        reg = ShiftRegister.registers[1]
+        reg.state = 0x0F
+        reg.set_state(0x30, 0xF0)
+        self.assertEqual(reg.state, 0x3F)
+        self.assertEqual(module.spi.written, [[0, 0, 0x3F, 0]])
+
+    def test_unchanged_state_is_not_sent(self):
+        ShiftRegister.registers[0].add_state(0x01)
+        ShiftRegister.registers[0].add_state(0x01)
+        self.assertEqual(ShiftRegister.transfers, 1)
+
+    def test_batch(self):
+        with ShiftRegister.batch():
+            ShiftRegister.registers[0].remove_state(0x01)
+            ShiftRegister.registers[0].add_state(0x02)
+            with ShiftRegister.batch():
+                ShiftRegister.registers[3].add_state(0x01)
+            self.assertEqual(module.spi.written, [])
+        self.assertEqual(module.spi.written, [[1, 0, 0, 2]])
+        self.assertEqual(ShiftRegister.transfers, 1)
+
+    def test_empty_batch(self):
+        with ShiftRegister.batch():
+            pass
+        self.assertEqual(ShiftRegister.transfers, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,125 @@
+#!/usr/bin/env python
+"""
+Unit test suite for StepperWatchdog.py and Printer.ensure_steppers_enabled
+
+License: GNU GPL v3: http://www.gnu.org/copyleft/gpl.html
+
+ Redeem is free software: you can redistribute it and/or modify
+ it under the terms of the GNU General Public License as published by
+ the Free Software Foundation, either version 3 of the License, or
+ (at your option) any later version.
+
+ Redeem is distributed in the hope that it will be useful,
+ but WITHOUT ANY WARRANTY; without even the implied warranty of
+ MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+ GNU General Public License for more details.
+
+ You should have received a copy of the GNU General Public License
+ along with Redeem.  If not, see <http://www.gnu.org/licenses/>.
+"""
+import unittest
+
+import ShiftRegister as shift_register
+from Printer import Printer
+from StepperWatchdog import StepperWatchdog
+
+
+class FakeSPI(object):
+
+    def writebytes(self, bytes):
+        pass
+
+
+class FakeStepper(object):
+    """ Changes its flags like Stepper does, without the hardware """
+
+    def __init__(self, in_use=True):
+        self._enabled = False
+        self._in_use = in_use
+        self._current_enabled = True
+        self.enables = 0
+
+    @property
+    def enabled(self):
+        return self._enabled
+
+    @enabled.setter
+    def enabled(self, enabled):
+        self._enabled = enabled
+        Printer.stepper_generation += 1
+
+    @property
+    def in_use(self):
+        return self._in_use
+
+    @property
+    def current_enabled(self):
+        return self._current_enabled
+
+    def set_enabled(self, force_update=False):
+        self.enables += 1
+        self.enabled = True
+
+    def set_disabled(self, force_update=False):
+        self.enabled = False
+
+    def set_current_enabled(self):
+        self._current_enabled = True
+
+
+class TestStepperWatchdog(unittest.TestCase):
+
+    def setUp(self):
+        self.spi = shift_register.spi
+        shift_register.spi = FakeSPI()
+        self.printer = Printer()
+        self.printer.steppers = {"X": FakeStepper(), "E": FakeStepper(False)}
+        self.swd = StepperWatchdog(self.printer, 60)
+        self.printer.swd = self.swd
+        self.timeouts = 0
+        on_timeout = self.swd._on_timeout
+
+        def count_timeout():
+            self.timeouts += 1
+            on_timeout()
+        self.swd._on_timeout = count_timeout
+
+    def tearDown(self):
+        shift_register.spi = self.spi
+
+    def test_steppers_are_checked_once(self):
+        self.printer.ensure_steppers_enabled()
+        self.printer.ensure_steppers_enabled()
+        self.assertTrue(self.printer.steppers["X"].enabled)
+        self.assertFalse(self.printer.steppers["E"].enabled)
+        self.assertEqual(self.printer.steppers["X"].enables, 1)
+        self.assertEqual(self.printer.steppers_checked, Printer.stepper_generation)
+
+    def test_timeout_bumps_generation(self):
+        self.printer.ensure_steppers_enabled()
+        self.swd.check(self.swd.last_reset + 60)
+        self.assertEqual(self.timeouts, 1)
+        self.assertFalse(self.printer.steppers["X"].enabled)
+        self.assertNotEqual(self.printer.steppers_checked, Printer.stepper_generation)
+
+    def test_next_move_enables_steppers(self):
+        self.printer.ensure_steppers_enabled()
+        self.swd.check(self.swd.last_reset + 60)
+        self.printer.ensure_steppers_enabled()
+        self.assertTrue(self.printer.steppers["X"].enabled)
+        self.assertEqual(self.printer.steppers["X"].enables, 2)
+
+    def test_one_timeout_per_reset(self):
+        self.printer.ensure_steppers_enabled()
+        self.swd.check(self.swd.last_reset + 59)
+        self.assertEqual(self.timeouts, 0)
+        self.swd.check(self.swd.last_reset + 60)
+        self.swd.check(self.swd.last_reset + 61)
+        self.assertEqual(self.timeouts, 1)
+        self.swd.last_reset += 1
+        self.swd.check(self.swd.last_reset + 60)
+        self.assertEqual(self.timeouts, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,149 @@
+#!/usr/bin/env python
+"""
+Unit test suite for ThermalLoop.py
+
+License: GNU GPL v3: http://www.gnu.org/copyleft/gpl.html
+
+ Redeem is free software: you can redistribute it and/or modify
+ it under the terms of the GNU General Public License as published by
+ the Free Software Foundation, either version 3 of the License, or
+ (at your option) any later version.
+
+ Redeem is distributed in the hope that it will be useful,
+ but WITHOUT ANY WARRANTY; without even the implied warranty of
+ MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+ GNU General Public License for more details.
+
+ You should have received a copy of the GNU General Public License
+ along with Redeem.  If not, see <http://www.gnu.org/licenses/>.
+"""
+import unittest
+
+from Cooler import Cooler
+from PWM import PWM
+from ThermalLoop import ThermalLoop
+
+
+class FakeI2C(object):
+
+    def __init__(self):
+        self.written = []
+
+    def writeList(self, reg, list):
+        self.written.append((reg, list))
+
+
+class FakeColdEnd(object):
+
+    def get_temperature(self):
+        return 60.0
+
+
+class FakeFan(object):
+
+    def __init__(self, channel):
+        self.channel = channel
+
+    def set_value(self, value):
+        PWM.set_value(value, self.channel)
+
+
+class FakeController(object):
+
+    def __init__(self, name, sleep, channel, calls):
+        self.name = name
+        self.sleep = sleep
+        self.channel = channel
+        self.calls = calls
+        self.enabled = True
+        self.fail = False
+
+    def sample(self):
+        self.calls.append(("sample", self.name))
+        if self.fail:
+            raise IOError("no ADC")
+
+    def update(self):
+        self.calls.append(("update", self.name))
+        PWM.set_value(1.0, self.channel)
+
+    def disable(self):
+        self.enabled = False
+        PWM.set_value(0.0, self.channel)
+
+
+class TestThermalLoop(unittest.TestCase):
+
+    def setUp(self):
+        PWM.i2c = FakeI2C()
+        PWM.written = {}
+        PWM.pending = {}
+        self.calls = []
+        self.loop = ThermalLoop()
+        self.e = FakeController("E", 0.25, 3, self.calls)
+        self.hbp = FakeController("HBP", 0.5, 4, self.calls)
+        self.loop.add(self.e)
+        self.loop.add(self.hbp)
+        for entry in self.loop.schedule:
+            entry[0] = 100.0
+
+    def test_samples_then_updates_in_one_batch(self):
+        self.assertEqual(self.loop.run_due(100.0), 100.25)
+        self.assertEqual(self.calls, [("sample", "E"), ("sample", "HBP"),
+                                      ("update", "E"), ("update", "HBP")])
+        # Channels 3 and 4 go in one write
+        self.assertEqual(PWM.i2c.written, [(0x06+12, [0, 0, 0xFF, 0x0F]*2)])
+
+    def test_periods(self):
+        self.loop.run_due(100.0)
+        del self.calls[:]
+        self.assertEqual(self.loop.run_due(100.1), 100.25)
+        self.assertEqual(self.calls, [])
+        self.assertEqual(self.loop.run_due(100.25), 100.5)
+        self.assertEqual(self.calls, [("sample", "E"), ("update", "E")])
+        stats = self.loop.get_stats()
+        self.assertEqual(stats["passes"], 2)
+        self.assertEqual(stats["runs"], 3)
+
+    def test_late_deadlines_are_skipped(self):
+        self.loop.run_due(100.0)
+        # E is 0.3 s late, its deadlines at 100.25 and 100.5 are missed
+        self.assertAlmostEqual(self.loop.run_due(100.55), 100.75)
+        stats = self.loop.get_stats()
+        self.assertEqual(stats["missed"], 1)
+        self.assertAlmostEqual(stats["max_jitter"], 0.3)
+        self.assertAlmostEqual(self.loop.schedule[1][0], 101.0)
+
+    def test_disabled_controllers_are_not_counted(self):
+        self.hbp.enabled = False
+        self.loop.run_due(100.0)
+        self.loop.run_due(100.75)
+        self.assertEqual(self.calls, [("sample", "E"), ("update", "E")] * 2)
+        stats = self.loop.get_stats()
+        # Only E counts, it missed 100.25 and 100.5
+        self.assertEqual(stats["runs"], 2)
+        self.assertEqual(stats["missed"], 2)
+        self.assertAlmostEqual(stats["max_jitter"], 0.5)
+
+    def test_failing_controller_is_disabled(self):
+        self.e.fail = True
+        self.loop.run_due(100.0)
+        self.assertFalse(self.e.enabled)
+        self.assertTrue(self.hbp.enabled)
+        self.assertEqual(PWM.written[3], 0)
+        self.assertEqual(PWM.written[4], 4095)
+        del self.calls[:]
+        self.loop.run_due(100.5)
+        self.assertEqual(self.calls, [("sample", "HBP"), ("update", "HBP")])
+
+    def test_cooler_disabled_during_update_stays_off(self):
+        cooler = Cooler(FakeColdEnd(), FakeFan(5), "Cooler", False)
+        cooler.enable()
+        cooler.sample()
+        # The loop was already in update when another thread disabled it
+        cooler.disable()
+        cooler.update()
+        self.assertEqual(PWM.written[5], 0)
+
+if __name__ == '__main__':
+    unittest.main()
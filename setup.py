@@ -38,9 +38,12 @@ pathplanner = Extension(
         'redeem/path_planner/PathPlannerSetup.cpp',
         'redeem/path_planner/Preprocessor.cpp',
         'redeem/path_planner/Path.cpp',
+        'redeem/path_planner/RampTable.cpp',
+        'redeem/path_planner/InputShaper.cpp',
         'redeem/path_planner/Delta.cpp',
         'redeem/path_planner/vector3.cpp',
         'redeem/path_planner/PruTimer.cpp',
+        'redeem/path_planner/StepTrace.cpp',
         'redeem/path_planner/prussdrv.c',
         'redeem/path_planner/Logger.cpp'],
     swig_opts=['-c++','-builtin'],
@@ -0,0 +1,124 @@
+#!/usr/bin/env python
+"""
+Microbenchmark for the G-code tokenizer in redeem/Gcode.py.
+
+Parses a batch of typical slicer output lines and does the lookups
+G0/G1 performs on each of them, once with the current Gcode class
+and once with the split based parser it replaced.
+
+Usage: python tools/gcode_parser_benchmark.py [file.gcode]
+"""
+
+import os
+import re
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.realpath(__file__)), "..", "redeem"))
+from Gcode import Gcode
+
+SAMPLE = [
+    "G1 X104.562 Y98.226 E12.34567",
+    "G1 X105.114 Y98.771 E12.36012 ; perimeter",
+    "G1 F1800 X110.000 Y100.000 E12.40021",
+    "G0 F9000 X20.5 Y19.13 Z0.3",
+    "N1234 G1 X10 Y10 E2.0*84",
+    "M104 S210",
+    "; layer 2",
+]
+
+
+class LegacyGcode:
+    """ The split based parser, kept here for comparison only """
+
+    def __init__(self, packet):
+        try:
+            self.message = packet["message"].split(";")[0]
+            self.message = self.message.strip(' \t\n\r')
+            self.prot = packet["prot"] if "prot" in packet else "None"
+            self.has_crc = False
+            self.answer = "ok"
+            if len(self.message) == 0:
+                self.gcode = "No-Gcode"
+                return
+            self.tokens = self.message.split(" ")
+            if self.tokens[0][0] == "N":
+                line_num = re.findall(r"[\d]+", self.message)[0]
+                cmd = self.message.split("*")[0]
+                csc = self.message.split("*")[1]
+                if int(csc) != self._getCS(cmd):
+                    pass
+                self.message = self.message.\
+                    split("*")[0][(1+len(line_num))::].strip(" ")
+                self.line_number = int(line_num)
+                self.has_crc = True
+            self.tokens = self.message.split(" ")
+            self.gcode = self.tokens.pop(0)
+            self.tokens = filter(None, self.tokens)
+        except Exception:
+            self.gcode = "No-Gcode"
+
+    def _getCS(self, cmd):
+        cs = 0
+        for c in cmd:
+            cs ^= ord(c)
+        return cs
+
+    def has_letter(self, letter):
+        for token in self.tokens:
+            if token[0] == letter:
+                return True
+        return False
+
+    def get_value_by_letter(self, letter):
+        for token in self.tokens:
+            if token[0] == letter:
+                return token[1::]
+        return None
+
+    def has_letter_value(self, letter):
+        for token in self.tokens:
+            if token[0] == letter:
+                if len(token) > 1:
+                    return True
+        return False
+
+    def get_float_by_letter(self, letter, default):
+        if self.has_letter(letter):
+            if self.has_letter_value(letter):
+                return float(self.get_value_by_letter(letter))
+        return default
+
+
+def check(lines):
+    """ Both parsers have to give the same code and tokens """
+    for line in lines:
+        legacy = LegacyGcode({"message": line, "prot": "bench"})
+        current = Gcode({"message": line, "prot": "bench"})
+        assert legacy.gcode == current.code(), line
+        if legacy.gcode != "No-Gcode":
+            assert legacy.tokens == current.get_tokens(), line
+
+
+def run(cls, lines):
+    for line in lines:
+        g = cls({"message": line, "prot": "bench"})
+        if g.gcode == "No-Gcode":
+            continue
+        if g.has_letter("F"):
+            g.get_float_by_letter("F", 0)
+        for letter in "XYZE":
+            g.get_float_by_letter(letter, 0)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        with open(sys.argv[1]) as f:
+            lines = f.readlines()
+    else:
+        lines = SAMPLE * 2000
+
+    check(lines)
+    for name, cls in [("legacy", LegacyGcode), ("current", Gcode)]:
+        best = min(timeit.repeat(lambda: run(cls, lines), number=1, repeat=5))
+        print "{:8s} {:10.0f} lines/s".format(name, len(lines)/best)